@@ -0,0 +1,103 @@
+"""
+Compare IterableDataImport.run, which calls the map function once per record, with
+run_batches for a simple column mapping of a CSV file.
+
+Usage: python benchmarks/batch_map_benchmark.py [--records N] [--batch-size N]
+"""
+
+import argparse
+import csv
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from iterable_data_import import (
+    IterableDataImport,
+    FileSystem,
+    FileFormat,
+    ImportAction,
+    NoOpMapErrorRecorder,
+    RecordBatchFormat,
+    UserProfile,
+    UpdateUserProfile,
+)
+from iterable_data_import.importers.importer import Importer
+
+
+class CountingImporter(Importer):
+    def __init__(self) -> None:
+        self.count = 0
+
+    def handle_actions(self, actions: List[ImportAction]) -> None:
+        self.count += len(actions)
+
+    def shutdown(self) -> None:
+        pass
+
+
+def map_record(record):
+    return UpdateUserProfile(
+        UserProfile(record["email"], data_fields={"plan": record["plan"]})
+    )
+
+
+def map_batch(batch):
+    return [
+        UpdateUserProfile(UserProfile(email, data_fields={"plan": plan}))
+        for email, plan in zip(batch["email"], batch["plan"])
+    ]
+
+
+def _write_csv(path: Path, records: int) -> None:
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "email", "plan", "city", "signup_date"])
+        for i in range(records):
+            writer.writerow(
+                [i, f"user{i}@iterable.com", "pro", "Oakland", "2021-10-01"]
+            )
+
+
+def _time(path: Path, run) -> float:
+    importer = CountingImporter()
+    idi = IterableDataImport(
+        FileSystem(path, FileFormat.CSV), importer, NoOpMapErrorRecorder()
+    )
+    start = time.perf_counter()
+    run(idi)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "data.csv"
+        _write_csv(path, args.records)
+        per_record = _time(path, lambda idi: idi.run(map_record))
+        columns = _time(
+            path, lambda idi: idi.run_batches(map_batch, batch_size=args.batch_size)
+        )
+        arrow = _time(
+            path,
+            lambda idi: idi.run_batches(
+                lambda batch: map_batch(batch.to_pydict()),
+                batch_size=args.batch_size,
+                batch_format=RecordBatchFormat.ARROW,
+            ),
+        )
+
+    for label, seconds in [
+        ("run", per_record),
+        ("run_batches (columns)", columns),
+        ("run_batches (arrow)", arrow),
+    ]:
+        print(f"{label:<24}{seconds:>8.2f}s{args.records / seconds:>12.0f} records/s")
+
+
+if __name__ == "__main__":
+    main()
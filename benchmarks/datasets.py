@@ -0,0 +1,179 @@
+"""
+Deterministic synthetic datasets for the benchmarks. The same records and seed always
+produce byte for byte the same file, so results can be compared between releases.
+
+Rows are built from shuffled pools of values picked by the row index rather than by a
+random number generator per field, which writes a million rows in seconds.
+
+Usage: python benchmarks/datasets.py PATH [--records N] [--format csv|ndjson] [--seed N]
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+COLUMNS = [
+    "id",
+    "email",
+    "user_id",
+    "first_name",
+    "city",
+    "plan",
+    "signup_date",
+    "score",
+    "event_name",
+    "item_id",
+    "price",
+]
+
+# every EVENT_EVERYth record has an event and every PURCHASE_EVERYth a purchase
+EVENT_EVERY = 5
+PURCHASE_EVERY = 100
+
+_WRITE_CHUNK_ROWS = 10_000
+
+_FIRST_NAMES = [
+    "Ada",
+    "Alan",
+    "Barbara",
+    "Charles",
+    "Donald",
+    "Edsger",
+    "Frances",
+    "Grace",
+    "Hedy",
+    "John",
+    "Katherine",
+    "Linus",
+    "Margaret",
+    "Niklaus",
+    "Radia",
+    "Tim",
+]
+_CITIES = [
+    "Oakland",
+    "San Francisco",
+    "Denver",
+    "Austin",
+    "New York",
+    "London",
+    "Berlin",
+    "Tokyo",
+    "Sydney",
+    "Toronto",
+    "São Paulo",
+]
+_PLANS = ["free", "starter", "pro", "enterprise"]
+_EVENT_NAMES = ["page_view", "add_to_cart", "search", "login", "share"]
+
+
+def records(count: int, seed: int = 0) -> Iterator[Tuple[object, ...]]:
+    """
+    The rows of a synthetic dataset, in the order of COLUMNS
+
+    :param count: the number of rows
+    :param seed: seed of the value pools
+    :return: the rows
+    """
+    rng = random.Random(seed)
+    first_names = _shuffled(rng, _FIRST_NAMES)
+    cities = _shuffled(rng, _CITIES)
+    plans = _shuffled(rng, _PLANS)
+    event_names = _shuffled(rng, _EVENT_NAMES)
+    dates = [f"2021-{month:02d}-{day:02d}" for month in range(1, 13) for day in (1, 15)]
+    dates = _shuffled(rng, dates)
+    scores = [round(rng.random() * 100, 2) for _ in range(997)]
+    for i in range(count):
+        purchase = i % PURCHASE_EVERY == 0
+        yield (
+            i,
+            f"user{i}@example.com",
+            f"u{i}",
+            first_names[i % len(first_names)],
+            cities[i % len(cities)],
+            plans[i % len(plans)],
+            dates[i % len(dates)],
+            scores[i % len(scores)],
+            event_names[i % len(event_names)] if i % EVENT_EVERY == 0 else "",
+            f"sku{i % 1000}" if purchase else "",
+            round(1 + scores[i % len(scores)], 2) if purchase else "",
+        )
+
+
+def write_csv(path: Path, count: int, seed: int = 0) -> None:
+    """
+    Write a synthetic dataset as a CSV file with a header row
+
+    :param path: the file to write
+    :param count: the number of records
+    :param seed: seed of the value pools
+    :return: none
+    """
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(",".join(COLUMNS) + "\n")
+        for chunk in _chunks(records(count, seed)):
+            # none of the values contain a comma, quote or newline
+            f.write("".join(",".join(map(str, row)) + "\n" for row in chunk))
+
+
+def write_ndjson(path: Path, count: int, seed: int = 0) -> None:
+    """
+    Write a synthetic dataset as a newline delimited JSON file. Empty values are left
+    out of the records.
+
+    :param path: the file to write
+    :param count: the number of records
+    :param seed: seed of the value pools
+    :return: none
+    """
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk in _chunks(records(count, seed)):
+            f.write(
+                "".join(
+                    encoder.encode(
+                        {
+                            column: value
+                            for column, value in zip(COLUMNS, row)
+                            if value != ""
+                        }
+                    )
+                    + "\n"
+                    for row in chunk
+                )
+            )
+
+
+def _shuffled(rng: random.Random, values: List) -> List:
+    values = list(values)
+    rng.shuffle(values)
+    return values
+
+
+def _chunks(rows: Iterator[Tuple[object, ...]]) -> Iterator[List[Tuple[object, ...]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == _WRITE_CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write = write_csv if args.format == "csv" else write_ndjson
+    write(args.path, args.records, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Benchmark suite for the import pipeline over deterministic synthetic datasets.
+
+Scenarios:
+    read_csv, read_ndjson  reading records with FileSystem
+    map                    the map function alone, over records already in memory
+    noop_import            a whole import of a newline delimited JSON file with the
+                           NoOpImporter
+    sync_import            a whole import with the SyncApiImporter, sending requests to
+                           a local mock Iterable server in another process
+
+The whole import scenarios run as a pipeline with --map-threads N, see ImportPipeline.
+
+Results are printed and, with --output, written as JSON including the library
+version, so runs of different releases can be compared with --compare.
+
+Usage: python benchmarks/import_benchmark.py [--records N] [--api-records N]
+    [--scenarios NAME ...] [--repeat N] [--latency S] [--rate-limited FRACTION]
+    [--server-errors FRACTION] [--sender-threads N] [--map-threads N]
+    [--output PATH] [--compare PATH]
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import datasets
+import mock_iterable_server
+from iterable_data_import import (
+    __version__,
+    IterableDataImport,
+    CommerceItem,
+    CustomEvent,
+    FileSystem,
+    FileFormat,
+    InMemoryMetrics,
+    NoOpApiErrorRecorder,
+    NoOpImporter,
+    NoOpMapErrorRecorder,
+    Purchase,
+    SyncApiClient,
+    SyncApiImporter,
+    TrackCustomEvent,
+    TrackPurchase,
+    UserProfile,
+    UpdateUserProfile,
+)
+from iterable_data_import.metrics import HTTP
+
+SCENARIOS = ["read_csv", "read_ndjson", "map", "noop_import", "sync_import"]
+
+
+def map_record(record):
+    user = UserProfile(
+        record["email"],
+        data_fields={
+            "firstName": record["first_name"],
+            "city": record["city"],
+            "plan": record["plan"],
+            "signupDate": record["signup_date"],
+            "score": record["score"],
+        },
+    )
+    actions = [UpdateUserProfile(user)]
+    if record.get("event_name"):
+        actions.append(
+            TrackCustomEvent(CustomEvent(record["event_name"], email=record["email"]))
+        )
+    if record.get("item_id"):
+        item = CommerceItem(record["item_id"], "Widget", float(record["price"]), 1)
+        actions.append(TrackPurchase(Purchase(user, [item], float(record["price"]))))
+    return actions
+
+
+class Scenario:
+    """
+    A timed run of one scenario
+
+    :param records: the number of source records handled by each run
+    :param run: runs the scenario once
+    :param after: returns extra results once the runs are done
+    """
+
+    def __init__(
+        self,
+        records: int,
+        run: Callable[[], None],
+        after: Optional[Callable[[], Dict[str, object]]] = None,
+    ) -> None:
+        self.records = records
+        self.run = run
+        self.after = after
+
+
+def _read(path: Path, file_format: FileFormat) -> None:
+    for _ in FileSystem(path, file_format):
+        pass
+
+
+def _map(records: List[dict]) -> None:
+    for record in records:
+        map_record(record)
+
+
+def _noop_import(path: Path, map_threads: int) -> None:
+    idi = IterableDataImport(
+        FileSystem(path, FileFormat.NEWLINE_DELIMITED_JSON),
+        NoOpImporter(),
+        NoOpMapErrorRecorder(),
+    )
+    idi.run(map_record, map_threads=map_threads)
+
+
+def _sync_import(path: Path, url: str, metrics: InMemoryMetrics, args) -> None:
+    api_client = SyncApiClient(
+        "benchmark_api_key",
+        base_url=url,
+        pool_maxsize=max(args.sender_threads, 1),
+        metrics=metrics,
+    )
+    importer = SyncApiImporter(
+        api_client,
+        NoOpApiErrorRecorder(),
+        sender_threads=args.sender_threads,
+        retry_backoff=0.01,
+    )
+    idi = IterableDataImport(
+        FileSystem(path, FileFormat.NEWLINE_DELIMITED_JSON),
+        importer,
+        NoOpMapErrorRecorder(),
+    )
+    idi.run(map_record, map_threads=args.map_threads)
+
+
+def _requests_by_status(metrics: InMemoryMetrics) -> Dict[str, object]:
+    requests: Dict[str, int] = {}
+    for stats in metrics.snapshot():
+        if stats["stage"] == HTTP:
+            status = stats["labels"]["status"]
+            requests[status] = requests.get(status, 0) + stats["calls"]
+    return {"requests": requests}
+
+
+def _scenarios(args, tmp: Path) -> Dict[str, Scenario]:
+    csv_path = tmp / "records.csv"
+    ndjson_path = tmp / "records.json"
+    api_path = tmp / "api_records.json"
+    wanted = set(args.scenarios)
+    if "read_csv" in wanted:
+        datasets.write_csv(csv_path, args.records, args.seed)
+    if wanted & {"read_ndjson", "map", "noop_import"}:
+        datasets.write_ndjson(ndjson_path, args.records, args.seed)
+    if "sync_import" in wanted:
+        datasets.write_ndjson(api_path, args.api_records, args.seed)
+
+    scenarios = {
+        "read_csv": lambda: Scenario(
+            args.records, lambda: _read(csv_path, FileFormat.CSV)
+        ),
+        "read_ndjson": lambda: Scenario(
+            args.records,
+            lambda: _read(ndjson_path, FileFormat.NEWLINE_DELIMITED_JSON),
+        ),
+        "noop_import": lambda: Scenario(
+            args.records, lambda: _noop_import(ndjson_path, args.map_threads)
+        ),
+    }
+    if "map" in wanted:
+        records = list(FileSystem(ndjson_path, FileFormat.NEWLINE_DELIMITED_JSON))
+        scenarios["map"] = lambda: Scenario(args.records, lambda: _map(records))
+    if "sync_import" in wanted:
+        metrics = InMemoryMetrics()
+        scenarios["sync_import"] = lambda: Scenario(
+            args.api_records,
+            lambda: _sync_import(api_path, args.url, metrics, args),
+            lambda: _requests_by_status(metrics),
+        )
+    return {name: scenarios[name]() for name in args.scenarios}
+
+
+def _time(scenario: Scenario, repeat: int) -> Dict[str, object]:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scenario.run()
+        runs.append(time.perf_counter() - start)
+    best = min(runs)
+    result = {
+        "records": scenario.records,
+        "seconds": best,
+        "records_per_second": scenario.records / best if best else None,
+        "runs": runs,
+    }
+    if scenario.after is not None:
+        result.update(scenario.after())
+    return result
+
+
+def _compare(results: Dict[str, Dict[str, object]], baseline_path: Path) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"\ncompared with {baseline_path} (version {baseline['version']})")
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if not before or not before["records_per_second"]:
+            print(f"{name:<16}{'n/a':>10}")
+            continue
+        ratio = result["records_per_second"] / before["records_per_second"]
+        print(f"{name:<16}{ratio:>9.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--api-records", type=int, default=100_000)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--rate-limited", type=float, default=0.0)
+    parser.add_argument("--server-errors", type=float, default=0.0)
+    parser.add_argument("--sender-threads", type=int, default=0)
+    parser.add_argument("--map-threads", type=int, default=0)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path)
+    args = parser.parse_args()
+
+    server = None
+    if "sync_import" in args.scenarios:
+        server, args.url = mock_iterable_server.start_in_subprocess(
+            latency=args.latency,
+            rate_limited=args.rate_limited,
+            server_errors=args.server_errors,
+            seed=args.seed,
+        )
+
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, scenario in _scenarios(args, Path(tmp)).items():
+                results[name] = _time(scenario, args.repeat)
+                seconds = results[name]["seconds"]
+                rate = results[name]["records_per_second"]
+                print(f"{name:<16}{seconds:>8.2f}s{rate:>12.0f} records/s")
+    finally:
+        if server is not None:
+            server.terminate()
+
+    report = {
+        "version": __version__,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "options": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "compare", "url")
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+    if args.compare:
+        _compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
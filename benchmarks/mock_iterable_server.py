@@ -0,0 +1,178 @@
+"""
+A local stand in for the Iterable API endpoints used by the importers, so imports can
+be benchmarked end to end without a project, network latency noise or rate limits.
+
+/users/bulkUpdate, /events/trackBulk and /commerce/trackPurchase wait for latency
+seconds and then answer like Iterable does. A seeded fraction of requests is answered
+with 429 (with a Retry-After header) or 500 instead, so retries can be benchmarked too.
+
+Usage: python benchmarks/mock_iterable_server.py [--port N] [--latency S]
+    [--rate-limited FRACTION] [--server-errors FRACTION] [--retry-after S] [--seed N]
+"""
+
+import argparse
+import gzip
+import json
+import multiprocessing
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+BULK_ITEMS = {"/api/users/bulkUpdate": "users", "/api/events/trackBulk": "events"}
+PURCHASE_PATH = "/api/commerce/trackPurchase"
+
+
+class MockIterableServer(ThreadingHTTPServer):
+    """
+    HTTP server answering the Iterable API endpoints used by the importers. counts
+    holds the number of responses sent for each path and status code.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        rate_limited: float = 0.0,
+        server_errors: float = 0.0,
+        retry_after: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        if rate_limited + server_errors > 1:
+            raise ValueError(
+                f"rate_limited + server_errors must be less than or equal to 1, {rate_limited + server_errors} provided"
+            )
+
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.rate_limited = rate_limited
+        self.server_errors = server_errors
+        self.retry_after = retry_after
+        self.counts: Counter = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """
+        The base URL to give to the API clients
+
+        :return: the URL
+        """
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def respond(self, path: str, body: bytes) -> Tuple[int, Dict[str, object]]:
+        """
+        The status code and body of the response to a request
+
+        :param path: the request path
+        :param body: the request body
+        :return: the status code and response body
+        """
+        with self._lock:
+            draw = self._random.random()
+
+        if path not in BULK_ITEMS and path != PURCHASE_PATH:
+            status, response = 404, {"msg": "Not found", "code": "NotFound"}
+        elif draw < self.rate_limited:
+            status, response = 429, {"msg": "Rate limited", "code": "RateLimitExceeded"}
+        elif draw < self.rate_limited + self.server_errors:
+            status, response = 500, {"msg": "Server error", "code": "GenericError"}
+        elif path == PURCHASE_PATH:
+            status, response = 200, {"msg": "", "code": "Success", "params": None}
+        else:
+            items = json.loads(body).get(BULK_ITEMS[path]) or []
+            status, response = 200, {"successCount": len(items), "failCount": 0}
+
+        with self._lock:
+            self.counts[(path, status)] += 1
+        return status, response
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # the headers and body are written separately, Nagle's algorithm would hold the
+    # body back until the client acknowledges the headers
+    disable_nagle_algorithm = True
+    server: MockIterableServer
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+
+        status, response = self.server.respond(self.path, body)
+        data = json.dumps(response).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 429:
+            self.send_header("Retry-After", str(self.server.retry_after))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def start_in_subprocess(**options) -> Tuple[multiprocessing.Process, str]:
+    """
+    Run a MockIterableServer in another process, so it doesn't compete with the
+    import being benchmarked for the GIL. Terminate the process to stop it.
+
+    :param options: MockIterableServer arguments
+    :return: the process and the server's base URL
+    """
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(child, options), daemon=True)
+    process.start()
+    url = parent.recv()
+    return process, url
+
+
+def _serve(connection, options: Dict[str, object]) -> None:
+    server = MockIterableServer(**options)
+    connection.send(server.url)
+    server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--rate-limited", type=float, default=0.0)
+    parser.add_argument("--server-errors", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockIterableServer(
+        args.host,
+        args.port,
+        args.latency,
+        args.rate_limited,
+        args.server_errors,
+        args.retry_after,
+        args.seed,
+    )
+    print(f"serving {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
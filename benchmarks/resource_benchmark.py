@@ -0,0 +1,106 @@
+"""
+Compare the memory footprint and to_api_dict cost of resources against the previous
+__dict__ based implementation, which rebuilt the API dictionary on every access.
+
+Usage: python benchmarks/resource_benchmark.py [--count N]
+"""
+
+import argparse
+import timeit
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from iterable_data_import import UserProfile
+
+
+class DictUserProfile:
+    """
+    UserProfile as it was before resources used __slots__ and cached API dictionaries
+    """
+
+    def __init__(
+        self,
+        email: Optional[str] = None,
+        user_id: Optional[str] = None,
+        data_fields: Optional[Dict[str, object]] = None,
+        prefer_user_id: bool = False,
+        merge_nested_objects: bool = False,
+    ) -> None:
+        if data_fields is None:
+            data_fields = {}
+
+        if not email and not user_id:
+            raise ValueError("User profiles must have an email or user_id")
+
+        self.email = email
+        self.user_id = user_id
+        self.data_fields = data_fields
+        self.prefer_user_id = prefer_user_id
+        self.merge_nested_objects = merge_nested_objects
+
+    @property
+    def to_api_dict(self):
+        return {
+            "email": self.email,
+            "userId": self.user_id,
+            "dataFields": self.data_fields,
+            "preferUserId": self.prefer_user_id,
+            "mergeNestedObjects": self.merge_nested_objects,
+        }
+
+
+def _create(cls: Callable, count: int) -> List[object]:
+    return [
+        cls(f"user{i}@iterable.com", data_fields={"plan": "pro"}) for i in range(count)
+    ]
+
+
+def _bytes_per_object(cls: Callable, count: int, access_api_dict: bool) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    users = _create(cls, count)
+    if access_api_dict:
+        for user in users:
+            user.to_api_dict
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count
+
+
+def _microseconds(statement: Callable, number: int) -> float:
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'':<22}{'__dict__':>12}{'__slots__':>12}")
+    for label, access in [("bytes/object", False), ("bytes/object + dict", True)]:
+        old = _bytes_per_object(DictUserProfile, args.count, access)
+        new = _bytes_per_object(UserProfile, args.count, access)
+        print(f"{label:<22}{old:>12.0f}{new:>12.0f}")
+
+    old_user = DictUserProfile("test@iterable.com", data_fields={"plan": "pro"})
+    new_user = UserProfile("test@iterable.com", data_fields={"plan": "pro"})
+    timings = [
+        (
+            "construct (us)",
+            lambda: DictUserProfile("test@iterable.com"),
+            lambda: UserProfile("test@iterable.com"),
+        ),
+        (
+            "to_api_dict x3 (us)",
+            lambda: [old_user.to_api_dict for _ in range(3)],
+            lambda: [new_user.to_api_dict for _ in range(3)],
+        ),
+    ]
+    for label, old_stmt, new_stmt in timings:
+        old = _microseconds(old_stmt, 100_000)
+        new = _microseconds(new_stmt, 100_000)
+        print(f"{label:<22}{old:>12.3f}{new:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,8 +16,23 @@ from iterable_data_import.import_action import (
     TrackCustomEvent,
     TrackPurchase,
 )
-from iterable_data_import.data_sources.data_source import FileFormat, SourceDataRecord
+from iterable_data_import.json_serializer import (
+    JsonSerializer,
+    StdlibJsonSerializer,
+    OrjsonSerializer,
+)
+from iterable_data_import.data_sources.data_source import (
+    FileFormat,
+    RecordBatchFormat,
+    SourceDataRecord,
+    SourcePosition,
+    SourceReference,
+)
+from iterable_data_import.data_sources.compression import Compression
 from iterable_data_import.data_sources.file_system import FileSystem
+from iterable_data_import.data_sources.mmap_ndjson import MmapNdjsonFileSystem
+from iterable_data_import.data_sources.multi_file_system import MultiFileSystem
+from iterable_data_import.data_sources.sharded_data_source import ShardedDataSource
 from iterable_data_import.error_recorders.map_error_recorder import (
     FileSystemMapErrorRecorder,
     NoOpMapErrorRecorder,
@@ -26,7 +41,24 @@ from iterable_data_import.error_recorders.api_error_recorder import (
     FileSystemApiErrorRecorder,
     NoOpApiErrorRecorder,
 )
+from iterable_data_import.error_recorders.compact_api_error_recorder import (
+    CompactApiErrorReader,
+    CompactFileSystemApiErrorRecorder,
+)
+from iterable_data_import.data_sources.api_error_file import (
+    ApiErrorFile,
+    replay_action,
+)
 from iterable_data_import.importers.no_op_importer import NoOpImporter
 from iterable_data_import.importers.sync_api_client import SyncApiClient
 from iterable_data_import.importers.sync_api_importer import SyncApiImporter
+from iterable_data_import.importers.async_api_client import AsyncApiClient
+from iterable_data_import.importers.async_api_importer import AsyncApiImporter
+from iterable_data_import.importers.rate_limiter import RateLimiter
+from iterable_data_import.importers.concurrency_controller import (
+    AimdConcurrencyController,
+)
+from iterable_data_import.checkpoint import FileSystemCheckpoint
+from iterable_data_import.metrics import InMemoryMetrics, Metrics
+from iterable_data_import.pipeline import ImportPipeline
 from iterable_data_import.iterable_data_import import IterableDataImport
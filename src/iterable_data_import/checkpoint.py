@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+from collections import deque
+from pathlib import PurePath
+from typing import Callable, Deque, Optional, Tuple
+
+from iterable_data_import.data_sources.data_source import SourcePosition
+
+
+class Checkpoint:
+    """
+    Abstract base class responsible for persisting how far an import has progressed so
+    that it can be resumed after a restart
+
+    Checkpoints are persisted as JSON objects with the following keys:
+    - record_index
+    - offset
+    """
+
+    def load(self) -> Optional[SourcePosition]:
+        """
+        Load the last saved position
+
+        :return: the position, or None if no checkpoint has been saved
+        """
+        pass
+
+    def save(self, position: SourcePosition) -> None:
+        """
+        Save a position. Every record before the position must have been acknowledged
+        by the importer.
+
+        :param position: the position to save
+        :return: none
+        """
+        pass
+
+
+class FileSystemCheckpoint(Checkpoint):
+    """
+    A checkpoint stored in a file on the local file system. The file is replaced
+    atomically so a crash while saving leaves the previous checkpoint intact.
+    """
+
+    def __init__(self, file_path: PurePath) -> None:
+        self.file_path = file_path
+        self._logger = logging.getLogger("checkpoint.FileSystemCheckpoint")
+
+    def load(self) -> Optional[SourcePosition]:
+        try:
+            with open(self.file_path, "r") as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        position = SourcePosition(checkpoint["record_index"], checkpoint["offset"])
+        self._logger.debug(f"loaded checkpoint {position}")
+        return position
+
+    def save(self, position: SourcePosition) -> None:
+        self._logger.debug(f"saving checkpoint {position}")
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"record_index": position.record_index, "offset": position.offset}, f
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.file_path)
+
+
+class CheckpointTracker:
+    """
+    Advances a checkpoint as the actions of each source record are acknowledged by the
+    importer. The checkpoint is saved once every save_every acknowledged records.
+
+    before_save is called before each save, e.g. to flush buffered error recorders so
+    that the errors of every record before the checkpoint are persisted.
+    """
+
+    def __init__(
+        self,
+        checkpoint: Checkpoint,
+        save_every: int = 1000,
+        before_save: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.checkpoint = checkpoint
+        self.save_every = save_every
+        self.before_save = before_save
+        # (number of actions handled up to and including a record, position after it)
+        self._unacknowledged: Deque[Tuple[int, SourcePosition]] = deque()
+        self._actions_handled = 0
+        self._acknowledged_position: Optional[SourcePosition] = None
+        self._records_since_save = 0
+
+    def record_handled(self, action_count: int, position: SourcePosition) -> None:
+        """
+        Track a source record whose import actions were passed to the importer
+
+        :param action_count: number of import actions created from the record
+        :param position: the data source position just after the record
+        :return: none
+        """
+        self._actions_handled += action_count
+        self._unacknowledged.append((self._actions_handled, position))
+
+    def update(self, acknowledged_actions: int) -> None:
+        """
+        Advance past the records whose actions have all been acknowledged, saving the
+        checkpoint if enough records have been acknowledged since the last save
+
+        :param acknowledged_actions: the importer's count of acknowledged actions
+        :return: none
+        """
+        while (
+            self._unacknowledged and self._unacknowledged[0][0] <= acknowledged_actions
+        ):
+            _, self._acknowledged_position = self._unacknowledged.popleft()
+            self._records_since_save += 1
+
+        if self._records_since_save >= self.save_every:
+            self.save()
+
+    def save(self) -> None:
+        """
+        Save the position after the last acknowledged record
+
+        :return: none
+        """
+        if self._acknowledged_position is not None and self._records_since_save > 0:
+            if self.before_save is not None:
+                self.before_save()
+            self.checkpoint.save(self._acknowledged_position)
+            self._records_since_save = 0
@@ -0,0 +1,182 @@
+import json
+import logging
+from pathlib import PurePath
+from typing import Callable, Dict, FrozenSet, Generator, List, Optional
+
+from iterable_data_import.data_sources.compression import open_source_file
+from iterable_data_import.data_sources.data_source import (
+    DataSource,
+    FileFormat,
+    SourceDataRecord,
+)
+from iterable_data_import.error_recorders.compact_api_error_recorder import (
+    EVENTS,
+    PURCHASES,
+    USERS,
+    CompactApiErrorReader,
+    request_body_type,
+)
+from iterable_data_import.import_action import (
+    ImportAction,
+    TrackCustomEvent,
+    TrackPurchase,
+    UpdateUserProfile,
+)
+from iterable_data_import.importers.bulk_response import evaluate_response
+from iterable_data_import.importers.iterable_request import (
+    BulkTrackCustomEventRequest,
+    BulkUserUpdateRequest,
+    IterableRequest,
+    TrackPurchaseRequest,
+)
+from iterable_data_import.iterable_resource import (
+    CustomEvent,
+    IterableResource,
+    Purchase,
+    UserProfile,
+)
+
+# errors with these statuses would fail the same way again, e.g. a 400 for a request
+# that failed validation or a 413 for a single item too large to send
+PERMANENT_STATUS_CODES = frozenset([400, 413])
+
+_RESOURCE_TYPES = {
+    USERS: UserProfile,
+    EVENTS: CustomEvent,
+    PURCHASES: Purchase,
+}
+
+_ACTION_TYPES = {
+    USERS: UpdateUserProfile,
+    EVENTS: TrackCustomEvent,
+    PURCHASES: TrackPurchase,
+}
+
+
+def replay_action(record: SourceDataRecord) -> ImportAction:
+    """
+    The map function of a replay, which imports each item read by ApiErrorFile again
+
+    :param record: a record read by ApiErrorFile
+    :return: the import action
+    """
+    return _ACTION_TYPES[record["type"]](record["resource"])
+
+
+class ApiErrorFile(DataSource):
+    """
+    Class responsible for reading the items of failed requests back from an API error
+    file, so that they can be imported again
+
+    Each source data record is a dictionary holding the type of the item, one of
+    users, events or purchases, and under resource the item recreated from its API
+    dictionary. Map them with replay_action. Files are streamed a line at a time and
+    may be compressed like source files.
+
+    Items that can't succeed when sent again are skipped: every item of an error whose
+    response status is in skip_status_codes, the items a successful bulk response
+    listed as permanently failed, e.g. invalid emails, and items that are no longer
+    valid resources. items_read and items_skipped count them.
+
+    Errors written by CompactFileSystemApiErrorRecorder are rehydrated from their
+    source files first, which requires the source_file_format and map_function of the
+    original import.
+    """
+
+    def __init__(
+        self,
+        file_path: PurePath,
+        skip_status_codes: FrozenSet[int] = PERMANENT_STATUS_CODES,
+        source_file_format: Optional[FileFormat] = None,
+        map_function: Optional[Callable] = None,
+    ) -> None:
+        self.file_path = file_path
+        self.skip_status_codes = skip_status_codes
+        self.items_read = 0
+        self.items_skipped = 0
+        self._compact_reader = CompactApiErrorReader(
+            file_path, source_file_format, map_function
+        )
+        self._logger = logging.getLogger("datasources.ApiErrorFile")
+        self.source_data_generator = self._get_generator()
+
+    def __iter__(self):
+        return self.source_data_generator
+
+    def __next__(self):
+        return next(self.source_data_generator)
+
+    def _get_generator(self) -> Generator[SourceDataRecord, None, None]:
+        self._logger.debug(f"reading api errors from {self.file_path}")
+        with open_source_file(self.file_path) as f:
+            # compact errors are rehydrated a block at a time, reading their source
+            # records in file order
+            errors = self._compact_reader.rehydrate_errors(
+                json.loads(line) for line in f if line.strip()
+            )
+            try:
+                for error in errors:
+                    yield from self._replayable_items(error)
+            finally:
+                self._compact_reader.close()
+
+        self._logger.info(
+            f"read {self.items_read} items from {self.file_path}, skipped {self.items_skipped}"
+        )
+
+    def _replayable_items(
+        self, error: Dict[str, object]
+    ) -> Generator[SourceDataRecord, None, None]:
+        request_body = error["request_body"]
+        request_type = request_body_type(request_body)
+        api_dicts = (
+            [request_body]
+            if request_type == PURCHASES
+            else request_body.get(request_type) or []
+        )
+        self.items_read += len(api_dicts)
+        if error["response_status"] in self.skip_status_codes:
+            self.items_skipped += len(api_dicts)
+            return
+
+        # invalid items are None, keeping the others at their position in the request
+        resources = self._create_resources(request_type, api_dicts)
+        permanent = set()
+        if error["response_status"] < 400 and any(r is not None for r in resources):
+            # the request succeeded but some of its items failed, the response may
+            # identify them by their index in the recorded request
+            outcome = evaluate_response(
+                _create_request(request_type, resources),
+                error["response_status"],
+                error["response_body"],
+            )
+            if outcome.failed:
+                permanent = {id(r) for r in outcome.failed.items if r is not None}
+                self.items_skipped += len(permanent)
+
+        for resource in resources:
+            if resource is not None and id(resource) not in permanent:
+                yield {"type": request_type, "resource": resource}
+
+    def _create_resources(
+        self, request_type: str, api_dicts: List[Dict[str, object]]
+    ) -> List[Optional[IterableResource]]:
+        resources: List[Optional[IterableResource]] = []
+        for api_dict in api_dicts:
+            try:
+                resources.append(_RESOURCE_TYPES[request_type].from_api_dict(api_dict))
+            except ValueError as e:
+                self._logger.warning(f"skipping invalid {request_type} item: {e}")
+                self.items_skipped += 1
+                resources.append(None)
+        return resources
+
+
+def _create_request(
+    request_type: str, resources: List[Optional[IterableResource]]
+) -> IterableRequest:
+    if request_type == USERS:
+        return BulkUserUpdateRequest(resources)
+    if request_type == EVENTS:
+        return BulkTrackCustomEventRequest(resources)
+    return TrackPurchaseRequest(resources[0])
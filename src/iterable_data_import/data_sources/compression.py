@@ -0,0 +1,113 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+from enum import Enum
+from pathlib import PurePath
+from typing import BinaryIO, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is an optional dependency
+    zstandard = None
+
+# source files are read in large chunks so decompression and parsing aren't
+# interrupted by many small reads
+READ_BUFFER_SIZE = 1024 * 1024
+
+
+class Compression(Enum):
+    """
+    Supported compression formats for source data files
+    """
+
+    NONE = "none"
+    GZIP = "gzip"
+    BZ2 = "bz2"
+    XZ = "xz"
+    ZSTD = "zstd"
+
+
+_EXTENSIONS = {
+    ".gz": Compression.GZIP,
+    ".gzip": Compression.GZIP,
+    ".bz2": Compression.BZ2,
+    ".xz": Compression.XZ,
+    ".lzma": Compression.XZ,
+    ".zst": Compression.ZSTD,
+    ".zstd": Compression.ZSTD,
+}
+
+
+def detect_compression(file_path: PurePath) -> Compression:
+    """
+    Detect the compression of a file from its extension, e.g. data.csv.gz
+
+    :param file_path: the file path
+    :return: the compression, Compression.NONE if the extension isn't recognized
+    """
+    extension = os.path.splitext(str(file_path))[1].lower()
+    return _EXTENSIONS.get(extension, Compression.NONE)
+
+
+def open_source_file(
+    file_path: PurePath, compression: Optional[Compression] = None
+) -> BinaryIO:
+    """
+    Open a source data file for reading, decompressing it as it's read. Memory use
+    doesn't depend on the size of the file.
+
+    :param file_path: the file path
+    :param compression: the file's compression, detected from the extension if None
+    :return: a buffered binary file of the decompressed data
+    """
+    if compression is None:
+        compression = detect_compression(file_path)
+
+    if compression == Compression.NONE:
+        return open(file_path, "rb", buffering=READ_BUFFER_SIZE)
+
+    if compression == Compression.GZIP:
+        raw = gzip.open(file_path, "rb")
+    elif compression == Compression.BZ2:
+        raw = bz2.open(file_path, "rb")
+    elif compression == Compression.XZ:
+        raw = lzma.open(file_path, "rb")
+    elif compression == Compression.ZSTD:
+        if zstandard is None:
+            raise ImportError(
+                "zstd compressed files require zstandard, install it with: pip install iterable-data-import[zstd]"
+            )
+        # files written by parallel compressors contain many frames
+        raw = zstandard.ZstdDecompressor().stream_reader(
+            open(file_path, "rb", buffering=READ_BUFFER_SIZE),
+            read_across_frames=True,
+            closefd=True,
+        )
+    else:
+        raise ValueError(f"{compression} is not a supported compression")
+
+    return io.BufferedReader(raw, buffer_size=READ_BUFFER_SIZE)
+
+
+def seek_forward(f: BinaryIO, offset: int) -> None:
+    """
+    Move a file opened with open_source_file forward to a byte offset of the
+    decompressed data. Streams that can't seek, like zstd, are read up to the offset
+    and the data discarded.
+
+    :param f: the file
+    :param offset: the offset, at or after the current position
+    :return: none
+    """
+    if f.seekable():
+        f.seek(offset)
+        return
+
+    remaining = offset - f.tell()
+    while remaining > 0:
+        data = f.read(min(remaining, READ_BUFFER_SIZE))
+        if not data:
+            return
+        remaining -= len(data)
@@ -1,8 +1,64 @@
 from enum import Enum
-from typing import Dict, Iterator
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover - pyarrow is an optional dependency
+    pyarrow = None
 
 SourceDataRecord = Dict[str, object]
 
+# a batch of source data records, either a dictionary of column name to column values
+# or a pyarrow.RecordBatch
+RecordBatch = Union[Dict[str, List[object]], "pyarrow.RecordBatch"]
+
+
+class SourcePosition:
+    """
+    A position in a data source, just after a record
+
+    record_index is the number of records read from the start of the source and
+    offset is the byte offset of the end of the last record read. Parquet files are
+    read by row rather than byte, so their offset is the same as record_index.
+    """
+
+    def __init__(self, record_index: int, offset: int) -> None:
+        self.record_index = record_index
+        self.offset = offset
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, SourcePosition)
+            and self.record_index == other.record_index
+            and self.offset == other.offset
+        )
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.record_index}, {self.offset})"
+
+
+class SourceReference:
+    """
+    Where a source data record came from, the file and the position just before the
+    record, so the record can be read again by starting a data source at position
+    """
+
+    __slots__ = ("file_path", "position")
+
+    def __init__(self, file_path: str, position: SourcePosition) -> None:
+        self.file_path = file_path
+        self.position = position
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, SourceReference)
+            and self.file_path == other.file_path
+            and self.position == other.position
+        )
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.file_path}, {self.position})"
+
 
 class FileFormat(Enum):
     """
@@ -11,6 +67,20 @@ class FileFormat(Enum):
 
     CSV = "csv"
     NEWLINE_DELIMITED_JSON = "newline_delimited_json"
+    PARQUET = "parquet"
+
+
+class RecordBatchFormat(Enum):
+    """
+    Formats of the record batches passed to batch map functions
+
+    COLUMNS batches are dictionaries of column name to a list of column values. ARROW
+    batches are pyarrow.RecordBatch objects and require the optional pyarrow
+    dependency.
+    """
+
+    COLUMNS = "columns"
+    ARROW = "arrow"
 
 
 class DataSource(Iterator):
@@ -23,3 +93,98 @@ class DataSource(Iterator):
 
     def __next__(self) -> SourceDataRecord:
         pass
+
+    @property
+    def position(self) -> Optional[SourcePosition]:
+        """
+        The position just after the last record returned
+
+        :return: the position, or None if the data source can't resume from a position
+        """
+        return None
+
+    def batches(
+        self, batch_size: int, batch_format: RecordBatchFormat
+    ) -> Iterator[RecordBatch]:
+        """
+        Iterate over the source data records in batches
+
+        Data sources that can read columnar data directly should override this, by
+        default records are read one at a time and then grouped into batches.
+
+        :param batch_size: maximum number of records in a batch
+        :param batch_format: the format of the batches
+        :return: iterator of record batches
+        """
+        return to_record_batches(self, batch_size, batch_format)
+
+
+def to_record_batches(
+    records: Iterable[SourceDataRecord],
+    batch_size: int,
+    batch_format: RecordBatchFormat,
+) -> Iterator[RecordBatch]:
+    """
+    Group source data records into record batches
+
+    :param records: the source data records
+    :param batch_size: maximum number of records in a batch
+    :param batch_format: the format of the batches
+    :return: iterator of record batches
+    """
+    if batch_format == RecordBatchFormat.ARROW:
+        _require_pyarrow()
+
+    rows: List[SourceDataRecord] = []
+    for record in records:
+        rows.append(record)
+        if len(rows) >= batch_size:
+            yield _rows_to_batch(rows, batch_format)
+            rows = []
+    if rows:
+        yield _rows_to_batch(rows, batch_format)
+
+
+def record_batch_length(batch: RecordBatch) -> int:
+    """
+    The number of records in a record batch
+
+    :param batch: the record batch
+    :return: the number of records
+    """
+    if isinstance(batch, dict):
+        return len(next(iter(batch.values()), []))
+    return batch.num_rows
+
+
+def record_batch_records(batch: RecordBatch) -> List[SourceDataRecord]:
+    """
+    Convert a record batch back into source data records
+
+    :param batch: the record batch
+    :return: the source data records
+    """
+    if isinstance(batch, dict):
+        names = list(batch.keys())
+        return [dict(zip(names, values)) for values in zip(*batch.values())]
+    return batch.to_pylist()
+
+
+def _rows_to_batch(
+    rows: List[SourceDataRecord], batch_format: RecordBatchFormat
+) -> RecordBatch:
+    if batch_format == RecordBatchFormat.ARROW:
+        return pyarrow.RecordBatch.from_pylist(rows)
+
+    # records may not all have the same keys, missing values are None
+    names: Dict[str, None] = {}
+    for row in rows:
+        names.update(dict.fromkeys(row))
+    return {name: [row.get(name) for row in rows] for name in names}
+
+
+def _require_pyarrow() -> None:
+    if pyarrow is None:
+        raise ImportError(
+            "Arrow record batches require pyarrow, install it with: pip install iterable-data-import[arrow]"
+        )
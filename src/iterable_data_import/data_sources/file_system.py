@@ -2,26 +2,82 @@ import json
 import csv
 import logging
 from pathlib import PurePath
-from typing import Generator
+from typing import BinaryIO, Dict, Generator, Iterator, List, Optional, Sequence
+
+try:
+    import pyarrow
+    import pyarrow.csv
+    import pyarrow.json
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - pyarrow is an optional dependency
+    pyarrow = None
 
 from iterable_data_import import UnsupportedFileFormatError
+from iterable_data_import.data_sources.compression import (
+    Compression,
+    open_source_file,
+    seek_forward,
+)
 from iterable_data_import.data_sources.data_source import (
     DataSource,
     FileFormat,
+    RecordBatch,
+    RecordBatchFormat,
     SourceDataRecord,
+    SourcePosition,
+    to_record_batches,
 )
 
+# parquet records are read this many rows at a time, within a row group
+PARQUET_READ_BATCH_SIZE = 10000
+
 
 class FileSystem(DataSource):
     """
     Class responsible for extracting source data records from the local file system
 
-    Note: CSV records are parsed into dictionaries of type Dict[str, str]
+    Files are read from start_position when it's provided, e.g. to resume an import
+    from a checkpoint. The position after each record is available as position.
+
+    Compressed files are decompressed as they're read. The compression is detected
+    from the file extension (.gz, .bz2, .xz or .zst) unless compression is provided.
+    Positions in compressed files are offsets in the decompressed data, so resuming
+    decompresses and skips the records before start_position.
+
+    Record batches are read with pyarrow's columnar CSV and JSON readers when pyarrow
+    is installed. Otherwise CSV rows are read into columns without creating a
+    dictionary per row. A FileSystem should either be iterated or read in batches,
+    not both.
+
+    Parquet files are read a row group at a time with pyarrow, so memory use is
+    bounded by the size of a row group. Only the columns listed in columns are read,
+    or every column if columns is None. Parquet records keep their column types, e.g.
+    integers, timestamps and nested lists and structs. Parquet requires pyarrow.
+
+    Note: CSV records are parsed into dictionaries of type Dict[str, str], and CSV
+    record batches contain string columns
     """
 
-    def __init__(self, file_path: PurePath, file_format: FileFormat) -> None:
+    def __init__(
+        self,
+        file_path: PurePath,
+        file_format: FileFormat,
+        start_position: Optional[SourcePosition] = None,
+        encoding: str = "utf-8",
+        compression: Optional[Compression] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> None:
+        if columns is not None and file_format != FileFormat.PARQUET:
+            raise ValueError(f"columns can't be selected from {file_format} files")
+
         self.file_format = file_format
         self.file_path = file_path
+        self.start_position = start_position
+        self.encoding = encoding
+        self.compression = compression
+        self.columns = list(columns) if columns is not None else None
+        self._record_index = start_position.record_index if start_position else 0
+        self._offset = start_position.offset if start_position else 0
         self._logger = logging.getLogger("datasources.FileSystem")
         self.source_data_generator = self._get_generator()
 
@@ -31,24 +87,196 @@ class FileSystem(DataSource):
     def __next__(self):
         return next(self.source_data_generator)
 
+    @property
+    def position(self) -> SourcePosition:
+        return SourcePosition(self._record_index, self._offset)
+
+    def batches(
+        self, batch_size: int, batch_format: RecordBatchFormat
+    ) -> Iterator[RecordBatch]:
+        if self.file_format == FileFormat.CSV:
+            if pyarrow is not None:
+                return self._read_csv_with_arrow(batch_size, batch_format)
+            if batch_format == RecordBatchFormat.COLUMNS:
+                return self._read_csv_columns(batch_size)
+
+        elif self.file_format == FileFormat.NEWLINE_DELIMITED_JSON:
+            if pyarrow is not None and batch_format == RecordBatchFormat.ARROW:
+                return self._read_json_with_arrow(batch_size)
+
+        elif self.file_format == FileFormat.PARQUET:
+            return _slice_batches(
+                self._read_parquet(batch_size), batch_size, batch_format
+            )
+
+        else:
+            raise UnsupportedFileFormatError(
+                f"{self.file_format} is not a supported file format"
+            )
+
+        # JSON objects are already parsed by the C json decoder one line at a time
+        return to_record_batches(self, batch_size, batch_format)
+
+    def _read_csv_with_arrow(
+        self, batch_size: int, batch_format: RecordBatchFormat
+    ) -> Iterator[RecordBatch]:
+        self._logger.debug(f"reading CSV batches from {self.file_path} with pyarrow")
+        with open_source_file(self.file_path, self.compression) as f:
+            header = self._read_csv_header(f)
+            if header is None:
+                return
+            # every column is read as a string, the same as csv.DictReader
+            reader = pyarrow.csv.open_csv(
+                f,
+                read_options=pyarrow.csv.ReadOptions(
+                    column_names=header, encoding=self.encoding
+                ),
+                parse_options=pyarrow.csv.ParseOptions(newlines_in_values=True),
+                convert_options=pyarrow.csv.ConvertOptions(
+                    column_types={name: pyarrow.string() for name in header},
+                    strings_can_be_null=False,
+                ),
+            )
+            yield from _slice_batches(reader, batch_size, batch_format)
+
+    def _read_csv_columns(self, batch_size: int) -> Iterator[RecordBatch]:
+        self._logger.debug(f"reading CSV batches from {self.file_path}")
+        with open_source_file(self.file_path, self.compression) as f:
+            lines = self._read_lines(f)
+            reader = csv.reader(lines)
+            header = next(reader, None)
+            if header is None:
+                return
+            if self.start_position:
+                seek_forward(f, self.start_position.offset)
+
+            rows = []
+            for row in reader:
+                # csv.DictReader skips blank lines too
+                if row:
+                    rows.append(row)
+                if len(rows) >= batch_size:
+                    yield _csv_columns(header, rows)
+                    rows = []
+            if rows:
+                yield _csv_columns(header, rows)
+
+    def _read_json_with_arrow(self, batch_size: int) -> Iterator[RecordBatch]:
+        self._logger.debug(f"reading JSON batches from {self.file_path} with pyarrow")
+        with open_source_file(self.file_path, self.compression) as f:
+            if self.start_position:
+                seek_forward(f, self.start_position.offset)
+            if hasattr(pyarrow.json, "open_json"):
+                reader = pyarrow.json.open_json(f)
+            else:
+                # pyarrow < 19 can only read the whole file at once
+                reader = pyarrow.json.read_json(f).to_batches()
+            yield from _slice_batches(reader, batch_size, RecordBatchFormat.ARROW)
+
+    def _read_parquet(self, batch_size: int) -> Iterator["pyarrow.RecordBatch"]:
+        if pyarrow is None:
+            raise ImportError(
+                "Parquet files require pyarrow, install it with: pip install iterable-data-import[parquet]"
+            )
+
+        self._logger.debug(f"reading parquet data from {self.file_path}")
+        with pyarrow.parquet.ParquetFile(self.file_path) as f:
+            # whole row groups before the start position aren't read at all
+            skip = self._record_index
+            row_groups = []
+            for i in range(f.num_row_groups):
+                num_rows = f.metadata.row_group(i).num_rows
+                if not row_groups and skip >= num_rows:
+                    skip -= num_rows
+                    continue
+                row_groups.append(i)
+            if not row_groups:
+                return
+
+            for batch in f.iter_batches(
+                batch_size=batch_size, row_groups=row_groups, columns=self.columns
+            ):
+                if skip:
+                    batch, skip = batch.slice(skip), max(skip - batch.num_rows, 0)
+                if batch.num_rows:
+                    yield batch
+
+    def _read_parquet_records(self) -> Generator[SourceDataRecord, None, None]:
+        for batch in self._read_parquet(PARQUET_READ_BATCH_SIZE):
+            for record in batch.to_pylist():
+                self._record_index += 1
+                self._offset = self._record_index
+                yield record
+
+    def _read_csv_header(self, f: BinaryIO) -> Optional[List[str]]:
+        # leaves f at the first record to read
+        header = next(csv.reader(self._read_lines(f)), None)
+        if self.start_position:
+            seek_forward(f, self.start_position.offset)
+        return header
+
     def _get_generator(self) -> Generator[SourceDataRecord, None, None]:
         self._logger.debug(f"reading {self.file_format} data from {self.file_path}")
         if self.file_format == FileFormat.CSV:
-            with open(self.file_path, "r", newline="") as f:
-                reader = csv.DictReader(f)
+            # files are read as bytes so the offset of each record is known
+            with open_source_file(self.file_path, self.compression) as f:
+                lines = self._read_lines(f)
+                header = next(csv.reader(lines), None)
+                if header is None:
+                    return
+                if self.start_position:
+                    seek_forward(f, self.start_position.offset)
+                    self._offset = self.start_position.offset
+
+                reader = csv.DictReader(lines, fieldnames=header)
                 for record in reader:
                     self._logger.debug(
                         f"reading record from {self.file_path}: {record}"
                     )
+                    self._record_index += 1
                     yield record
 
         elif self.file_format == FileFormat.NEWLINE_DELIMITED_JSON:
-            with open(self.file_path, "r") as f:
-                for line in f:
+            with open_source_file(self.file_path, self.compression) as f:
+                if self.start_position:
+                    seek_forward(f, self.start_position.offset)
+                for line in self._read_lines(f):
                     self._logger.debug(f"reading line from {self.file_path}: {line}")
+                    self._record_index += 1
                     yield json.loads(line)
 
+        elif self.file_format == FileFormat.PARQUET:
+            yield from self._read_parquet_records()
+
         else:
             raise UnsupportedFileFormatError(
                 f"{self.file_format} is not a supported file format"
             )
+
+    def _read_lines(self, f: BinaryIO) -> Iterator[str]:
+        # the csv module pulls exactly the lines of one record at a time, so the offset
+        # is at the end of the last record read
+        for line in f:
+            self._offset += len(line)
+            yield line.decode(self.encoding)
+
+
+def _slice_batches(
+    reader: Iterator["pyarrow.RecordBatch"],
+    batch_size: int,
+    batch_format: RecordBatchFormat,
+) -> Iterator[RecordBatch]:
+    for batch in reader:
+        for start in range(0, batch.num_rows, batch_size):
+            arrow_batch = batch.slice(start, batch_size)
+            if batch_format == RecordBatchFormat.ARROW:
+                yield arrow_batch
+            else:
+                yield arrow_batch.to_pydict()
+
+
+def _csv_columns(header: List[str], rows: List[List[str]]) -> Dict[str, List[str]]:
+    # short rows are padded with None and extra values dropped, like csv.DictReader
+    size = len(header)
+    rows = [row if len(row) == size else (row + [None] * size)[:size] for row in rows]
+    return {name: list(values) for name, values in zip(header, zip(*rows))}
@@ -0,0 +1,304 @@
+import json
+import logging
+import mmap
+import os
+import re
+import sys
+from array import array
+from pathlib import PurePath
+from typing import Generator, Iterator, Optional
+
+from iterable_data_import.data_sources.data_source import (
+    DataSource,
+    SourceDataRecord,
+    SourcePosition,
+)
+
+# the offset of every INDEX_STRIDE-th line is indexed, which keeps the index small
+# while any line can still be found by skipping at most INDEX_STRIDE - 1 lines
+INDEX_STRIDE = 1000
+INDEX_SUFFIX = ".lineidx"
+_INDEX_VERSION = 1
+
+# records are split out of the mapped file in blocks of about this size
+READ_BLOCK_SIZE = 1024 * 1024
+
+_decoder = json.JSONDecoder()
+
+
+class LineIndex:
+    """
+    An index of the byte offsets of lines in a newline delimited file
+
+    offsets holds the offset of the start of every stride-th line, i.e. offsets[i] is
+    the offset of line i * stride. The size and modification time of the indexed file
+    are kept so that a saved index can be checked against the file before it's used.
+    """
+
+    def __init__(
+        self,
+        stride: int,
+        offsets: "array[int]",
+        line_count: int,
+        file_size: int,
+        file_mtime_ns: int,
+    ) -> None:
+        self.stride = stride
+        self.offsets = offsets
+        self.line_count = line_count
+        self.file_size = file_size
+        self.file_mtime_ns = file_mtime_ns
+
+    @classmethod
+    def build(
+        cls, data: bytes, file_size: int, file_mtime_ns: int, stride: int = INDEX_STRIDE
+    ) -> "LineIndex":
+        """
+        Index the lines of a file
+
+        :param data: the file contents, e.g. a memory map of the file
+        :param file_size: size of the file
+        :param file_mtime_ns: modification time of the file
+        :param stride: how many lines apart the indexed offsets are
+        :return: the index
+        """
+        # matching stride lines at a time keeps the scan in the regex engine
+        lines = re.compile(b"(?:[^\\n]*\\n){%d}" % stride)
+        offsets = array("Q", [0])
+        position = 0
+        match = lines.match(data, position)
+        while match:
+            position = match.end()
+            offsets.append(position)
+            match = lines.match(data, position)
+
+        line_count = (len(offsets) - 1) * stride
+        remainder = data[position:]
+        line_count += remainder.count(b"\n")
+        if remainder and not remainder.endswith(b"\n"):
+            line_count += 1
+        if offsets[-1] == file_size:
+            offsets.pop()
+        return cls(stride, offsets, line_count, file_size, file_mtime_ns)
+
+    @classmethod
+    def load(
+        cls, index_path: PurePath, file_size: int, file_mtime_ns: int
+    ) -> Optional["LineIndex"]:
+        """
+        Load a saved index
+
+        :param index_path: the index file path
+        :param file_size: current size of the indexed file
+        :param file_mtime_ns: current modification time of the indexed file
+        :return: the index, or None if there's no index or it's out of date
+        """
+        try:
+            with open(index_path, "rb") as f:
+                header = json.loads(f.readline())
+                if (
+                    header.get("version") != _INDEX_VERSION
+                    or header["file_size"] != file_size
+                    or header["file_mtime_ns"] != file_mtime_ns
+                ):
+                    return None
+                offsets = array("Q")
+                offsets.frombytes(f.read())
+            if header["byteorder"] != sys.byteorder:
+                offsets.byteswap()
+            stride = header["stride"]
+            line_count = header["line_count"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+        return cls(stride, offsets, line_count, file_size, file_mtime_ns)
+
+    def save(self, index_path: PurePath) -> None:
+        """
+        Save the index. The file is replaced atomically.
+
+        :param index_path: the index file path
+        :return: none
+        """
+        header = {
+            "version": _INDEX_VERSION,
+            "stride": self.stride,
+            "line_count": self.line_count,
+            "file_size": self.file_size,
+            "file_mtime_ns": self.file_mtime_ns,
+            "byteorder": sys.byteorder,
+        }
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            f.write(self.offsets.tobytes())
+        os.replace(tmp_path, index_path)
+
+
+class MmapNdjsonFileSystem(DataSource):
+    """
+    Class responsible for extracting source data records from a newline delimited JSON
+    file on the local file system by memory mapping it
+
+    A line offset index of the file is built the first time it's needed and saved
+    next to the file (at index_path, <file_path>.lineidx by default) unless
+    cache_index is False. The index gives the number of records in the file as
+    record_count, finds the position of any record with position_of, and lets split
+    divide the file into byte ranges on line boundaries that can be read by separate
+    processes. IterableDataImport.run uses split to read and map the file in its worker
+    processes.
+
+    Records are read from start_position up to end_offset, or the end of the file.
+    """
+
+    def __init__(
+        self,
+        file_path: PurePath,
+        start_position: Optional[SourcePosition] = None,
+        end_offset: Optional[int] = None,
+        index_path: Optional[PurePath] = None,
+        cache_index: bool = True,
+        encoding: str = "utf-8",
+    ) -> None:
+        self.file_path = file_path
+        self.start_position = start_position
+        self.end_offset = end_offset
+        self.index_path = index_path or f"{file_path}{INDEX_SUFFIX}"
+        self.cache_index = cache_index
+        self.encoding = encoding
+        self._record_index = start_position.record_index if start_position else 0
+        self._offset = start_position.offset if start_position else 0
+        self._index: Optional[LineIndex] = None
+        self._generator: Optional[Generator[SourceDataRecord, None, None]] = None
+        self._logger = logging.getLogger("datasources.MmapNdjsonFileSystem")
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        # created lazily so that unread sources can be sent to worker processes
+        if self._generator is None:
+            self._generator = self._get_generator()
+        return next(self._generator)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_generator"] = None
+        state["_index"] = None
+        return state
+
+    @property
+    def position(self) -> SourcePosition:
+        return SourcePosition(self._record_index, self._offset)
+
+    @property
+    def index(self) -> LineIndex:
+        """
+        The line offset index of the file, loaded or built on first use
+        """
+        if self._index is None:
+            self._index = self._load_index()
+        return self._index
+
+    @property
+    def record_count(self) -> int:
+        """
+        The number of records in the file
+        """
+        return self.index.line_count
+
+    def position_of(self, record_index: int) -> SourcePosition:
+        """
+        Find the position just before a record, e.g. to resume from a record index
+
+        :param record_index: the number of records before the position
+        :return: the position
+        """
+        if record_index >= self.record_count:
+            return SourcePosition(self.record_count, self.index.file_size)
+
+        block = record_index // self.index.stride
+        offset = self.index.offsets[block]
+        skip = record_index - block * self.index.stride
+        if skip:
+            with open(self.file_path, "rb") as f, _map(f) as mm:
+                for _ in range(skip):
+                    offset = mm.find(b"\n", offset) + 1
+        return SourcePosition(record_index, offset)
+
+    def split(self, records_per_part: int) -> Iterator["MmapNdjsonFileSystem"]:
+        """
+        Split the remaining records into parts of records_per_part records. Each part is
+        a data source for a byte range of the file starting and ending on a line
+        boundary.
+
+        :param records_per_part: number of records in each part
+        :return: iterator of data sources for the parts
+        """
+        if records_per_part < 1:
+            raise ValueError(
+                f"records_per_part must be greater than or equal to 1, {records_per_part} provided"
+            )
+
+        end = self.position_of(self.record_count)
+        if self.end_offset is not None:
+            end = SourcePosition(end.record_index, min(end.offset, self.end_offset))
+        start = self.position
+        while start.offset < end.offset:
+            part_end = self.position_of(start.record_index + records_per_part)
+            end_offset = min(part_end.offset, end.offset)
+            yield MmapNdjsonFileSystem(
+                self.file_path,
+                start_position=start,
+                end_offset=end_offset,
+                index_path=self.index_path,
+                cache_index=self.cache_index,
+                encoding=self.encoding,
+            )
+            start = part_end
+
+    def _load_index(self) -> LineIndex:
+        stat = os.stat(self.file_path)
+        if self.cache_index:
+            index = LineIndex.load(self.index_path, stat.st_size, stat.st_mtime_ns)
+            if index is not None:
+                return index
+
+        self._logger.info(f"indexing lines of {self.file_path}")
+        if stat.st_size == 0:
+            index = LineIndex(INDEX_STRIDE, array("Q"), 0, 0, stat.st_mtime_ns)
+        else:
+            with open(self.file_path, "rb") as f, _map(f) as mm:
+                index = LineIndex.build(mm, stat.st_size, stat.st_mtime_ns)
+        if self.cache_index:
+            index.save(self.index_path)
+        return index
+
+    def _get_generator(self) -> Generator[SourceDataRecord, None, None]:
+        self._logger.debug(f"reading newline_delimited_json data from {self.file_path}")
+        with open(self.file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with _map(f) as mm:
+                end = len(mm) if self.end_offset is None else self.end_offset
+                position = self._offset
+                while position < end:
+                    # lines are split a block at a time, cut at the last whole line
+                    block_end = min(position + READ_BLOCK_SIZE, end)
+                    if block_end < end:
+                        newline = mm.rfind(b"\n", position, block_end)
+                        if newline == -1:
+                            newline = mm.find(b"\n", block_end, end)
+                        block_end = end if newline == -1 else newline + 1
+                    lines = mm[position:block_end].split(b"\n")
+                    if not lines[-1]:
+                        lines.pop()
+                    for line in lines:
+                        self._offset = min(self._offset + len(line) + 1, block_end)
+                        self._record_index += 1
+                        yield _decoder.decode(line.decode(self.encoding))
+                    position = block_end
+
+
+def _map(f) -> mmap.mmap:
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
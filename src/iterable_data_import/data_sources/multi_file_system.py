@@ -0,0 +1,218 @@
+import glob
+import logging
+import os
+import queue
+import threading
+from pathlib import Path, PurePath
+from typing import Dict, Generator, List, Optional, Sequence, Set, Tuple, Union
+
+from iterable_data_import.data_sources.data_source import (
+    DataSource,
+    FileFormat,
+    SourceDataRecord,
+    SourcePosition,
+)
+from iterable_data_import.data_sources.compression import Compression
+from iterable_data_import.data_sources.file_system import FileSystem
+
+# records are handed from the reader threads to the import in chunks of this size to
+# keep queue overhead per record low
+READ_CHUNK_SIZE = 100
+
+# a chunk of records read from a file and the file position after the last one
+_Chunk = Tuple[PurePath, List[SourceDataRecord], SourcePosition]
+
+
+class _FileDone:
+    def __init__(self, file_path: PurePath) -> None:
+        self.file_path = file_path
+
+
+class _ReaderFailed:
+    def __init__(self, file_path: PurePath, error: BaseException) -> None:
+        self.file_path = file_path
+        self.error = error
+
+
+class MultiFileSystem(DataSource):
+    """
+    Class responsible for extracting source data records from many files on the local
+    file system, e.g. the part files of an export
+
+    path is a directory, in which case every file in it is read, or a glob pattern
+    such as exports/part-*.csv. Files are read concurrently by reader_threads threads
+    and their records are interleaved, so a large or slow file doesn't hold up the
+    others. At most about prefetch records are read ahead of the import. Compressed
+    files are detected by extension and columns selects the columns read from
+    Parquet files, see [[FileSystem]].
+
+    The position in each file is available as file_positions. Checkpoints aren't
+    supported since records from different files are interleaved.
+    """
+
+    def __init__(
+        self,
+        path: Union[PurePath, str],
+        file_format: FileFormat,
+        reader_threads: int = 4,
+        prefetch: int = 10000,
+        encoding: str = "utf-8",
+        compression: Optional[Compression] = None,
+        columns: Optional[Sequence[str]] = None,
+    ) -> None:
+        if reader_threads < 1:
+            raise ValueError(
+                f"reader_threads must be greater than or equal to 1, {reader_threads} provided"
+            )
+
+        if prefetch < 1:
+            raise ValueError(
+                f"prefetch must be greater than or equal to 1, {prefetch} provided"
+            )
+
+        self.path = path
+        self.file_format = file_format
+        self.reader_threads = reader_threads
+        self.prefetch = prefetch
+        self.encoding = encoding
+        self.compression = compression
+        self.columns = columns
+        self.file_paths = find_files(path)
+        self.file_positions: Dict[PurePath, SourcePosition] = {}
+        self.completed_files: Set[PurePath] = set()
+        self._logger = logging.getLogger("datasources.MultiFileSystem")
+        self.source_data_generator = self._get_generator()
+
+    def __iter__(self):
+        return self.source_data_generator
+
+    def __next__(self):
+        return next(self.source_data_generator)
+
+    def _get_generator(self) -> Generator[SourceDataRecord, None, None]:
+        self._logger.debug(
+            f"reading {len(self.file_paths)} {self.file_format} files from {self.path}"
+        )
+        files: "queue.Queue[PurePath]" = queue.Queue()
+        for file_path in self.file_paths:
+            files.put(file_path)
+        chunks: "queue.Queue[Union[_Chunk, _FileDone, _ReaderFailed]]" = queue.Queue(
+            maxsize=max(1, self.prefetch // READ_CHUNK_SIZE)
+        )
+        stop = threading.Event()
+        readers = [
+            threading.Thread(
+                target=self._read_files,
+                args=(files, chunks, stop),
+                name=f"MultiFileSystem-reader-{i}",
+                daemon=True,
+            )
+            for i in range(min(self.reader_threads, len(self.file_paths)))
+        ]
+        for reader in readers:
+            reader.start()
+
+        try:
+            remaining = len(self.file_paths)
+            while remaining > 0:
+                item = chunks.get()
+                if isinstance(item, _ReaderFailed):
+                    raise item.error
+                if isinstance(item, _FileDone):
+                    remaining -= 1
+                    self.completed_files.add(item.file_path)
+                    self._logger.info(f"finished reading {item.file_path}")
+                    continue
+
+                file_path, records, position = item
+                self.file_positions[file_path] = position
+                yield from records
+        finally:
+            # stop the readers if the import ends early
+            stop.set()
+            for reader in readers:
+                while reader.is_alive():
+                    _drain(chunks)
+                    reader.join(timeout=0.01)
+
+    def _read_files(
+        self,
+        files: "queue.Queue[PurePath]",
+        chunks: "queue.Queue[Union[_Chunk, _FileDone, _ReaderFailed]]",
+        stop: threading.Event,
+    ) -> None:
+        while not stop.is_set():
+            try:
+                file_path = files.get_nowait()
+            except queue.Empty:
+                return
+
+            try:
+                source = FileSystem(
+                    file_path,
+                    self.file_format,
+                    encoding=self.encoding,
+                    compression=self.compression,
+                    columns=self.columns,
+                )
+                records = []
+                for record in source:
+                    records.append(record)
+                    if len(records) >= READ_CHUNK_SIZE:
+                        if not _put(
+                            chunks, (file_path, records, source.position), stop
+                        ):
+                            return
+                        records = []
+                if records and not _put(
+                    chunks, (file_path, records, source.position), stop
+                ):
+                    return
+                _put(chunks, _FileDone(file_path), stop)
+            except Exception as e:
+                self._logger.error(f"failed to read {file_path}: {e}")
+                _put(chunks, _ReaderFailed(file_path, e), stop)
+                return
+
+
+def find_files(path: Union[PurePath, str]) -> List[PurePath]:
+    """
+    Find the files matched by a directory or glob pattern
+
+    :param path: a directory or glob pattern
+    :return: the matching file paths, sorted by name
+    """
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in os.listdir(path)]
+    else:
+        paths = glob.glob(str(path))
+    return sorted(Path(p) for p in paths if os.path.isfile(p))
+
+
+def is_multi_file_path(path: Union[PurePath, str]) -> bool:
+    """
+    Whether a path refers to many files, i.e. is a directory or glob pattern
+
+    :param path: the path
+    :return: true if the path is a directory or glob pattern
+    """
+    return os.path.isdir(path) or any(c in str(path) for c in "*?[")
+
+
+def _put(chunks: queue.Queue, item: object, stop: threading.Event) -> bool:
+    # blocks while the prefetch queue is full, giving up once the import stops
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _drain(chunks: queue.Queue) -> None:
+    try:
+        while True:
+            chunks.get_nowait()
+    except queue.Empty:
+        pass
@@ -0,0 +1,187 @@
+import logging
+import os
+import zlib
+from pathlib import Path, PurePath
+from typing import Callable, Dict, Generator, Optional, Tuple
+
+from iterable_data_import.data_sources.data_source import (
+    DataSource,
+    SourceDataRecord,
+    SourcePosition,
+)
+
+ShardKeyFunction = Callable[[SourceDataRecord], Optional[str]]
+
+
+def user_shard_key(record: SourceDataRecord) -> Optional[str]:
+    """
+    The default shard key, the record's email or else its user ID. Emails are
+    compared case insensitively, like Iterable does.
+
+    :param record: the source data record
+    :return: the shard key, or None if the record has neither field
+    """
+    email = record.get("email")
+    if email:
+        return str(email).strip().lower()
+    for field in ("userId", "user_id"):
+        user_id = record.get(field)
+        if user_id:
+            return f"userId:{user_id}"
+    return None
+
+
+def shard_of(key: str, shard_count: int) -> int:
+    """
+    The shard a key belongs to. The hash is stable across processes and machines,
+    unlike the built in hash function.
+
+    :param key: the shard key
+    :param shard_count: the number of shards
+    :return: the shard index, from 0 to shard_count - 1
+    """
+    return zlib.crc32(key.encode("utf-8")) % shard_count
+
+
+def parse_shard(shard: str) -> Tuple[int, int]:
+    """
+    Parse a shard written as "<index>/<count>", e.g. "0/4" is the first of four shards
+
+    :param shard: the shard
+    :return: the shard index and shard count
+    """
+    try:
+        index, count = (int(part) for part in shard.split("/"))
+    except ValueError:
+        raise ValueError(
+            f'shard must be written as "<index>/<count>", {shard} provided'
+        )
+
+    if count < 1:
+        raise ValueError(
+            f"shard count must be greater than or equal to 1, {count} provided"
+        )
+
+    if not 0 <= index < count:
+        raise ValueError(
+            f"shard index must be between 0 and {count - 1}, {index} provided"
+        )
+    return index, count
+
+
+def shard_path(
+    path: Optional[PurePath], shard_index: int, shard_count: int
+) -> Optional[PurePath]:
+    """
+    A per shard version of an output path, e.g. errors.json becomes
+    errors.shard-0-of-4.json, so shards running side by side don't share files
+
+    :param path: the path
+    :param shard_index: the shard index
+    :param shard_count: the number of shards
+    :return: the shard's path, or None if path is None
+    """
+    if path is None:
+        return None
+    root, extension = os.path.splitext(str(path))
+    return Path(f"{root}.shard-{shard_index}-of-{shard_count}{extension}")
+
+
+def shard_rate_limits(
+    rate_limits: Optional[Dict[str, float]], shard_count: int
+) -> Optional[Dict[str, float]]:
+    """
+    Split per endpoint rate limits evenly between shards so that together they stay
+    within the project's limits
+
+    :param rate_limits: requests per second for each API path
+    :param shard_count: the number of shards
+    :return: each shard's requests per second for each API path
+    """
+    if rate_limits is None:
+        return None
+    return {path: rate / shard_count for path, rate in rate_limits.items()}
+
+
+class ShardedDataSource(DataSource):
+    """
+    Class responsible for extracting the source data records that belong to one shard
+    from another data source
+
+    Running shard_count imports over the same source, each with a different
+    shard_index, imports every record exactly once. Records are assigned to shards by
+    a stable hash of the key returned by key_function, by default the record's email
+    or user ID, so every update to a user is imported by the same shard in source
+    order. Records without a key are spread over the shards by their index in the
+    source, so a warning is logged when one is found and keyless_records counts
+    them. Pass a key_function that finds the user in sources with other columns.
+
+    The position is the position of the wrapped data source, so a shard resumes from
+    its own checkpoint and skips the records of other shards again.
+    """
+
+    def __init__(
+        self,
+        data_source: DataSource,
+        shard_index: int,
+        shard_count: int,
+        key_function: ShardKeyFunction = user_shard_key,
+    ) -> None:
+        if shard_count < 1:
+            raise ValueError(
+                f"shard_count must be greater than or equal to 1, {shard_count} provided"
+            )
+
+        if not 0 <= shard_index < shard_count:
+            raise ValueError(
+                f"shard_index must be between 0 and {shard_count - 1}, {shard_index} provided"
+            )
+
+        self.data_source = data_source
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.key_function = key_function
+        self.keyless_records = 0
+        self._logger = logging.getLogger("datasources.ShardedDataSource")
+        self.source_data_generator = self._get_generator()
+
+    def __iter__(self):
+        return self.source_data_generator
+
+    def __next__(self):
+        return next(self.source_data_generator)
+
+    @property
+    def position(self) -> Optional[SourcePosition]:
+        return getattr(self.data_source, "position", None)
+
+    def _get_generator(self) -> Generator[SourceDataRecord, None, None]:
+        self._logger.debug(
+            f"reading shard {self.shard_index} of {self.shard_count} from {self.data_source}"
+        )
+        position = self.position
+        record_index = position.record_index if position else 0
+        for record in self.data_source:
+            key = self.key_function(record)
+            if key is None:
+                self._warn_keyless(record_index)
+                shard = record_index % self.shard_count
+            else:
+                shard = shard_of(key, self.shard_count)
+            record_index += 1
+            if shard == self.shard_index:
+                yield record
+
+        if self.keyless_records:
+            self._logger.warning(
+                f"{self.keyless_records} records had no shard key and were spread over the shards"
+            )
+
+    def _warn_keyless(self, record_index: int) -> None:
+        self.keyless_records += 1
+        if self.keyless_records == 1:
+            self._logger.warning(
+                f"record {record_index + 1} has no shard key, records without one are "
+                "spread over the shards and a user's updates may be imported out of "
+                "order, provide a key_function that identifies the user"
+            )
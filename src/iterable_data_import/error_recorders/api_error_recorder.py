@@ -1,7 +1,14 @@
 import json
 import logging
 from pathlib import PurePath
-from typing import Dict
+from typing import Dict, Optional
+
+from iterable_data_import.error_recorders.buffered_file_writer import (
+    BufferedFileWriter,
+    DEFAULT_FLUSH_SIZE,
+)
+from iterable_data_import.importers.iterable_request import IterableRequest
+from iterable_data_import.json_serializer import JsonSerializer
 
 
 class ApiErrorRecorder:
@@ -27,15 +34,84 @@ class ApiErrorRecorder:
         """
         pass
 
+    def record_serialized(
+        self, response_status: int, response_body: str, request_body: bytes
+    ) -> None:
+        """
+        Record a single API error whose request body is already encoded as JSON, e.g.
+        by [[IterableRequest.serialize]]. Recorders that write JSON should override
+        this to reuse the encoded body instead of decoding it.
+
+        :param response_status: the API response HTTP status code
+        :param response_body: the API response body
+        :param request_body: the request body encoded as UTF-8 JSON
+        :return: none
+        """
+        self.record(response_status, response_body, json.loads(request_body))
+
+    def record_request(
+        self,
+        response_status: int,
+        response_body: str,
+        request: IterableRequest,
+        serializer: JsonSerializer,
+    ) -> None:
+        """
+        Record a single API error for the request that failed. The importers call this
+        method, by default it records the encoded request body with
+        record_serialized. Recorders that don't need the whole body can override it.
+
+        :param response_status: the API response HTTP status code
+        :param response_body: the API response body
+        :param request: the request that failed
+        :param serializer: the serializer used to encode the request body
+        :return: none
+        """
+        self.record_serialized(
+            response_status, response_body, request.serialize(serializer)
+        )
+
+    def flush(self) -> None:
+        """
+        Persist the errors recorded so far, for recorders that buffer them
+
+        :return: none
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Persist the errors recorded so far and release any resources. Called by the
+        importers on shutdown.
+
+        :return: none
+        """
+        pass
+
 
 class FileSystemApiErrorRecorder(ApiErrorRecorder):
     """
     An API error recorder that writes errors to the local file system. Errors are persisted
     as newline delimited JSON objects
+
+    By default each error is written as soon as it's recorded. With a flush_interval,
+    errors are buffered and written by a background thread every flush_interval
+    seconds, or once flush_size bytes are buffered, which is much faster when many
+    requests fail. Call close, or the importer's shutdown, to write the last errors.
     """
 
-    def __init__(self, out_file_path: PurePath) -> None:
+    def __init__(
+        self,
+        out_file_path: PurePath,
+        flush_interval: Optional[float] = None,
+        flush_size: int = DEFAULT_FLUSH_SIZE,
+    ) -> None:
         self.out_file_path = out_file_path
+        self._writer = (
+            BufferedFileWriter(out_file_path, flush_interval, flush_size)
+            if flush_interval is not None
+            else None
+        )
         self._logger = logging.getLogger(
             "error_recorders.LocalFileSystemApiErrorRecorder"
         )
@@ -43,11 +119,37 @@ class FileSystemApiErrorRecorder(ApiErrorRecorder):
     def record(
         self, response_status: int, response_body: str, request_body: Dict[str, object]
     ):
-        # for now eagerly write errors to the file system in case the program terminates unexpectedly
-        with open(self.out_file_path, "a") as f:
-            error = _create_error(response_status, response_body, request_body)
+        error = _create_error(response_status, response_body, request_body)
+        if self._logger.isEnabledFor(logging.DEBUG):
             self._logger.debug(f"logging error {error}")
-            f.write(json.dumps(error) + "\n")
+        self._write((json.dumps(error) + "\n").encode("utf-8"))
+
+    def record_serialized(
+        self, response_status: int, response_body: str, request_body: bytes
+    ):
+        # splice the encoded request body into the error rather than decoding and
+        # encoding it again
+        error = _create_error(response_status, response_body, None)
+        head = json.dumps(error)[: -len("null}")].encode("utf-8")
+        self._logger.debug(f"logging error {response_status} {response_body}")
+        self._write(head + request_body + b"}\n")
+
+    def flush(self) -> None:
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+    def _write(self, data: bytes) -> None:
+        if self._writer is not None:
+            self._writer.write(data)
+            return
+
+        # eagerly write errors to the file system in case the program terminates unexpectedly
+        with open(self.out_file_path, "ab") as f:
+            f.write(data)
 
 
 class NoOpApiErrorRecorder(ApiErrorRecorder):
@@ -64,6 +166,12 @@ class NoOpApiErrorRecorder(ApiErrorRecorder):
         error = _create_error(response_status, response_body, request_body)
         self._logger.debug(f"no op logging error {error}")
 
+    def record_serialized(
+        self, response_status: int, response_body: str, request_body: bytes
+    ):
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self.record(response_status, response_body, json.loads(request_body))
+
 
 def _create_error(
     response_status: int, response_body: str, request_body: Dict[str, object]
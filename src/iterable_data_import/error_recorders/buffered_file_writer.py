@@ -0,0 +1,127 @@
+import logging
+import threading
+from pathlib import PurePath
+from typing import BinaryIO, List, Optional
+
+# flush once this many bytes are buffered, whatever the flush interval
+DEFAULT_FLUSH_SIZE = 1024 * 1024
+
+
+class BufferedFileWriter:
+    """
+    Appends to a file through an in memory buffer that a background thread flushes
+    every flush_interval seconds, or straight away once flush_size bytes are buffered
+
+    The file is opened once and kept open until close, rather than opened for every
+    write. A crash loses at most the writes of the last flush interval. Writes made
+    after close reopen the file. Safe to use from many threads.
+    """
+
+    def __init__(
+        self,
+        file_path: PurePath,
+        flush_interval: float = 1.0,
+        flush_size: int = DEFAULT_FLUSH_SIZE,
+    ) -> None:
+        if flush_interval <= 0:
+            raise ValueError(
+                f"flush_interval must be greater than 0, {flush_interval} provided"
+            )
+
+        if flush_size < 1:
+            raise ValueError(
+                f"flush_size must be greater than or equal to 1, {flush_size} provided"
+            )
+
+        self.file_path = file_path
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._buffer: List[bytes] = []
+        self._buffered_bytes = 0
+        self._file: Optional[BinaryIO] = None
+        self._failure: Optional[Exception] = None
+        self._flusher: Optional[threading.Thread] = None
+        self._closing = threading.Event()
+        # guards the buffer, while the file lock keeps flushes in order
+        self._buffer_lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._logger = logging.getLogger("error_recorders.BufferedFileWriter")
+
+    def write(self, data: bytes) -> None:
+        """
+        Buffer data to append to the file
+
+        :param data: the data
+        :return: none
+        """
+        with self._buffer_lock:
+            self._buffer.append(data)
+            self._buffered_bytes += len(data)
+            full = self._buffered_bytes >= self.flush_size
+            if self._flusher is None:
+                self._start_flusher()
+
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the buffered data to the file, raising the exception of a failed
+        background flush if there was one
+
+        :return: none
+        """
+        with self._file_lock:
+            with self._buffer_lock:
+                buffer = self._buffer
+                self._buffer = []
+                self._buffered_bytes = 0
+
+            if buffer:
+                if self._file is None:
+                    self._file = open(self.file_path, "ab")
+                self._file.write(b"".join(buffer))
+                self._file.flush()
+
+        if self._failure is not None:
+            failure, self._failure = self._failure, None
+            raise failure
+
+    def close(self) -> None:
+        """
+        Stop the background thread, flush the buffered data and close the file
+
+        :return: none
+        """
+        with self._buffer_lock:
+            flusher = self._flusher
+            self._flusher = None
+        if flusher is not None:
+            self._closing.set()
+            flusher.join()
+            self._closing.clear()
+
+        try:
+            self.flush()
+        finally:
+            with self._file_lock:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+
+    def _start_flusher(self) -> None:
+        # daemon so that an import that crashes without closing can still exit
+        self._flusher = threading.Thread(
+            target=self._flush_periodically,
+            name="BufferedFileWriter",
+            daemon=True,
+        )
+        self._flusher.start()
+
+    def _flush_periodically(self) -> None:
+        while not self._closing.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                self._logger.error(f"failed to write to {self.file_path}: {e}")
+                self._failure = e
@@ -0,0 +1,479 @@
+import json
+import logging
+from pathlib import PurePath
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from iterable_data_import.data_sources.compression import (
+    Compression,
+    detect_compression,
+)
+from iterable_data_import.data_sources.data_source import (
+    FileFormat,
+    SourceDataRecord,
+    SourcePosition,
+    SourceReference,
+)
+from iterable_data_import.data_sources.file_system import FileSystem
+from iterable_data_import.error_recorders.api_error_recorder import (
+    FileSystemApiErrorRecorder,
+)
+from iterable_data_import.error_recorders.buffered_file_writer import (
+    DEFAULT_FLUSH_SIZE,
+)
+from iterable_data_import.import_action import (
+    UpdateUserProfile,
+    TrackCustomEvent,
+    TrackPurchase,
+)
+from iterable_data_import.importers.iterable_request import (
+    BulkUserUpdateRequest,
+    BulkTrackCustomEventRequest,
+    IterableRequest,
+)
+from iterable_data_import.iterable_resource import IterableResource
+from iterable_data_import.json_serializer import JsonSerializer
+
+# the types of request recorded, named after the request body key for bulk requests
+USERS = "users"
+EVENTS = "events"
+PURCHASES = "purchases"
+
+_ACTION_TYPES = {
+    USERS: UpdateUserProfile,
+    EVENTS: TrackCustomEvent,
+    PURCHASES: TrackPurchase,
+}
+
+# compact errors are rehydrated this many at a time, reading the source records of
+# each block in file order
+_REHYDRATE_BLOCK_SIZE = 1000
+
+# further ahead than this, uncompressed source files seek to a record rather than
+# reading up to it
+_MAX_SKIPPED_RECORDS = 1000
+
+# the fields of an item's API dictionary that identify it
+_IDENTIFIER_FIELDS = {
+    USERS: ("email", "userId"),
+    EVENTS: ("eventName", "email", "userId", "id", "createdAt"),
+    PURCHASES: ("id", "createdAt"),
+}
+
+
+def item_identifiers(
+    request_type: str, api_dict: Dict[str, object]
+) -> Dict[str, object]:
+    """
+    The fields identifying an item of a request, e.g. a user's email and user ID
+
+    :param request_type: USERS, EVENTS or PURCHASES
+    :param api_dict: the item's API dictionary
+    :return: the identifying fields that are set
+    """
+    identifiers = {
+        field: api_dict[field]
+        for field in _IDENTIFIER_FIELDS[request_type]
+        if api_dict.get(field) is not None
+    }
+    if request_type == PURCHASES:
+        user = api_dict.get("user") or {}
+        for field in _IDENTIFIER_FIELDS[USERS]:
+            if user.get(field) is not None:
+                identifiers[field] = user[field]
+    return identifiers
+
+
+def request_body_type(request_body: Dict[str, object]) -> str:
+    """
+    The type of a recorded request body
+
+    :param request_body: the request body, as written by FileSystemApiErrorRecorder
+    :return: USERS, EVENTS or PURCHASES
+    """
+    if USERS in request_body:
+        return USERS
+    if EVENTS in request_body:
+        return EVENTS
+    return PURCHASES
+
+
+class CompactFileSystemApiErrorRecorder(FileSystemApiErrorRecorder):
+    """
+    An API error recorder that writes a compact record of each failed request to the
+    local file system, rather than the whole request body. Errors are persisted as
+    newline delimited JSON objects with the following keys:
+    - response_status
+    - response_body
+    - type, one of users, events or purchases
+    - files, the source files the items came from
+    - items, the fields identifying each item, e.g. email and userId, and under
+      sources a [file index, record index, offset] reference to each source data
+      record the item was created from
+
+    Items only have sources when the import tracks them, see [[IterableDataImport]].
+    Use [[CompactApiErrorReader]] to read the errors and rehydrate the request bodies
+    from the source files. Buffering works the same way as for
+    FileSystemApiErrorRecorder.
+    """
+
+    def __init__(
+        self,
+        out_file_path: PurePath,
+        flush_interval: Optional[float] = None,
+        flush_size: int = DEFAULT_FLUSH_SIZE,
+    ) -> None:
+        super().__init__(out_file_path, flush_interval, flush_size)
+        self._logger = logging.getLogger(
+            "error_recorders.CompactFileSystemApiErrorRecorder"
+        )
+
+    def record(
+        self, response_status: int, response_body: str, request_body: Dict[str, object]
+    ):
+        request_type = request_body_type(request_body)
+        if request_type == PURCHASES:
+            api_dicts = [request_body]
+        else:
+            api_dicts = request_body.get(request_type) or []
+        items = [item_identifiers(request_type, api_dict) for api_dict in api_dicts]
+        self._write_error(response_status, response_body, request_type, [], items)
+
+    def record_serialized(
+        self, response_status: int, response_body: str, request_body: bytes
+    ):
+        self.record(response_status, response_body, json.loads(request_body))
+
+    def record_request(
+        self,
+        response_status: int,
+        response_body: str,
+        request: IterableRequest,
+        serializer: JsonSerializer,
+    ) -> None:
+        request_type = _request_type(request)
+        files: Dict[str, int] = {}
+        items = []
+        for resource in request.items:
+            item = item_identifiers(request_type, resource.to_api_dict)
+            sources = getattr(resource, "sources", None)
+            if sources:
+                item["sources"] = [
+                    [
+                        files.setdefault(source.file_path, len(files)),
+                        source.position.record_index,
+                        source.position.offset,
+                    ]
+                    for source in sources
+                ]
+            items.append(item)
+        self._write_error(
+            response_status, response_body, request_type, list(files), items
+        )
+
+    def _write_error(
+        self,
+        response_status: int,
+        response_body: str,
+        request_type: str,
+        files: List[str],
+        items: List[Dict[str, object]],
+    ) -> None:
+        error = {
+            "response_status": response_status,
+            "response_body": response_body,
+            "type": request_type,
+            "files": files,
+            "items": items,
+        }
+        self._logger.debug(
+            f"logging error {response_status} {response_body} for {len(items)} {request_type}"
+        )
+        self._write((json.dumps(error) + "\n").encode("utf-8"))
+
+
+class CompactApiError:
+    """
+    An error read from a file written by [[CompactFileSystemApiErrorRecorder]]. items
+    holds the fields identifying each item, and sources the references to the source
+    data records each item was created from.
+    """
+
+    def __init__(
+        self,
+        response_status: int,
+        response_body: str,
+        request_type: str,
+        items: List[Dict[str, object]],
+        sources: List[List[SourceReference]],
+    ) -> None:
+        self.response_status = response_status
+        self.response_body = response_body
+        self.request_type = request_type
+        self.items = items
+        self.sources = sources
+
+    @classmethod
+    def from_dict(cls, error: Dict[str, object]) -> "CompactApiError":
+        """
+        Create an error from a line of a compact error file
+
+        :param error: the decoded line
+        :return: the error
+        """
+        files = error.get("files") or []
+        items = error.get("items") or []
+        sources = [
+            [
+                SourceReference(files[file_index], SourcePosition(record_index, offset))
+                for file_index, record_index, offset in item.get("sources") or []
+            ]
+            for item in items
+        ]
+        return cls(
+            error["response_status"],
+            error["response_body"],
+            error["type"],
+            [{k: v for k, v in item.items() if k != "sources"} for item in items],
+            sources,
+        )
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.response_status}, {self.request_type}, {len(self.items)} items)"
+
+
+class CompactApiErrorReader:
+    """
+    Reads the errors written by [[CompactFileSystemApiErrorRecorder]]
+
+    The source data records of each error can be read back from the source files
+    with source_records, which requires source_file_format. rehydrate, which also
+    requires the import's map_function, maps them again to rebuild the full error,
+    as FileSystemApiErrorRecorder would have written it. Items without sources can't
+    be rehydrated and are left out with a warning.
+
+    Each source file is kept open and read forward from one record to the next, so
+    a compressed file isn't decompressed from its start for every record.
+    rehydrate_errors and rehydrated read the records of many errors at a time in
+    file order, so a whole error file is rehydrated in about one pass over each
+    source file. Call close once done with a reader that read source records.
+    """
+
+    def __init__(
+        self,
+        error_file_path: PurePath,
+        source_file_format: Optional[FileFormat] = None,
+        map_function: Optional[Callable] = None,
+    ) -> None:
+        self.error_file_path = error_file_path
+        self.source_file_format = source_file_format
+        self.map_function = map_function
+        self._cursors: Dict[str, _SourceCursor] = {}
+        self._prefetched: Dict[Tuple[str, int], SourceDataRecord] = {}
+        self._logger = logging.getLogger("error_recorders.CompactApiErrorReader")
+
+    def __iter__(self) -> Iterator[CompactApiError]:
+        with open(self.error_file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield CompactApiError.from_dict(json.loads(line))
+
+    def source_records(self, error: CompactApiError) -> List[SourceDataRecord]:
+        """
+        Read the source data records the items of an error were created from, in the
+        order of the items
+
+        :param error: the error
+        :return: the source data records
+        """
+        self._require_source_file_format()
+        return [
+            self._read_record(reference)
+            for item_sources in error.sources
+            for reference in item_sources
+        ]
+
+    def rehydrate(self, error: CompactApiError) -> Dict[str, object]:
+        """
+        Rebuild an error with its full request body by mapping its source data
+        records again
+
+        :param error: the error
+        :return: the error as a dictionary with the keys response_status,
+            response_body and request_body
+        """
+        if self.source_file_format is None or self.map_function is None:
+            raise ValueError(
+                "source_file_format and map_function are required to rehydrate errors"
+            )
+
+        api_dicts = []
+        for item, item_sources in zip(error.items, error.sources):
+            if not item_sources:
+                self._logger.warning(f"no source records for {item}, leaving it out")
+                continue
+            for reference in item_sources:
+                record = self._read_record(reference)
+                for resource in self._map(record, error.request_type):
+                    api_dict = resource.to_api_dict
+                    if item_identifiers(error.request_type, api_dict) == item:
+                        api_dicts.append(api_dict)
+
+        if error.request_type == PURCHASES:
+            request_body = api_dicts[0] if api_dicts else {}
+        else:
+            request_body = {error.request_type: api_dicts}
+        return {
+            "response_status": error.response_status,
+            "response_body": error.response_body,
+            "request_body": request_body,
+        }
+
+    def rehydrated(self) -> Iterator[Dict[str, object]]:
+        """
+        Rehydrate every error in the file
+
+        :return: the errors with their full request bodies
+        """
+        with open(self.error_file_path, "r", encoding="utf-8") as f:
+            try:
+                yield from self.rehydrate_errors(
+                    json.loads(line) for line in f if line.strip()
+                )
+            finally:
+                self.close()
+
+    def rehydrate_errors(
+        self, errors: Iterable[Dict[str, object]]
+    ) -> Iterator[Dict[str, object]]:
+        """
+        Rehydrate the compact errors among decoded error file lines, reading the
+        source records of many errors at a time in file order. Errors that already
+        have a request body are returned as they are.
+
+        :param errors: the decoded lines of an error file
+        :return: the errors with their full request bodies
+        """
+        block = []
+        for error in errors:
+            block.append(error)
+            if len(block) >= _REHYDRATE_BLOCK_SIZE:
+                yield from self._rehydrate_block(block)
+                block = []
+        yield from self._rehydrate_block(block)
+
+    def close(self) -> None:
+        """
+        Close the source files
+
+        :return: none
+        """
+        for cursor in self._cursors.values():
+            cursor.close()
+        self._cursors = {}
+
+    def _rehydrate_block(
+        self, block: List[Dict[str, object]]
+    ) -> Iterator[Dict[str, object]]:
+        errors = [
+            error if "request_body" in error else CompactApiError.from_dict(error)
+            for error in block
+        ]
+        references = [
+            reference
+            for error in errors
+            if isinstance(error, CompactApiError)
+            for item_sources in error.sources
+            for reference in item_sources
+        ]
+        references.sort(key=lambda r: (r.file_path, r.position.record_index))
+        if references:
+            self._require_source_file_format()
+        for reference in references:
+            key = (reference.file_path, reference.position.record_index)
+            if key not in self._prefetched:
+                self._prefetched[key] = self._read_record(reference)
+
+        try:
+            for error in errors:
+                if isinstance(error, CompactApiError):
+                    yield self.rehydrate(error)
+                else:
+                    yield error
+        finally:
+            self._prefetched = {}
+
+    def _require_source_file_format(self) -> None:
+        if self.source_file_format is None:
+            raise ValueError("source_file_format is required to read source records")
+
+    def _read_record(self, reference: SourceReference) -> SourceDataRecord:
+        record_index = reference.position.record_index
+        record = self._prefetched.get((reference.file_path, record_index))
+        if record is not None:
+            return record
+
+        cursor = self._cursors.get(reference.file_path)
+        if cursor is None or not cursor.can_reach(record_index):
+            if cursor is not None:
+                cursor.close()
+            cursor = _SourceCursor(reference, self.source_file_format)
+            self._cursors[reference.file_path] = cursor
+        return cursor.read(record_index)
+
+    def _map(
+        self, record: SourceDataRecord, request_type: str
+    ) -> List[IterableResource]:
+        # the resources of the record that are sent in requests of request_type
+        mapped = self.map_function(record)
+        actions = mapped if isinstance(mapped, list) else [mapped]
+        return [
+            action.resource
+            for action in actions
+            if isinstance(action, _ACTION_TYPES[request_type])
+        ]
+
+
+class _SourceCursor:
+    """
+    A source file read forward from a reference, one record at a time
+    """
+
+    def __init__(self, reference: SourceReference, file_format: FileFormat) -> None:
+        # record index 0 is the start of the file, before any CSV header
+        position = reference.position
+        self._source = FileSystem(
+            reference.file_path,
+            file_format,
+            position if position.record_index else None,
+        )
+        self._compressed = detect_compression(reference.file_path) != Compression.NONE
+        # the index of the next record, i.e. the number of records before it
+        self.record_index = position.record_index
+
+    def can_reach(self, record_index: int) -> bool:
+        # a compressed file is decompressed from its start when it's reopened, so
+        # reading ahead is always cheaper
+        if record_index < self.record_index:
+            return False
+        return (
+            self._compressed or record_index - self.record_index <= _MAX_SKIPPED_RECORDS
+        )
+
+    def read(self, record_index: int) -> SourceDataRecord:
+        while self.record_index < record_index:
+            next(self._source)
+            self.record_index += 1
+        record = next(self._source)
+        self.record_index += 1
+        return record
+
+    def close(self) -> None:
+        self._source.source_data_generator.close()
+
+
+def _request_type(request: IterableRequest) -> str:
+    if isinstance(request, BulkUserUpdateRequest):
+        return USERS
+    if isinstance(request, BulkTrackCustomEventRequest):
+        return EVENTS
+    return PURCHASES
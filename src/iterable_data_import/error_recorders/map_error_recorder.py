@@ -1,9 +1,16 @@
 import json
 import logging
 from pathlib import PurePath
-from typing import Dict
+from typing import Dict, Optional
 
 from iterable_data_import.data_sources.data_source import SourceDataRecord
+from iterable_data_import.error_recorders.buffered_file_writer import (
+    BufferedFileWriter,
+    DEFAULT_FLUSH_SIZE,
+)
+
+# exceptions, and values json can't encode like datetimes, are written as strings
+_ENCODER = json.JSONEncoder(default=str)
 
 
 class MapErrorRecorder:
@@ -26,25 +33,71 @@ class MapErrorRecorder:
         """
         pass
 
+    def flush(self) -> None:
+        """
+        Persist the errors recorded so far, for recorders that buffer them
+
+        :return: none
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Persist the errors recorded so far and release any resources. Called by
+        IterableDataImport once the import stops.
+
+        :return: none
+        """
+        pass
+
 
 class FileSystemMapErrorRecorder(MapErrorRecorder):
     """
     A map error recorder that writes errors to the local file system. Errors are persisted
-    as newline delimited JSON objects.
+    as newline delimited JSON objects. Exceptions are written as their message.
+
+    By default each error is written as soon as it's recorded. With a flush_interval,
+    errors are buffered and written by a background thread every flush_interval
+    seconds, or once flush_size bytes are buffered, which is much faster when many
+    records fail to map. Call close to write the last errors.
     """
 
-    def __init__(self, out_file_path: PurePath) -> None:
+    def __init__(
+        self,
+        out_file_path: PurePath,
+        flush_interval: Optional[float] = None,
+        flush_size: int = DEFAULT_FLUSH_SIZE,
+    ) -> None:
         self.out_file_path = out_file_path
+        self._writer = (
+            BufferedFileWriter(out_file_path, flush_interval, flush_size)
+            if flush_interval is not None
+            else None
+        )
         self._logger = logging.getLogger(
             "error_recorders.LocalFileSystemMapErrorRecorder"
         )
 
     def record(self, exception: Exception, data: Dict[str, object]):
-        # for now eagerly write errors to the file system in case the program terminates unexpectedly
-        with open(self.out_file_path, "a") as f:
-            error = create_error(exception, data)
+        error = create_error(exception, data)
+        if self._logger.isEnabledFor(logging.DEBUG):
             self._logger.debug(f"logging error {error}")
-            f.write(json.dumps(error) + "\n")
+        line = (_ENCODER.encode(error) + "\n").encode("utf-8")
+        if self._writer is not None:
+            self._writer.write(line)
+            return
+
+        # eagerly write errors to the file system in case the program terminates unexpectedly
+        with open(self.out_file_path, "ab") as f:
+            f.write(line)
+
+    def flush(self) -> None:
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
 
 
 class NoOpMapErrorRecorder(MapErrorRecorder):
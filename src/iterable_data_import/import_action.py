@@ -1,4 +1,9 @@
-from iterable_data_import.iterable_resource import UserProfile, CustomEvent, Purchase
+from iterable_data_import.iterable_resource import (
+    IterableResource,
+    UserProfile,
+    CustomEvent,
+    Purchase,
+)
 
 
 class ImportAction:
@@ -6,7 +11,12 @@ class ImportAction:
     An action that can be performed by an Iterable import service
     """
 
-    pass
+    @property
+    def resource(self) -> IterableResource:
+        """
+        The resource sent to Iterable by the action
+        """
+        pass
 
 
 class UpdateUserProfile(ImportAction):
@@ -17,6 +27,10 @@ class UpdateUserProfile(ImportAction):
     def __init__(self, user: UserProfile) -> None:
         self.user = user
 
+    @property
+    def resource(self) -> UserProfile:
+        return self.user
+
 
 class TrackCustomEvent(ImportAction):
     """
@@ -26,6 +40,10 @@ class TrackCustomEvent(ImportAction):
     def __init__(self, event: CustomEvent) -> None:
         self.event = event
 
+    @property
+    def resource(self) -> CustomEvent:
+        return self.event
+
 
 class TrackPurchase(ImportAction):
     """
@@ -34,3 +52,7 @@ class TrackPurchase(ImportAction):
 
     def __init__(self, purchase: Purchase) -> None:
         self.purchase = purchase
+
+    @property
+    def resource(self) -> Purchase:
+        return self.purchase
@@ -0,0 +1,51 @@
+import threading
+from typing import Iterable, Set
+
+
+class AckTracker:
+    """
+    Tracks which import actions have been acknowledged, i.e. sent to Iterable and
+    either accepted or recorded as an error
+
+    Every action handled by an importer is issued a sequence number in the order it
+    was handed to the importer. Actions may be acknowledged in any order, and
+    acknowledged reports how many actions, from the first one onwards, have all been
+    acknowledged.
+    """
+
+    def __init__(self) -> None:
+        self._next = 0
+        self._acknowledged = 0
+        self._out_of_order: Set[int] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def acknowledged(self) -> int:
+        """
+        The number of leading actions that have all been acknowledged
+        """
+        return self._acknowledged
+
+    def issue(self) -> int:
+        """
+        Issue the sequence number of the next action
+
+        :return: the sequence number
+        """
+        with self._lock:
+            seq = self._next
+            self._next += 1
+            return seq
+
+    def acknowledge(self, seqs: Iterable[int]) -> None:
+        """
+        Acknowledge actions
+
+        :param seqs: sequence numbers of the acknowledged actions
+        :return: none
+        """
+        with self._lock:
+            self._out_of_order.update(seqs)
+            while self._acknowledged in self._out_of_order:
+                self._out_of_order.remove(self._acknowledged)
+                self._acknowledged += 1
@@ -0,0 +1,94 @@
+import gzip
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from iterable_data_import.importers.concurrency_controller import (
+    AimdConcurrencyController,
+)
+from iterable_data_import.importers.iterable_request import IterableRequest
+from iterable_data_import.json_serializer import JsonSerializer
+from iterable_data_import.metrics import HTTP, SERIALIZE, Metrics
+
+API_BASE_URL = "https://api.iterable.com/api"
+
+GZIP_HEADERS = {"Content-Encoding": "gzip"}
+
+
+class ApiClientMixin:
+    """
+    Request encoding, logging and response observation shared by [[SyncApiClient]]
+    and [[AsyncApiClient]], which only differ in how requests are sent
+    """
+
+    serializer: JsonSerializer
+    compression_level: int
+    concurrency_controller: Optional[AimdConcurrencyController]
+    metrics: Optional[Metrics]
+    _logger: logging.Logger
+
+    def _encode(
+        self, request: IterableRequest, path: str, compress: bool
+    ) -> Tuple[bytes, bytes, Optional[Dict[str, str]]]:
+        if self.metrics is not None:
+            start = time.perf_counter()
+        data = request.serialize(self.serializer)
+        body, headers = self._prepare_body(data, compress)
+        if self.metrics is not None:
+            self.metrics.observe(
+                SERIALIZE, time.perf_counter() - start, labels={"endpoint": path}
+            )
+        return data, body, headers
+
+    def _prepare_body(
+        self, data: bytes, compress: bool
+    ) -> Tuple[bytes, Optional[Dict[str, str]]]:
+        # the body is compressed once and reused by every attempt
+        if not compress:
+            return data, None
+        body = gzip.compress(data, compresslevel=self.compression_level)
+        self._logger.debug(f"compressed request body from {len(data)} to {len(body)}B")
+        return body, GZIP_HEADERS
+
+    def _observe(
+        self,
+        path: str,
+        request: IterableRequest,
+        latency: float,
+        status_code: Optional[int],
+    ) -> None:
+        # a status of None means the request failed without a response
+        if self.concurrency_controller:
+            self.concurrency_controller.observe(
+                latency if status_code is not None else None, status_code
+            )
+        if self.metrics is not None:
+            observe_response(self.metrics, path, latency, request, status_code)
+
+    def _log_request(self, url: str, data: bytes) -> None:
+        # decoding a large body is only worth it when debug logging is on
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(f"making request {url} {data.decode('utf-8')}")
+
+
+def observe_response(
+    metrics: Metrics,
+    path: str,
+    latency: float,
+    request: IterableRequest,
+    status_code: Optional[int] = None,
+) -> None:
+    """
+    Observe the latency of an API response
+
+    :param metrics: the metrics
+    :param path: the API path
+    :param latency: the response latency in seconds
+    :param request: the request, its items are counted
+    :param status_code: the response status, None if the request failed to connect
+    :return: none
+    """
+    status = str(status_code) if status_code is not None else "error"
+    metrics.observe(
+        HTTP, latency, len(request.items), {"endpoint": path, "status": status}
+    )
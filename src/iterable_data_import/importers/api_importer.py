@@ -0,0 +1,311 @@
+import logging
+import threading
+import time
+from typing import Callable, List, Optional, Union
+
+import requests
+
+from iterable_data_import.errors import UnsupportedImportActionError
+from iterable_data_import.error_recorders.api_error_recorder import (
+    ApiErrorRecorder,
+)
+from iterable_data_import.import_action import (
+    ImportAction,
+    UpdateUserProfile,
+    TrackCustomEvent,
+    TrackPurchase,
+)
+from iterable_data_import.importers.ack_tracker import AckTracker
+from iterable_data_import.importers.async_api_client import AsyncApiResponse
+from iterable_data_import.importers.batch import (
+    Batch,
+    CoalescingUserBatch,
+    DEFAULT_MAX_BATCH_BYTES,
+)
+from iterable_data_import.importers.bulk_response import (
+    ResponseOutcome,
+    evaluate_response,
+)
+from iterable_data_import.importers.concurrency_controller import (
+    AimdConcurrencyController,
+)
+from iterable_data_import.importers.importer import Importer
+from iterable_data_import.importers.iterable_request import (
+    BulkUserUpdateRequest,
+    BulkTrackCustomEventRequest,
+    TrackPurchaseRequest,
+    IterableRequest,
+)
+from iterable_data_import.importers.rate_limiter import backoff_delay
+from iterable_data_import.iterable_resource import IterableResource
+from iterable_data_import.json_serializer import default_serializer
+from iterable_data_import.metrics import ERROR_RECORD, SERIALIZE
+
+ApiResponse = Union[requests.Response, AsyncApiResponse]
+
+
+class ApiImporter(Importer):
+    """
+    Batching, retries and error recording shared by [[SyncApiImporter]] and
+    [[AsyncApiImporter]], which only differ in how requests are sent
+
+    Import actions are encoded with the API client's serializer as they're batched,
+    and a batch is dispatched once it's full or would exceed max_batch_bytes.
+    Requests failing with a retryable status code, and the items of bulk requests that
+    failed for a retryable reason, are resent up to max_retries times with exponential
+    backoff starting at retry_backoff seconds. Only the items that still fail, or
+    failed permanently, are recorded by the error recorder.
+
+    When coalesce_users is set, repeated updates to the same user within a batch are
+    merged into a single item, see [[CoalescingUserBatch]].
+    """
+
+    def __init__(
+        self,
+        api_client,
+        error_recorder: ApiErrorRecorder,
+        users_per_batch: int = 1000,
+        events_per_batch: int = 1000,
+        max_batch_bytes: Optional[int] = DEFAULT_MAX_BATCH_BYTES,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        coalesce_users: bool = False,
+    ) -> None:
+        if not api_client:
+            raise ValueError("api_client is required")
+
+        if not error_recorder:
+            raise ValueError("error_recorder is required")
+
+        if users_per_batch < 1:
+            raise ValueError(
+                f"users_per_batch must be greater than or equal to 1, {users_per_batch} provided"
+            )
+
+        if events_per_batch < 1:
+            raise ValueError(
+                f"events_per_batch must be greater than or equal to 1, {events_per_batch} provided"
+            )
+
+        if max_batch_bytes is not None and max_batch_bytes < 1:
+            raise ValueError(
+                f"max_batch_bytes must be greater than or equal to 1, {max_batch_bytes} provided"
+            )
+
+        if max_retries < 0:
+            raise ValueError(
+                f"max_retries must be greater than or equal to 0, {max_retries} provided"
+            )
+
+        if retry_backoff < 0:
+            raise ValueError(
+                f"retry_backoff must be greater than or equal to 0, {retry_backoff} provided"
+            )
+
+        self.api_client = api_client
+        self.error_recorder = error_recorder
+        self.users_per_batch = users_per_batch
+        self.events_per_batch = events_per_batch
+        self.max_batch_bytes = max_batch_bytes
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.coalesce_users = coalesce_users
+        # items are encoded with the client's serializer as they're batched
+        self._serializer = (
+            getattr(api_client, "serializer", None) or default_serializer()
+        )
+        # stages are timed with the client's metrics, if any
+        self._metrics = getattr(api_client, "metrics", None)
+        self.users = self._new_user_batch()
+        self.events = Batch("events", events_per_batch, max_batch_bytes)
+        self._acks = AckTracker()
+        self._error_lock = threading.Lock()
+        # the first exception raised while sending, the one that is reported
+        self._failure_lock = threading.Lock()
+        self._failure: Optional[BaseException] = None
+        self._logger = logging.getLogger(f"importers.{self.__class__.__name__}")
+
+    def handle_actions(self, actions: List[ImportAction]) -> None:
+        """
+        Handle a list of import actions
+
+        Note that many import actions are batched in order to improve throughput. Calling
+        this method may not trigger an immediate write to Iterable. For this reason it's
+        important to call shutdown when the import is complete.
+
+        :param actions: list of import actions
+        :return: none
+        """
+        self._raise_failure()
+        for action in actions:
+            self._logger.debug(f"handling import action {action}")
+            if isinstance(action, UpdateUserProfile):
+                self._handle_update_user(action)
+
+            elif isinstance(action, TrackCustomEvent):
+                self._handle_track_event(action)
+
+            elif isinstance(action, TrackPurchase):
+                self._handle_track_purchase(action)
+
+            else:
+                # validation in IterableDataImport should prevent this from ever happening
+                raise UnsupportedImportActionError(
+                    f"{action} is not a supported import action"
+                )
+
+    @property
+    def acknowledged_actions(self) -> Optional[int]:
+        return self._acks.acknowledged
+
+    def shutdown(self) -> None:
+        """
+        Send the batches of requests that hadn't reached full capacity yet and wait for
+        every request to be sent, then close the error recorder.
+        __Important__: this method must be called before terminating the import or it
+        may not complete successfully.
+
+        :return: none
+        """
+        self._logger.debug("starting shutdown...")
+        self._flush_users()
+        self._flush_events()
+        self._wait_for_requests()
+
+        # every request has been sent, write the errors the recorder buffered
+        self.error_recorder.close()
+        self._logger.debug("shutdown complete")
+        self._raise_failure()
+
+    def _dispatch(self, send: Callable, request: IterableRequest, seqs: List[int]):
+        # sends the request, acknowledging the actions with sequence numbers seqs
+        # once it has been sent
+        raise NotImplementedError
+
+    def _wait_for_requests(self) -> None:
+        # waits for every dispatched request to be sent
+        raise NotImplementedError
+
+    def _handle_update_user(self, action: UpdateUserProfile):
+        seq = self._acks.issue()
+        if self.coalesce_users and self.users.coalesce(action.user, seq):
+            return
+
+        encoded = self._encode(action.user, "users")
+        if not self.users.fits(len(encoded)):
+            self._flush_users()
+        self.users.append(action.user, encoded, seq)
+        if self.users.is_full:
+            self._flush_users()
+
+    def _handle_track_event(self, action: TrackCustomEvent):
+        encoded = self._encode(action.event, "events")
+        if not self.events.fits(len(encoded)):
+            self._flush_events()
+        self.events.append(action.event, encoded, self._acks.issue())
+        if self.events.is_full:
+            self._flush_events()
+
+    def _handle_track_purchase(self, action: TrackPurchase):
+        track_purchase_req = TrackPurchaseRequest(action.purchase)
+        self._dispatch(
+            self.api_client.track_purchase, track_purchase_req, [self._acks.issue()]
+        )
+
+    def _encode(self, resource: IterableResource, batch: str) -> bytes:
+        if self._metrics is None:
+            return self._serializer.dumps(resource.to_api_dict)
+        start = time.perf_counter()
+        encoded = self._serializer.dumps(resource.to_api_dict)
+        self._metrics.observe(
+            SERIALIZE, time.perf_counter() - start, labels={"batch": batch}
+        )
+        return encoded
+
+    def _flush_users(self) -> None:
+        if len(self.users) > 0:
+            bulk_update_req = BulkUserUpdateRequest(self.users.items, self.users.body)
+            self._dispatch(
+                self.api_client.bulk_update_users, bulk_update_req, self.users.seqs
+            )
+        self.users = self._new_user_batch()
+
+    def _new_user_batch(self) -> Batch:
+        if self.coalesce_users:
+            return CoalescingUserBatch(
+                self.users_per_batch, self.max_batch_bytes, self._serializer
+            )
+        return Batch("users", self.users_per_batch, self.max_batch_bytes)
+
+    def _flush_events(self) -> None:
+        if len(self.events) > 0:
+            bulk_track_req = BulkTrackCustomEventRequest(
+                self.events.items, self.events.body
+            )
+            self._dispatch(
+                self.api_client.bulk_track_events, bulk_track_req, self.events.seqs
+            )
+        self.events = Batch("events", self.events_per_batch, self.max_batch_bytes)
+
+    def _handle_response(
+        self, request: IterableRequest, response: ApiResponse
+    ) -> ResponseOutcome:
+        # records the items that failed permanently, the caller resends and retries
+        # the rest
+        outcome = evaluate_response(request, response.status_code, response.text)
+        for smaller_request in outcome.resend:
+            self._logger.info(
+                f"request too large, resending {len(smaller_request.items)} items"
+            )
+        if outcome.failed:
+            self._handle_error(
+                outcome.failed, response.status_code, outcome.failed_text
+            )
+        return outcome
+
+    def _retry_delay(
+        self, outcome: ResponseOutcome, response: ApiResponse, attempt: int
+    ) -> Optional[float]:
+        # the delay before retrying the outcome's retry request, or None once it has
+        # been retried max_retries times, in which case its items are recorded
+        if attempt > self.max_retries:
+            self._handle_error(outcome.retry, response.status_code, outcome.retry_text)
+            return None
+
+        delay = backoff_delay(attempt, self.retry_backoff)
+        self._logger.info(
+            f"retrying {len(outcome.retry.items)} items after a {response.status_code} response in {delay}s"
+        )
+        return delay
+
+    def _handle_error(
+        self, request: IterableRequest, status_code: int, text: str
+    ) -> None:
+        # error recorders aren't thread safe
+        with self._error_lock:
+            if self._metrics is not None:
+                start = time.perf_counter()
+            self.error_recorder.record_request(
+                status_code, text, request, self._serializer
+            )
+            if self._metrics is not None:
+                self._metrics.observe(
+                    ERROR_RECORD, time.perf_counter() - start, len(request.items)
+                )
+
+    def _get_concurrency_controller(self) -> Optional[AimdConcurrencyController]:
+        return getattr(self.api_client, "concurrency_controller", None)
+
+    def _record_failure(self, failure: BaseException) -> None:
+        with self._failure_lock:
+            if self._failure is None:
+                self._failure = failure
+
+    def _raise_failure(self) -> None:
+        # surface exceptions raised while sending on the calling thread, the same way
+        # they would be raised when sending inline
+        with self._failure_lock:
+            failure = self._failure
+            self._failure = None
+        if failure is not None:
+            raise failure
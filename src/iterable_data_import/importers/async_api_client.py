@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - aiohttp is an optional dependency
+    aiohttp = None
+
+from iterable_data_import.importers.iterable_request import (
+    BulkUserUpdateRequest,
+    BulkTrackCustomEventRequest,
+    TrackPurchaseRequest,
+    IterableRequest,
+)
+from iterable_data_import.importers.concurrency_controller import (
+    AimdConcurrencyController,
+)
+from iterable_data_import.importers.rate_limiter import (
+    RateLimiter,
+    parse_retry_after,
+    backoff_delay,
+)
+from iterable_data_import.importers.api_client import API_BASE_URL, ApiClientMixin
+from iterable_data_import.json_serializer import JsonSerializer, default_serializer
+from iterable_data_import.metrics import Metrics
+
+
+class AsyncApiResponse:
+    """
+    The status code and body of a completed Iterable API response
+    """
+
+    def __init__(self, status_code: int, text: str) -> None:
+        self.status_code = status_code
+        self.text = text
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.status_code})"
+
+
+class AsyncApiClient(ApiClientMixin):
+    """
+    Asynchronous client for the Iterable API
+
+    Requests are paced by the rate limiter and 429 responses are retried up to
+    max_retries times, waiting for as long as the Retry-After header asks. The latency
+    and status of every response is reported to the concurrency controller, if any.
+    Request bodies are encoded by serializer, which defaults to orjson when it's
+    installed. When compress_requests is set, bulk request bodies are gzipped at
+    compression_level. When metrics is provided, request encoding and response
+    latency are observed, see [[SyncApiClient]].
+
+    Requires the optional aiohttp dependency: pip install iterable-data-import[async]
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = API_BASE_URL,
+        timeout: int = 10,
+        max_retries: int = 5,
+        max_connections: int = 100,
+        rate_limiter: Optional[RateLimiter] = None,
+        concurrency_controller: Optional[AimdConcurrencyController] = None,
+        serializer: Optional[JsonSerializer] = None,
+        compress_requests: bool = False,
+        compression_level: int = 6,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncApiClient requires aiohttp, install it with: pip install iterable-data-import[async]"
+            )
+
+        if timeout <= 0:
+            raise ValueError(f"timeout must be greater than 0, {timeout} provided")
+
+        if max_retries <= 0:
+            raise ValueError(
+                f"max_retries must be greater than 0, {max_retries} provided"
+            )
+
+        if max_connections <= 0:
+            raise ValueError(
+                f"max_connections must be greater than 0, {max_connections} provided"
+            )
+
+        if not 0 <= compression_level <= 9:
+            raise ValueError(
+                f"compression_level must be between 0 and 9, {compression_level} provided"
+            )
+
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_connections = max_connections
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.concurrency_controller = concurrency_controller
+        self.serializer = serializer or default_serializer()
+        self.compress_requests = compress_requests
+        self.compression_level = compression_level
+        self.metrics = metrics
+        self.session: Optional["aiohttp.ClientSession"] = None
+        self._logger = logging.getLogger("importers.AsyncApiClient")
+
+    async def bulk_update_users(self, req: BulkUserUpdateRequest) -> AsyncApiResponse:
+        url = f"{self.base_url}/users/bulkUpdate"
+        response = await self.make_request(url, req, self.compress_requests)
+        return response
+
+    async def bulk_track_events(
+        self, req: BulkTrackCustomEventRequest
+    ) -> AsyncApiResponse:
+        url = f"{self.base_url}/events/trackBulk"
+        response = await self.make_request(url, req, self.compress_requests)
+        return response
+
+    async def track_purchase(self, req: TrackPurchaseRequest) -> AsyncApiResponse:
+        url = f"{self.base_url}/commerce/trackPurchase"
+        response = await self.make_request(url, req)
+        return response
+
+    async def make_request(
+        self, url: str, request: IterableRequest, compress: bool = False
+    ) -> AsyncApiResponse:
+        path = url[len(self.base_url) :]
+        data, body, headers = self._encode(request, path, compress)
+        session = self._get_session()
+        attempt = 1
+        while True:
+            delay = self.rate_limiter.reserve(path)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            self._log_request(url, data)
+            start = time.monotonic()
+            try:
+                async with session.post(url, data=body, headers=headers) as res:
+                    response = AsyncApiResponse(res.status, await res.text())
+                    retry_after = parse_retry_after(res.headers.get("Retry-After"))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                self._observe(path, request, time.monotonic() - start, None)
+                # the connection was never established so the request can't have
+                # reached Iterable, mirroring the retries done by the sync client
+                if (
+                    not isinstance(e, aiohttp.ClientConnectorError)
+                    or attempt > self.max_retries
+                ):
+                    raise
+                self._logger.debug(f"retrying request {url} after error {e}")
+                attempt += 1
+                continue
+
+            self._observe(path, request, time.monotonic() - start, response.status_code)
+
+            self._logger.debug(
+                f"got response {url} {response.status_code} {response.text}"
+            )
+            if response.status_code != 429 or attempt > self.max_retries:
+                return response
+
+            # 429 responses are never processed so they're always safe to retry
+            if retry_after is None:
+                retry_after = backoff_delay(attempt)
+            self._logger.info(f"rate limited by {url}, retrying in {retry_after}s")
+            self.rate_limiter.pause(path, retry_after)
+            attempt += 1
+
+    async def close(self) -> None:
+        """
+        Close the underlying HTTP session. Must be called from the event loop that
+        made the requests.
+
+        :return: none
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        # aiohttp sessions are bound to the running event loop so they're created lazily
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                headers={"Api-Key": self.api_key, "Content-Type": "application/json"},
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+            )
+        return self.session
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, List, Optional, Set
+
+from iterable_data_import.error_recorders.api_error_recorder import (
+    ApiErrorRecorder,
+)
+from iterable_data_import.importers.api_importer import ApiImporter
+from iterable_data_import.importers.iterable_request import IterableRequest
+from iterable_data_import.importers.batch import DEFAULT_MAX_BATCH_BYTES
+from iterable_data_import.importers.async_api_client import (
+    AsyncApiClient,
+    AsyncApiResponse,
+)
+
+AsyncSendFunction = Callable[[IterableRequest], Awaitable[AsyncApiResponse]]
+
+
+class AsyncApiImporter(ApiImporter):
+    """
+    An import service that sends data to Iterable using an asynchronous API client.
+
+    Requests are sent from an event loop running on a background thread so that up to
+    max_in_flight requests can be waiting on Iterable at the same time. Calls to
+    handle_actions only block once max_in_flight requests are outstanding. If the API
+    client has a concurrency controller, it may lower the number of requests in
+    flight below max_in_flight. Shutdown waits for every in flight request to
+    complete and closes the API client.
+
+    Batching, retries, coalescing and error recording are described in
+    [[ApiImporter]].
+    """
+
+    def __init__(
+        self,
+        api_client: AsyncApiClient,
+        error_recorder: ApiErrorRecorder,
+        users_per_batch: int = 1000,
+        events_per_batch: int = 1000,
+        max_batch_bytes: Optional[int] = DEFAULT_MAX_BATCH_BYTES,
+        max_in_flight: int = 10,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        coalesce_users: bool = False,
+    ) -> None:
+        super().__init__(
+            api_client,
+            error_recorder,
+            users_per_batch=users_per_batch,
+            events_per_batch=events_per_batch,
+            max_batch_bytes=max_batch_bytes,
+            max_retries=max_retries,
+            retry_backoff=retry_backoff,
+            coalesce_users=coalesce_users,
+        )
+
+        if max_in_flight < 1:
+            raise ValueError(
+                f"max_in_flight must be greater than or equal to 1, {max_in_flight} provided"
+            )
+
+        self.max_in_flight = max_in_flight
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._pending: Set[Future] = set()
+        self._pending_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._logger = logging.getLogger("importers.AsyncApiImporter")
+
+    @property
+    def pending_requests(self) -> Optional[int]:
+        with self._pending_lock:
+            return len(self._pending)
+
+    def _dispatch(
+        self, send: AsyncSendFunction, request: IterableRequest, seqs: List[int]
+    ) -> None:
+        # blocking here is what applies backpressure to the import loop
+        self._in_flight.acquire()
+        controller = self._get_concurrency_controller()
+        if controller is not None:
+            controller.acquire()
+        future = asyncio.run_coroutine_threadsafe(
+            self._send_and_acknowledge(send, request, seqs), self._get_loop()
+        )
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._on_done)
+
+    def _wait_for_requests(self) -> None:
+        with self._pending_lock:
+            pending = list(self._pending)
+        for future in pending:
+            # done callbacks may still be running once result is available, so
+            # failures are collected here rather than relying on _on_done
+            exception = future.exception()
+            if exception is not None:
+                self._record_failure(exception)
+
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(
+                self.api_client.close(), self._loop
+            ).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join()
+            self._loop.close()
+            self._loop = None
+            self._loop_thread = None
+
+    async def _send_and_acknowledge(
+        self, send: AsyncSendFunction, request: IterableRequest, seqs: List[int]
+    ) -> None:
+        await self._send(send, request)
+        self._acks.acknowledge(seqs)
+
+    async def _send(self, send: AsyncSendFunction, request: IterableRequest) -> None:
+        attempt = 0
+        while True:
+            res = await send(request)
+            outcome = self._handle_response(request, res)
+            for smaller_request in outcome.resend:
+                await self._send(send, smaller_request)
+
+            if not outcome.retry:
+                return
+
+            attempt += 1
+            delay = self._retry_delay(outcome, res, attempt)
+            if delay is None:
+                return
+
+            await asyncio.sleep(delay)
+            request = outcome.retry
+
+    def _on_done(self, future: Future) -> None:
+        with self._pending_lock:
+            self._pending.discard(future)
+        controller = self._get_concurrency_controller()
+        if controller is not None:
+            controller.release()
+        self._in_flight.release()
+        if not future.cancelled() and future.exception() is not None:
+            self._logger.error(f"request failed: {future.exception()}")
+            self._record_failure(future.exception())
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._loop_thread = threading.Thread(
+                target=self._loop.run_forever,
+                name="AsyncApiImporter-event-loop",
+                daemon=True,
+            )
+            self._loop_thread.start()
+        return self._loop
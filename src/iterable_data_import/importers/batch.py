@@ -0,0 +1,164 @@
+from typing import Dict, List, Optional, Tuple
+
+from iterable_data_import.iterable_resource import IterableResource, UserProfile
+from iterable_data_import.json_serializer import JsonSerializer
+
+# requests larger than this are rejected by the Iterable API
+DEFAULT_MAX_BATCH_BYTES = 4 * 1024 * 1024
+
+_SUFFIX = b"]}"
+
+
+class Batch:
+    """
+    A batch of resources for a bulk request that is full once it holds max_items
+    items or adding another item would take the request body over max_bytes bytes
+
+    Items are encoded to JSON as they're added, so the request body is built up
+    incrementally and no items are encoded when the batch is sent. The body is
+    {"<field>":[<item>,<item>,...]}, which makes its size exact.
+    """
+
+    def __init__(
+        self, field: str, max_items: int, max_bytes: Optional[int] = None
+    ) -> None:
+        self.field = field
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.items: List[IterableResource] = []
+        # sequence numbers of the import actions that added the items
+        self.seqs: List[int] = []
+        self._prefix = f'{{"{field}":['.encode("utf-8")
+        self._encoded_items: List[bytes] = []
+        self.size_bytes = len(self._prefix) + len(_SUFFIX)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @property
+    def is_full(self) -> bool:
+        return len(self.items) >= self.max_items
+
+    @property
+    def body(self) -> bytes:
+        """
+        The bulk request body
+
+        :return: the request body encoded as JSON
+        """
+        return b"".join([self._prefix, b",".join(self._encoded_items), _SUFFIX])
+
+    def fits(self, item_size: int) -> bool:
+        """
+        Whether an item of the given size can be added without exceeding max_bytes. An
+        empty batch always fits an item so that oversized items are still sent.
+
+        :param item_size: encoded size of the item in bytes
+        :return: true if the item fits
+        """
+        if self.max_bytes is None or not self.items:
+            return True
+        # items are separated by a comma
+        return self.size_bytes + item_size + 1 <= self.max_bytes
+
+    def append(self, item: IterableResource, encoded: bytes, seq: int) -> None:
+        """
+        Add an item to the batch
+
+        :param item: the resource
+        :param encoded: the resource's API dictionary encoded as JSON
+        :param seq: sequence number of the import action that added the item
+        :return: none
+        """
+        if self.items:
+            self.size_bytes += 1
+        self.size_bytes += len(encoded)
+        self.items.append(item)
+        self._encoded_items.append(encoded)
+        self.seqs.append(seq)
+
+
+class CoalescingUserBatch(Batch):
+    """
+    A batch of user profiles where repeated updates to the same user are merged into a
+    single profile rather than sent as separate items
+
+    Data fields are merged last write wins. When merge_nested_objects is set, nested
+    objects are merged recursively the same way Iterable merges them. Updates are only
+    merged when their prefer_user_id and merge_nested_objects flags match, otherwise
+    the update is added as a new item so the result is the same as sending every
+    update in order.
+    """
+
+    def __init__(
+        self, max_items: int, max_bytes: Optional[int], serializer: JsonSerializer
+    ) -> None:
+        super().__init__("users", max_items, max_bytes)
+        self.serializer = serializer
+        # index of the latest item for each (email, user_id)
+        self._latest: Dict[Tuple[Optional[str], Optional[str]], int] = {}
+
+    def coalesce(self, user: UserProfile, seq: int) -> bool:
+        """
+        Merge a user profile into the batch's latest update to the same user
+
+        :param user: the user profile
+        :param seq: sequence number of the import action that added the profile
+        :return: true if the profile was merged, false if it must be appended instead
+        """
+        index = self._latest.get((user.email, user.user_id))
+        if index is None:
+            return False
+
+        existing = self.items[index]
+        if (
+            existing.prefer_user_id != user.prefer_user_id
+            or existing.merge_nested_objects != user.merge_nested_objects
+        ):
+            return False
+
+        merged = UserProfile(
+            user.email,
+            user.user_id,
+            _merge_data_fields(
+                existing.data_fields, user.data_fields, user.merge_nested_objects
+            ),
+            user.prefer_user_id,
+            user.merge_nested_objects,
+        )
+        sources = getattr(existing, "sources", None)
+        if sources is not None:
+            # the merged profile came from the records of both
+            merged.sources = sources + getattr(user, "sources", ())
+        encoded = self.serializer.dumps(merged.to_api_dict)
+        size_change = len(encoded) - len(self._encoded_items[index])
+        if self.max_bytes is not None and (
+            self.size_bytes + size_change > self.max_bytes
+        ):
+            return False
+
+        self.items[index] = merged
+        self._encoded_items[index] = encoded
+        self.seqs.append(seq)
+        self.size_bytes += size_change
+        return True
+
+    def append(self, item: UserProfile, encoded: bytes, seq: int) -> None:
+        super().append(item, encoded, seq)
+        self._latest[(item.email, item.user_id)] = len(self.items) - 1
+
+
+def _merge_data_fields(
+    old: Dict[str, object], new: Dict[str, object], merge_nested_objects: bool
+) -> Dict[str, object]:
+    merged = dict(old)
+    for field, value in new.items():
+        if (
+            merge_nested_objects
+            and isinstance(value, dict)
+            and isinstance(merged.get(field), dict)
+        ):
+            merged[field] = _merge_data_fields(merged[field], value, True)
+        else:
+            merged[field] = value
+    return merged
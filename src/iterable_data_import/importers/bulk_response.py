@@ -0,0 +1,210 @@
+import json
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from iterable_data_import.importers.iterable_request import IterableRequest
+
+# the server failed while processing the request. 429s are retried by the API
+# clients, which honor Retry-After, so one that gets here has run out of retries
+RETRYABLE_STATUS_CODES = frozenset([500, 502, 503, 504])
+
+PAYLOAD_TOO_LARGE_STATUS_CODE = 413
+
+# failedUpdates keys of bulk responses listing items that will fail again if resent
+PERMANENT_EMAIL_FAILURES = (
+    "invalidEmails",
+    "notFoundEmails",
+    "forgottenEmails",
+    "invalidDataEmails",
+)
+PERMANENT_USER_ID_FAILURES = (
+    "invalidUserIds",
+    "notFoundUserIds",
+    "forgottenUserIds",
+    "invalidDataUserIds",
+)
+
+# failedUpdates keys of bulk responses listing items that may succeed if resent
+RETRYABLE_EMAIL_FAILURES = ("conflictEmails",)
+RETRYABLE_USER_ID_FAILURES = ("conflictUserIds",)
+
+_FAILURE_KEYS = (
+    PERMANENT_EMAIL_FAILURES
+    + PERMANENT_USER_ID_FAILURES
+    + RETRYABLE_EMAIL_FAILURES
+    + RETRYABLE_USER_ID_FAILURES
+)
+
+_logger = logging.getLogger("importers.bulk_response")
+
+
+class ResponseOutcome:
+    """
+    The parts of a request that should be retried, that permanently failed, and that
+    should be resent straight away as smaller requests, based on the API response
+
+    retry_text and failed_text are the response body as it applies to the retry and
+    failed requests, the one recorded alongside their items. When the response lists
+    failed items by index, the indexes are renumbered to positions in those requests.
+    """
+
+    def __init__(
+        self,
+        retry: Optional[IterableRequest] = None,
+        failed: Optional[IterableRequest] = None,
+        resend: Optional[List[IterableRequest]] = None,
+        retry_text: Optional[str] = None,
+        failed_text: Optional[str] = None,
+    ) -> None:
+        self.retry = retry
+        self.failed = failed
+        self.resend = resend or []
+        self.retry_text = retry_text
+        self.failed_text = failed_text
+
+
+def evaluate_response(
+    request: IterableRequest, status_code: int, text: str
+) -> ResponseOutcome:
+    """
+    Work out which items of a request need to be retried or recorded as errors
+
+    Whole requests are retried after a retryable status code if they're idempotent.
+    Requests that were too large are split in half. Successful bulk responses may
+    still list items that failed, in which case only those items are retried or
+    recorded. Failed items are matched by their index in the request when the
+    response gives it, and by email or userId otherwise.
+
+    :param request: the request that was sent
+    :param status_code: the response HTTP status code
+    :param text: the response body
+    :return: the outcome
+    """
+    if status_code == PAYLOAD_TOO_LARGE_STATUS_CODE and len(request.items) > 1:
+        middle = len(request.items) // 2
+        halves = [request.items[:middle], request.items[middle:]]
+        return ResponseOutcome(resend=[request.with_items(half) for half in halves])
+
+    if status_code >= 400:
+        if status_code in RETRYABLE_STATUS_CODES and request.is_idempotent:
+            return ResponseOutcome(retry=request, retry_text=text)
+        return ResponseOutcome(failed=request, failed_text=text)
+
+    body = _parse_body(text)
+    if not body or not body.get("failCount"):
+        return ResponseOutcome()
+
+    failed_updates = body.get("failedUpdates") or {}
+    permanent_indexes, permanent_emails = _collect(
+        body, failed_updates, PERMANENT_EMAIL_FAILURES
+    )
+    permanent_user_id_indexes, permanent_user_ids = _collect(
+        body, failed_updates, PERMANENT_USER_ID_FAILURES
+    )
+    retryable_indexes, retryable_emails = _collect(
+        body, failed_updates, RETRYABLE_EMAIL_FAILURES
+    )
+    retryable_user_id_indexes, retryable_user_ids = _collect(
+        body, failed_updates, RETRYABLE_USER_ID_FAILURES
+    )
+    permanent_indexes |= permanent_user_id_indexes
+    retryable_indexes |= retryable_user_id_indexes
+
+    retry: List[int] = []
+    failed: List[int] = []
+    for index, item in enumerate(request.items):
+        email = getattr(item, "email", None)
+        user_id = getattr(item, "user_id", None)
+        if (
+            index in permanent_indexes
+            or email in permanent_emails
+            or user_id in permanent_user_ids
+        ):
+            failed.append(index)
+        elif (
+            index in retryable_indexes
+            or email in retryable_emails
+            or user_id in retryable_user_ids
+        ):
+            retry.append(index)
+
+    if not retry and not failed:
+        _logger.warning(
+            f"{body['failCount']} items failed but none could be identified: {text}"
+        )
+
+    has_indexes = bool(permanent_indexes or retryable_indexes)
+    return ResponseOutcome(
+        retry=_subset_request(request, retry),
+        failed=_subset_request(request, failed),
+        retry_text=_subset_text(body, retry) if has_indexes else text,
+        failed_text=_subset_text(body, failed) if has_indexes else text,
+    )
+
+
+def _subset_request(
+    request: IterableRequest, positions: List[int]
+) -> Optional[IterableRequest]:
+    if not positions:
+        return None
+    return request.with_items([request.items[i] for i in positions])
+
+
+def _subset_text(body: dict, positions: List[int]) -> str:
+    # the response body for the items at positions of the request, with the indexes
+    # of failed items renumbered to their position among them, and the indexes of
+    # other items dropped, so that the body matches the items it's recorded with
+    new_indexes = {old: new for new, old in enumerate(positions)}
+    subset = dict(body)
+    subset.update(_renumber(body, new_indexes))
+    failed_updates = body.get("failedUpdates")
+    if isinstance(failed_updates, dict):
+        subset["failedUpdates"] = {
+            **failed_updates,
+            **_renumber(failed_updates, new_indexes),
+        }
+    subset["failCount"] = len(positions)
+    if "successCount" in subset:
+        subset["successCount"] = 0
+    return json.dumps(subset)
+
+
+def _renumber(failures: dict, new_indexes: Dict[int, int]) -> dict:
+    renumbered = {}
+    for key in _FAILURE_KEYS:
+        entries = failures.get(key)
+        if not entries:
+            continue
+        kept = []
+        for entry in entries:
+            if not isinstance(entry, dict) or not isinstance(entry.get("index"), int):
+                kept.append(entry)
+            elif entry["index"] in new_indexes:
+                kept.append({**entry, "index": new_indexes[entry["index"]]})
+        renumbered[key] = kept
+    return renumbered
+
+
+def _parse_body(text: str) -> Optional[dict]:
+    try:
+        body = json.loads(text)
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+
+def _collect(
+    body: dict, failed_updates: dict, keys: Iterable[str]
+) -> Tuple[Set[int], Set[str]]:
+    # failures are listed by email or userId, or as {"index": ...} objects giving the
+    # position of the item in the request. Indexes are preferred since several items,
+    # e.g. events, may share an email and only some of them may have failed
+    indexes: Set[int] = set()
+    identifiers: Set[str] = set()
+    for key in keys:
+        for failure in (body.get(key) or []) + (failed_updates.get(key) or []):
+            if isinstance(failure, dict) and isinstance(failure.get("index"), int):
+                indexes.add(failure["index"])
+            elif isinstance(failure, str):
+                identifiers.add(failure)
+    return indexes, identifiers
@@ -0,0 +1,181 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
+
+
+class AimdConcurrencyController:
+    """
+    Adaptive limit on the number of requests in flight, using additive increase and
+    multiplicative decrease (AIMD)
+
+    API clients report the latency and status of every response with observe. While
+    the p95 latency of recent responses stays within latency_tolerance times the
+    baseline p95, the limit grows by roughly 1 for every limit successful responses.
+    A 429, a 5xx or a timeout multiplies the limit by decrease_factor, at most once
+    per baseline latency so that a burst of concurrent failures only backs off once.
+
+    Importers call acquire before sending a request and release once it completes.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 1.5,
+        window_size: int = 50,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if min_limit < 1:
+            raise ValueError(
+                f"min_limit must be greater than or equal to 1, {min_limit} provided"
+            )
+
+        if max_limit < min_limit:
+            raise ValueError(
+                f"max_limit must be greater than or equal to min_limit, {max_limit} provided"
+            )
+
+        if not min_limit <= initial_limit <= max_limit:
+            raise ValueError(
+                f"initial_limit must be between min_limit and max_limit, {initial_limit} provided"
+            )
+
+        if not 0 < decrease_factor < 1:
+            raise ValueError(
+                f"decrease_factor must be between 0 and 1, {decrease_factor} provided"
+            )
+
+        if latency_tolerance < 1:
+            raise ValueError(
+                f"latency_tolerance must be greater than or equal to 1, {latency_tolerance} provided"
+            )
+
+        if window_size < 1:
+            raise ValueError(
+                f"window_size must be greater than or equal to 1, {window_size} provided"
+            )
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.window_size = window_size
+        self._clock = clock
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._latencies: Deque[float] = deque(maxlen=window_size)
+        self._baseline_p95: Optional[float] = None
+        self._last_decrease = float("-inf")
+        self._successes = 0
+        self._failures = 0
+        self._condition = threading.Condition()
+        self._logger = logging.getLogger("importers.AimdConcurrencyController")
+
+    @property
+    def limit(self) -> int:
+        """
+        The current maximum number of requests in flight
+        """
+        return int(self._limit)
+
+    @property
+    def state(self) -> Dict[str, object]:
+        """
+        A snapshot of the controller state, useful for logging
+
+        :return: dictionary of the current limit, requests in flight, p95 latency,
+            baseline p95 latency and response counts
+        """
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "p95_latency": self._p95(),
+                "baseline_p95_latency": self._baseline_p95,
+                "successes": self._successes,
+                "failures": self._failures,
+            }
+
+    def acquire(self) -> None:
+        """
+        Block until another request may be sent
+
+        :return: none
+        """
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self) -> None:
+        """
+        Mark a request acquired with acquire as complete
+
+        :return: none
+        """
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    def observe(self, latency: Optional[float], status_code: Optional[int]) -> None:
+        """
+        Record the outcome of a request
+
+        :param latency: seconds between sending the request and receiving the response
+        :param status_code: the response HTTP status code, or None if the request
+            timed out or the connection failed
+        :return: none
+        """
+        with self._condition:
+            previous = self.limit
+            if status_code is None or status_code == 429 or status_code >= 500:
+                self._failures += 1
+                self._decrease()
+            else:
+                self._successes += 1
+                self._latencies.append(latency)
+                self._increase()
+
+            if self.limit != previous:
+                self._logger.info(
+                    f"concurrency limit changed from {previous} to {self.limit} "
+                    f"(p95 latency {self._p95()}, baseline {self._baseline_p95})"
+                )
+                self._condition.notify_all()
+
+    def _increase(self) -> None:
+        if len(self._latencies) < self.window_size:
+            return
+
+        p95 = self._p95()
+        if self._baseline_p95 is None or p95 < self._baseline_p95:
+            self._baseline_p95 = p95
+        elif p95 <= self._baseline_p95 * self.latency_tolerance:
+            # drift slowly towards the current latency so the baseline can follow
+            # gradual changes in API performance
+            self._baseline_p95 += (p95 - self._baseline_p95) * 0.05
+        else:
+            return
+
+        self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+    def _decrease(self) -> None:
+        now = self._clock()
+        cooldown = self._baseline_p95 or 1.0
+        if now - self._last_decrease < cooldown:
+            return
+
+        self._last_decrease = now
+        self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+        # latencies observed at the old limit no longer describe the API
+        self._latencies.clear()
+
+    def _p95(self) -> Optional[float]:
+        if not self._latencies:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
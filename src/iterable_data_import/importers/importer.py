@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from iterable_data_import.import_action import ImportAction
 
@@ -17,6 +17,29 @@ class Importer:
         """
         pass
 
+    @property
+    def acknowledged_actions(self) -> Optional[int]:
+        """
+        The number of import actions, counted from the first action passed to
+        handle_actions, that have all been sent to Iterable and either accepted or
+        recorded as errors. Used to checkpoint imports.
+
+        :return: the number of acknowledged actions, or None if the importer doesn't
+            track acknowledgements
+        """
+        return None
+
+    @property
+    def pending_requests(self) -> Optional[int]:
+        """
+        The number of requests handed to the importer's sender threads or event loop
+        that haven't been sent yet, e.g. to monitor whether sending is keeping up
+
+        :return: the number of pending requests, or None if the importer sends
+            requests on the calling thread
+        """
+        return None
+
     def shutdown(self) -> None:
         """
         Perform clean up tasks and shutdown.
@@ -1,6 +1,8 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from iterable_data_import import UserProfile, CustomEvent, Purchase
+from iterable_data_import.iterable_resource import IterableResource
+from iterable_data_import.json_serializer import JsonSerializer
 
 
 class IterableRequest:
@@ -8,22 +10,65 @@ class IterableRequest:
     Representation of an Iterable API request body
     """
 
+    _serialized: Optional[bytes] = None
+
+    def serialize(self, serializer: JsonSerializer) -> bytes:
+        """
+        Get the request body encoded as JSON. The body is only encoded once, later
+        calls return the same bytes so they can be shared by sending, logging and
+        error recording.
+
+        :param serializer: the serializer used to encode the body the first time
+        :return: the encoded request body
+        """
+        if self._serialized is None:
+            self._serialized = serializer.dumps(self.to_api_dict)
+        return self._serialized
+
     @property
     def to_api_dict(self) -> Dict[str, object]:
         pass
 
+    @property
+    def items(self) -> List[IterableResource]:
+        """
+        The resources sent in the request
+        """
+        pass
+
+    @property
+    def is_idempotent(self) -> bool:
+        """
+        Whether sending the request more than once has the same effect as sending it
+        once, i.e. whether it's safe to retry after a server error
+        """
+        pass
+
+    def with_items(self, items: List[IterableResource]) -> "IterableRequest":
+        """
+        Create a request of the same type containing only the given resources
+
+        :param items: a subset of the request items
+        :return: the new request
+        """
+        pass
+
 
 class BulkUserUpdateRequest(IterableRequest):
     """
     Class representing an Iterable bulk user update request body
 
     See: https://api.iterable.com/api/docs#users_bulkUpdateUser
+
+    The request body can be provided already encoded as serialized, e.g. by a
+    [[Batch]] that encoded the users as they were added.
     """
 
     SUCCESS_HTTP_STATUS = 200
 
-    def __init__(self, users: List[UserProfile]):
+    def __init__(self, users: List[UserProfile], serialized: Optional[bytes] = None):
         self.users = users
+        self._serialized = serialized
 
     @property
     def to_api_dict(self) -> Dict[str, object]:
@@ -35,18 +80,32 @@ class BulkUserUpdateRequest(IterableRequest):
         req_api_dict = {"users": [user.to_api_dict for user in self.users]}
         return req_api_dict
 
+    @property
+    def items(self) -> List[UserProfile]:
+        return self.users
+
+    @property
+    def is_idempotent(self) -> bool:
+        return True
+
+    def with_items(self, items: List[UserProfile]) -> "BulkUserUpdateRequest":
+        return BulkUserUpdateRequest(items)
+
 
 class BulkTrackCustomEventRequest(IterableRequest):
     """
     Class representing an Iterable bulk track custom event request body
 
     See: https://api.iterable.com/api/docs#events_trackBulk
+
+    The request body can be provided already encoded as serialized.
     """
 
     SUCCESS_HTTP_STATUS = 200
 
-    def __init__(self, events: List[CustomEvent]):
+    def __init__(self, events: List[CustomEvent], serialized: Optional[bytes] = None):
         self.events = events
+        self._serialized = serialized
 
     @property
     def to_api_dict(self) -> Dict[str, object]:
@@ -58,6 +117,18 @@ class BulkTrackCustomEventRequest(IterableRequest):
         req_api_dict = {"events": [event.to_api_dict for event in self.events]}
         return req_api_dict
 
+    @property
+    def items(self) -> List[CustomEvent]:
+        return self.events
+
+    @property
+    def is_idempotent(self) -> bool:
+        # Iterable deduplicates events by id
+        return all(event.event_id for event in self.events)
+
+    def with_items(self, items: List[CustomEvent]) -> "BulkTrackCustomEventRequest":
+        return BulkTrackCustomEventRequest(items)
+
 
 class TrackPurchaseRequest(IterableRequest):
     """
@@ -79,3 +150,15 @@ class TrackPurchaseRequest(IterableRequest):
         :return: the api request body dictionary
         """
         return self.purchase.to_api_dict
+
+    @property
+    def items(self) -> List[Purchase]:
+        return [self.purchase]
+
+    @property
+    def is_idempotent(self) -> bool:
+        # Iterable deduplicates purchases by id
+        return bool(self.purchase.purchase_id)
+
+    def with_items(self, items: List[Purchase]) -> "TrackPurchaseRequest":
+        return TrackPurchaseRequest(items[0])
@@ -1,5 +1,5 @@
 import logging
-from typing import List
+from typing import List, Optional
 
 from iterable_data_import.import_action import ImportAction
 from iterable_data_import.importers.importer import Importer
@@ -12,10 +12,16 @@ class NoOpImporter(Importer):
 
     def __init__(self):
         self._logger = logging.getLogger("importers.NoOpImportService")
+        self._handled = 0
 
     def handle_actions(self, actions: List[ImportAction]) -> None:
         for action in actions:
             self._logger.debug(f"no op handle action {action}")
+        self._handled += len(actions)
+
+    @property
+    def acknowledged_actions(self) -> Optional[int]:
+        return self._handled
 
     def shutdown(self):
         self._logger.debug("shutdown complete")
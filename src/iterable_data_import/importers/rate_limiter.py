@@ -0,0 +1,162 @@
+import email.utils
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+
+class TokenBucket:
+    """
+    A thread safe token bucket allowing rate requests per second with bursts of up to
+    burst requests
+
+    Rather than blocking, callers reserve a token and are told how long to wait before
+    using it. This lets the same bucket pace both threads and coroutines.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate is not None and rate <= 0:
+            raise ValueError(f"rate must be greater than 0, {rate} provided")
+
+        if burst is not None and burst < 1:
+            raise ValueError(
+                f"burst must be greater than or equal to 1, {burst} provided"
+            )
+
+        self.rate = rate
+        # by default requests are evenly spaced rather than sent in bursts
+        self.burst = burst if burst is not None else 1.0
+        self._clock = clock
+        self._tokens = self.burst
+        # time tokens were last refilled, in the future while the bucket is paused
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token from the bucket
+
+        :return: the number of seconds to wait before sending the request
+        """
+        with self._lock:
+            now = self._clock()
+            if self.rate is None:
+                return max(0.0, self._last - now)
+
+            if now > self._last:
+                elapsed = now - self._last
+                self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+                self._last = now
+
+            self._tokens -= 1
+            debt = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return (self._last - now) + debt
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop handing out tokens for the given number of seconds, e.g. after the API
+        responds with a Retry-After header
+
+        :param seconds: number of seconds to pause
+        :return: none
+        """
+        with self._lock:
+            resume_at = self._clock() + seconds
+            if resume_at > self._last:
+                self._last = resume_at
+                self._tokens = 0.0
+
+
+class RateLimiter:
+    """
+    Per endpoint client side rate limiter
+
+    Rates are configured in requests per second for API paths such as
+    "/users/bulkUpdate". Paths without a configured rate use default_rate, which
+    defaults to no limit. Every path can be paused when the API asks clients to
+    back off.
+    """
+
+    def __init__(
+        self,
+        rates: Optional[Dict[str, float]] = None,
+        default_rate: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        self._clock = clock
+        self._buckets: Dict[str, TokenBucket] = {
+            path: TokenBucket(rate, clock=clock) for path, rate in self.rates.items()
+        }
+        self._lock = threading.Lock()
+
+    def reserve(self, path: str) -> float:
+        """
+        Reserve a request to the given path
+
+        :param path: API path the request will be sent to
+        :return: the number of seconds to wait before sending the request
+        """
+        return self._bucket(path).reserve()
+
+    def pause(self, path: str, seconds: float) -> None:
+        """
+        Pause requests to the given path
+
+        :param path: API path to pause
+        :param seconds: number of seconds to pause
+        :return: none
+        """
+        self._bucket(path).pause(seconds)
+
+    def _bucket(self, path: str) -> TokenBucket:
+        bucket = self._buckets.get(path)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(path)
+                if bucket is None:
+                    bucket = TokenBucket(self.default_rate, clock=self._clock)
+                    self._buckets[path] = bucket
+        return bucket
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header, which is either a number of seconds or an HTTP date
+
+    :param value: the header value
+    :return: the number of seconds to wait, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, base: float = 1.0, maximum: float = 60.0) -> float:
+    """
+    Exponential backoff delay used when the API doesn't say how long to wait
+
+    :param attempt: the retry attempt, starting at 1
+    :param base: delay for the first attempt
+    :param maximum: the maximum delay
+    :return: the number of seconds to wait
+    """
+    return min(maximum, base * 2 ** (attempt - 1))
@@ -1,4 +1,7 @@
 import logging
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
 
 import requests
 
@@ -8,13 +11,34 @@ from iterable_data_import.importers.iterable_request import (
     TrackPurchaseRequest,
     IterableRequest,
 )
-
-API_BASE_URL = "https://api.iterable.com/api"
+from iterable_data_import.importers.concurrency_controller import (
+    AimdConcurrencyController,
+)
+from iterable_data_import.importers.api_client import API_BASE_URL, ApiClientMixin
+from iterable_data_import.json_serializer import JsonSerializer, default_serializer
+from iterable_data_import.metrics import Metrics
+from iterable_data_import.importers.rate_limiter import (
+    RateLimiter,
+    parse_retry_after,
+    backoff_delay,
+)
 
 
-class SyncApiClient:
+class SyncApiClient(ApiClientMixin):
     """
     Synchronous client for the Iterable API
+
+    Requests are paced by the rate limiter and 429 responses are retried up to
+    max_retries times, waiting for as long as the Retry-After header asks. The latency
+    and status of every response is reported to the concurrency controller, if any.
+
+    Request bodies are encoded by serializer, which defaults to orjson when it's
+    installed. When compress_requests is set, bulk request bodies are gzipped at
+    compression_level.
+
+    When metrics is provided, the time spent encoding request bodies and the latency
+    of every response, by endpoint and status, are observed. Importers observe their
+    own stages with the client's metrics.
     """
 
     def __init__(
@@ -23,6 +47,13 @@ class SyncApiClient:
         base_url: str = API_BASE_URL,
         timeout: int = 10,
         max_retries: int = 5,
+        pool_maxsize: int = 10,
+        rate_limiter: Optional[RateLimiter] = None,
+        concurrency_controller: Optional[AimdConcurrencyController] = None,
+        serializer: Optional[JsonSerializer] = None,
+        compress_requests: bool = False,
+        compression_level: int = 6,
+        metrics: Optional[Metrics] = None,
     ) -> None:
         if timeout <= 0:
             raise ValueError(f"timeout must be greater than 0, {timeout} provided")
@@ -32,26 +63,48 @@ class SyncApiClient:
                 f"max_retries must be greater than 0, {max_retries} provided"
             )
 
+        if pool_maxsize <= 0:
+            raise ValueError(
+                f"pool_maxsize must be greater than 0, {pool_maxsize} provided"
+            )
+
+        if not 0 <= compression_level <= 9:
+            raise ValueError(
+                f"compression_level must be between 0 and 9, {compression_level} provided"
+            )
+
         self.api_key = api_key
         self.base_url = base_url
         self.timeout = timeout
         self.max_retries = max_retries
+        self.pool_maxsize = pool_maxsize
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.concurrency_controller = concurrency_controller
+        self.serializer = serializer or default_serializer()
+        self.compress_requests = compress_requests
+        self.compression_level = compression_level
+        self.metrics = metrics
 
         self.session = requests.Session()
-        adapter = requests.adapters.HTTPAdapter(max_retries=max_retries)
-        self.session.mount(API_BASE_URL, adapter)
-        self.session.headers.update({"Api-Key": self.api_key})
+        # the pool should hold a connection for every thread sending requests
+        adapter = requests.adapters.HTTPAdapter(
+            max_retries=max_retries, pool_maxsize=pool_maxsize
+        )
+        self.session.mount(self.base_url, adapter)
+        self.session.headers.update(
+            {"Api-Key": self.api_key, "Content-Type": "application/json"}
+        )
 
         self._logger = logging.getLogger("importers.SyncApiClient")
 
     def bulk_update_users(self, req: BulkUserUpdateRequest) -> requests.Response:
         url = f"{self.base_url}/users/bulkUpdate"
-        response = self.make_request(url, req)
+        response = self.make_request(url, req, self.compress_requests)
         return response
 
     def bulk_track_events(self, req: BulkTrackCustomEventRequest) -> requests.Response:
         url = f"{self.base_url}/events/trackBulk"
-        response = self.make_request(url, req)
+        response = self.make_request(url, req, self.compress_requests)
         return response
 
     def track_purchase(self, req: TrackPurchaseRequest) -> requests.Response:
@@ -59,13 +112,56 @@ class SyncApiClient:
         response = self.make_request(url, req)
         return response
 
-    def make_request(self, url: str, request: IterableRequest) -> requests.Response:
-        # TODO - retry logic based on whether the request is idempotent
-        # requests doesn't retry if data made it to the server
-        # 429 - retry
-        # 500, 502, 503, 504 - retry if idempotent
-        data = request.to_api_dict
-        self._logger.debug(f"making request {url} {data}")
-        response = self.session.post(url, json=data, timeout=self.timeout)
-        self._logger.debug(f"got response {url} {response.status_code} {response.text}")
+    def make_request(
+        self, url: str, request: IterableRequest, compress: bool = False
+    ) -> requests.Response:
+        # requests doesn't retry if data made it to the server, server errors are
+        # retried by the importer when the request is idempotent
+        path = self._get_path(url)
+        data, body, headers = self._encode(request, path, compress)
+        attempt = 1
+        while True:
+            delay = self.rate_limiter.reserve(path)
+            if delay > 0:
+                time.sleep(delay)
+
+            self._log_request(url, data)
+            response = self._post(url, path, body, headers, request)
+            self._logger.debug(
+                f"got response {url} {response.status_code} {response.text}"
+            )
+            if response.status_code != 429 or attempt > self.max_retries:
+                return response
+
+            # 429 responses are never processed so they're always safe to retry
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is None:
+                retry_after = backoff_delay(attempt)
+            self._logger.info(f"rate limited by {url}, retrying in {retry_after}s")
+            self.rate_limiter.pause(path, retry_after)
+            attempt += 1
+
+    def _post(
+        self,
+        url: str,
+        path: str,
+        body: bytes,
+        headers: Optional[Dict[str, str]],
+        request: IterableRequest,
+    ) -> requests.Response:
+        start = time.monotonic()
+        try:
+            response = self.session.post(
+                url, data=body, headers=headers, timeout=self.timeout
+            )
+        except (requests.Timeout, requests.ConnectionError):
+            self._observe(path, request, time.monotonic() - start, None)
+            raise
+
+        self._observe(path, request, time.monotonic() - start, response.status_code)
         return response
+
+    def _get_path(self, url: str) -> str:
+        if url.startswith(self.base_url):
+            return url[len(self.base_url) :]
+        return urlparse(url).path
@@ -1,31 +1,38 @@
 import logging
-from typing import List
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
 
 import requests
 
-from iterable_data_import.errors import UnsupportedImportActionError
 from iterable_data_import.error_recorders.api_error_recorder import (
     ApiErrorRecorder,
 )
-from iterable_data_import.import_action import (
-    ImportAction,
-    UpdateUserProfile,
-    TrackCustomEvent,
-    TrackPurchase,
-)
-from iterable_data_import.importers.importer import Importer
-from iterable_data_import.importers.iterable_request import (
-    BulkUserUpdateRequest,
-    BulkTrackCustomEventRequest,
-    TrackPurchaseRequest,
-    IterableRequest,
-)
+from iterable_data_import.importers.api_importer import ApiImporter
+from iterable_data_import.importers.iterable_request import IterableRequest
 from iterable_data_import.importers.sync_api_client import SyncApiClient
+from iterable_data_import.importers.batch import DEFAULT_MAX_BATCH_BYTES
+
+SendFunction = Callable[[IterableRequest], requests.Response]
+# send function, request and sequence numbers of the actions in the request
+QueuedRequest = Tuple[SendFunction, IterableRequest, List[int]]
 
 
-class SyncApiImporter(Importer):
+class SyncApiImporter(ApiImporter):
     """
     An import service that sends data to Iterable using a synchronous API client
+
+    By default requests are sent on the thread calling handle_actions. When
+    sender_threads is greater than 0, requests are instead handed to a pool of sender
+    threads over a queue holding at most max_queued_requests requests, and
+    handle_actions only blocks while that queue is full. If the API client has a
+    concurrency controller, it decides how many of the sender threads may have a
+    request in flight at once. Shutdown waits for the queued requests to be sent and
+    joins the threads.
+
+    Batching, retries, coalescing and error recording are described in
+    [[ApiImporter]].
     """
 
     def __init__(
@@ -34,104 +41,120 @@ class SyncApiImporter(Importer):
         error_recorder: ApiErrorRecorder,
         users_per_batch: int = 1000,
         events_per_batch: int = 1000,
+        max_batch_bytes: Optional[int] = DEFAULT_MAX_BATCH_BYTES,
+        sender_threads: int = 0,
+        max_queued_requests: int = 100,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        coalesce_users: bool = False,
     ) -> None:
-        if not api_client:
-            raise ValueError("api_client is required")
-
-        if not error_recorder:
-            raise ValueError("error_recorder is required")
-
-        if users_per_batch < 1:
+        super().__init__(
+            api_client,
+            error_recorder,
+            users_per_batch=users_per_batch,
+            events_per_batch=events_per_batch,
+            max_batch_bytes=max_batch_bytes,
+            max_retries=max_retries,
+            retry_backoff=retry_backoff,
+            coalesce_users=coalesce_users,
+        )
+
+        if sender_threads < 0:
             raise ValueError(
-                f"users_per_batch must be greater than or equal to 1, {users_per_batch} provided"
+                f"sender_threads must be greater than or equal to 0, {sender_threads} provided"
             )
 
-        if events_per_batch < 1:
+        if max_queued_requests < 1:
             raise ValueError(
-                f"users_per_batch must be greater than or equal to 1, {events_per_batch} provided"
+                f"max_queued_requests must be greater than or equal to 1, {max_queued_requests} provided"
             )
 
-        self.api_client = api_client
-        self.error_recorder = error_recorder
-        self.users_per_batch = users_per_batch
-        self.users = []
-        self.events_per_batch = events_per_batch
-        self.events = []
+        self.sender_threads = sender_threads
+        self.max_queued_requests = max_queued_requests
+        self._queue: "queue.Queue[Optional[QueuedRequest]]" = queue.Queue(
+            maxsize=max_queued_requests
+        )
+        self._workers: List[threading.Thread] = []
         self._logger = logging.getLogger("importers.SyncApiImportService")
 
-    def handle_actions(self, actions: List[ImportAction]) -> None:
-        """
-        Handle a list of import actions
-
-        Note that many import actions are batched in order to improve throughput. Calling
-        this method may not trigger an immediate write to Iterable. For this reason it's
-        important to call [[SyncApiImporter.shutdown]] when the import is complete.
-
-        :param actions: list of import actions
-        :return: none
-        """
-        for action in actions:
-            self._logger.debug(f"handling import action {action}")
-            if isinstance(action, UpdateUserProfile):
-                self._handle_update_user(action)
-
-            elif isinstance(action, TrackCustomEvent):
-                self._handle_track_event(action)
-
-            elif isinstance(action, TrackPurchase):
-                self._handle_track_purchase(action)
-
-            else:
-                # validation in IterableDataImport should prevent this from ever happening
-                raise UnsupportedImportActionError(
-                    f"{action} is not a supported import action"
-                )
-
-    def _handle_update_user(self, action: UpdateUserProfile):
-        self.users.append(action.user)
-        if len(self.users) >= self.users_per_batch:
-            bulk_update_req = BulkUserUpdateRequest(self.users)
-            res = self.api_client.bulk_update_users(bulk_update_req)
-            self._handle_error(bulk_update_req, res)
-            self.users = []
-
-    def _handle_track_event(self, action: TrackCustomEvent):
-        self.events.append(action.event)
-        if len(self.events) >= self.events_per_batch:
-            bulk_track_req = BulkTrackCustomEventRequest(self.events)
-            res = self.api_client.bulk_track_events(bulk_track_req)
-            self._handle_error(bulk_track_req, res)
-            self.events = []
-
-    def _handle_track_purchase(self, action: TrackPurchase):
-        track_purchase_req = TrackPurchaseRequest(action.purchase)
-        res = self.api_client.track_purchase(track_purchase_req)
-        self._handle_error(track_purchase_req, res)
-
-    def _handle_error(
-        self, request: IterableRequest, response: requests.Response
+    @property
+    def pending_requests(self) -> Optional[int]:
+        # requests being sent have already left the queue
+        return self._queue.qsize() if self.sender_threads else None
+
+    def _dispatch(
+        self, send: SendFunction, request: IterableRequest, seqs: List[int]
     ) -> None:
-        if response.status_code >= 400:
-            self.error_recorder.record(
-                response.status_code, response.text, request.to_api_dict
+        if self.sender_threads == 0:
+            self._send(send, request)
+            self._acks.acknowledge(seqs)
+            return
+
+        if not self._workers:
+            self._start_workers()
+        # blocks while the queue is full, applying backpressure to the import loop
+        self._queue.put((send, request, seqs))
+
+    def _wait_for_requests(self) -> None:
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def _send(self, send: SendFunction, request: IterableRequest) -> None:
+        attempt = 0
+        while True:
+            res = self._send_attempt(send, request)
+            outcome = self._handle_response(request, res)
+            for smaller_request in outcome.resend:
+                self._send(send, smaller_request)
+
+            if not outcome.retry:
+                return
+
+            attempt += 1
+            delay = self._retry_delay(outcome, res, attempt)
+            if delay is None:
+                return
+
+            time.sleep(delay)
+            request = outcome.retry
+
+    def _send_attempt(
+        self, send: SendFunction, request: IterableRequest
+    ) -> requests.Response:
+        controller = self._get_concurrency_controller()
+        if controller is None:
+            return send(request)
+
+        controller.acquire()
+        try:
+            return send(request)
+        finally:
+            controller.release()
+
+    def _start_workers(self) -> None:
+        for i in range(self.sender_threads):
+            worker = threading.Thread(
+                target=self._sender_loop,
+                name=f"SyncApiImporter-sender-{i}",
+                daemon=True,
             )
-
-    def shutdown(self) -> None:
-        """
-        Send the batches of requests that hadn't reached full capacity yet. __Important__: this
-        method must be called before terminating the import or it may not complete successfully.
-
-        :return: none
-        """
-        self._logger.debug("starting shutdown...")
-        if len(self.users) > 0:
-            bulk_update_req = BulkUserUpdateRequest(self.users)
-            res = self.api_client.bulk_update_users(bulk_update_req)
-            self._handle_error(bulk_update_req, res)
-
-        if len(self.events) > 0:
-            bulk_track_req = BulkTrackCustomEventRequest(self.events)
-            res = self.api_client.bulk_track_events(bulk_track_req)
-            self._handle_error(bulk_track_req, res)
-
-        self._logger.debug("shutdown complete")
+            worker.start()
+            self._workers.append(worker)
+
+    def _sender_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                send, request, seqs = item
+                self._send(send, request)
+                self._acks.acknowledge(seqs)
+            except Exception as e:
+                self._logger.error(f"request failed: {e}")
+                self._record_failure(e)
+            finally:
+                self._queue.task_done()
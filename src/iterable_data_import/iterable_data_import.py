@@ -1,14 +1,70 @@
 import logging
+import pickle
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from functools import partial
 from pathlib import PurePath
-from typing import Callable, List, Optional
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
 from iterable_data_import.import_action import ImportAction
-from iterable_data_import.data_sources.data_source import DataSource, FileFormat
+from iterable_data_import.checkpoint import (
+    Checkpoint,
+    CheckpointTracker,
+    FileSystemCheckpoint,
+)
+from iterable_data_import.data_sources.data_source import (
+    DataSource,
+    FileFormat,
+    RecordBatch,
+    RecordBatchFormat,
+    SourceDataRecord,
+    SourcePosition,
+    SourceReference,
+    record_batch_length,
+    record_batch_records,
+    to_record_batches,
+)
+from iterable_data_import.data_sources.api_error_file import (
+    PERMANENT_STATUS_CODES,
+    ApiErrorFile,
+    replay_action,
+)
+from iterable_data_import.data_sources.compression import (
+    Compression,
+    detect_compression,
+)
 from iterable_data_import.data_sources.file_system import FileSystem
+from iterable_data_import.data_sources.mmap_ndjson import MmapNdjsonFileSystem
+from iterable_data_import.data_sources.multi_file_system import (
+    MultiFileSystem,
+    is_multi_file_path,
+)
+from iterable_data_import.data_sources.sharded_data_source import (
+    ShardKeyFunction,
+    ShardedDataSource,
+    parse_shard,
+    shard_path,
+    shard_rate_limits,
+    user_shard_key,
+)
 from iterable_data_import.error_recorders.api_error_recorder import (
     NoOpApiErrorRecorder,
     FileSystemApiErrorRecorder,
 )
+from iterable_data_import.error_recorders.compact_api_error_recorder import (
+    CompactFileSystemApiErrorRecorder,
+)
 from iterable_data_import.error_recorders.map_error_recorder import (
     MapErrorRecorder,
     NoOpMapErrorRecorder,
@@ -18,11 +74,47 @@ from iterable_data_import.importers.importer import Importer
 from iterable_data_import.importers.sync_api_importer import SyncApiImporter
 from iterable_data_import.importers.no_op_importer import NoOpImporter
 from iterable_data_import.importers.sync_api_client import SyncApiClient
+from iterable_data_import.importers.async_api_client import AsyncApiClient
+from iterable_data_import.importers.async_api_importer import AsyncApiImporter
+from iterable_data_import.importers.rate_limiter import RateLimiter
+from iterable_data_import.importers.concurrency_controller import (
+    AimdConcurrencyController,
+)
+from iterable_data_import.metrics import (
+    DISPATCH,
+    ERROR_RECORD,
+    MAP,
+    READ_PARSE,
+    Metrics,
+)
+from iterable_data_import.pipeline import ImportPipeline, MappedRecord, PositionedRecord
 
 
 class IterableDataImport:
     """
     The primary class of the library. Responsible for orchestrating the import process.
+
+    When a checkpoint is provided, the data source position after the last record
+    whose import actions were all acknowledged by the importer is saved every
+    checkpoint_every records and when the import completes.
+
+    When the data source knows how many records it holds, e.g.
+    MmapNdjsonFileSystem.record_count, progress is logged as a percentage with an
+    estimate of the time remaining.
+
+    The map error recorder is closed when the import stops, even if it fails, so that
+    errors buffered by the recorder are written. Error recorders are flushed before
+    each checkpoint is saved.
+
+    When track_sources is set, every resource created by the map function references
+    the source file and position of its source data record in IterableResource.sources,
+    so that CompactFileSystemApiErrorRecorder can record where failed items came from
+    instead of their whole request body. The data source must have a file_path and a
+    position, like FileSystem and MmapNdjsonFileSystem.
+
+    When metrics is provided, the time spent reading records, in the map function,
+    handing import actions to the importer and recording map errors is observed.
+    With worker processes, the map stage is the time spent waiting for the workers.
     """
 
     def __init__(
@@ -30,6 +122,10 @@ class IterableDataImport:
         data_source: DataSource,
         importer: Importer,
         map_error_recorder: MapErrorRecorder,
+        checkpoint: Optional[Checkpoint] = None,
+        checkpoint_every: int = 1000,
+        metrics: Optional[Metrics] = None,
+        track_sources: bool = False,
     ) -> None:
         if not data_source:
             raise ValueError('Missing required argument "data_source"')
@@ -43,37 +139,464 @@ class IterableDataImport:
         self.map_error_recorder = map_error_recorder
         self.importer = importer
         self.data_source = data_source
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+        self.metrics = metrics
+        self.track_sources = track_sources
+        self._checkpoint_tracker: Optional[CheckpointTracker] = None
+        self._pipeline: Optional[ImportPipeline] = None
+        self._source_file: Optional[str] = None
+        self._record_start: Optional[SourcePosition] = None
+        self._total_records: Optional[int] = None
+        self._start_index = 0
+        self._start_time = 0.0
         self._logger = logging.getLogger("IterableDataImport")
 
-    def run(self, map_function: Callable) -> bool:
+    def run(
+        self,
+        map_function: Callable,
+        workers: int = 1,
+        chunk_size: int = 1000,
+        ordered: bool = True,
+        map_threads: int = 0,
+        queue_size: int = 8,
+    ) -> bool:
+        """
+        Run the import
+
+        When workers is greater than 1, source data records are sent in chunks of
+        chunk_size to a pool of worker processes that call the map function. The map
+        function must then be picklable, i.e. defined at the top level of a module.
+        With ordered=True import actions are handled in source order, otherwise they're
+        handled as soon as each chunk has been mapped. Checkpoints require ordered=True.
+        If the data source can be split into parts that are read independently, like
+        MmapNdjsonFileSystem, the worker processes read the records themselves instead.
+
+        When map_threads is greater than 0, the import runs as a pipeline instead: a
+        reader thread, map_threads threads calling the map function and this thread
+        handing import actions to the importer, connected by queues of up to
+        queue_size chunks, see [[ImportPipeline]]. Use it with sender_threads or the
+        async importer so that reading, mapping and sending all overlap, and
+        queue_depths to see which stage is holding the others up.
+
+        :param map_function: function mapping a source data record to import actions
+        :param workers: number of processes calling the map function
+        :param chunk_size: number of records sent to a worker process or map thread at
+            a time
+        :param ordered: whether import actions must be handled in source order
+        :param map_threads: number of pipeline threads calling the map function
+        :param queue_size: maximum number of chunks in each pipeline queue
+        :return: true once the import is complete
+        """
         if not map_function:
             raise ValueError('Missing required argument "map_function"')
 
+        if workers < 1:
+            raise ValueError(
+                f"workers must be greater than or equal to 1, {workers} provided"
+            )
+
+        if chunk_size < 1:
+            raise ValueError(
+                f"chunk_size must be greater than or equal to 1, {chunk_size} provided"
+            )
+
+        if map_threads and workers > 1:
+            raise ValueError("map_threads can't be used with workers")
+
+        if self.checkpoint:
+            self._start_checkpoint(ordered)
+
+        if self.track_sources:
+            self._start_sources(ordered)
+
+        self._start_progress()
         self._logger.info("starting import...")
-        count = (
-            0  # TODO - track count in DataSource, needed for partial restarts anyways
-        )
+        try:
+            count = self._run_records(
+                map_function, workers, chunk_size, ordered, map_threads, queue_size
+            )
+            self.importer.shutdown()
+            if self._checkpoint_tracker:
+                self._checkpoint_tracker.update(self.importer.acknowledged_actions)
+                self._checkpoint_tracker.save()
+        finally:
+            # write the errors buffered recorders are holding, even if the import failed
+            self._close_error_recorders()
+        self._logger.info(f"import complete, processed {count} source data records")
+        return True
 
-        for record in self.data_source:
-            count += 1
-            map_fn_return = None
+    def run_batches(
+        self,
+        map_batch_function: Callable,
+        batch_size: int = 10000,
+        batch_format: RecordBatchFormat = RecordBatchFormat.COLUMNS,
+    ) -> bool:
+        """
+        Run the import, mapping source data records a batch at a time
 
-            try:
-                map_fn_return = map_function(record)
-            except Exception as e:
-                self._logger.error(f"an error occurred processing record {count}: {e}")
-                self.map_error_recorder.record(e, record)
+        The batch map function is called with record batches of up to batch_size
+        records and returns the import actions for the whole batch. Record batches
+        are dictionaries of column name to column values, or pyarrow.RecordBatch
+        objects with batch_format=RecordBatchFormat.ARROW, so simple mappings can be
+        written as column transforms rather than a function call per record. If the
+        batch map function raises an exception, every record in the batch is recorded
+        by the map error recorder. Checkpoints aren't supported.
 
-            import_actions = self._get_import_actions(map_fn_return)
-            self.importer.handle_actions(import_actions)
+        :param map_batch_function: function mapping a record batch to import actions
+        :param batch_size: maximum number of records in a batch
+        :param batch_format: the format of the record batches
+        :return: true once the import is complete
+        """
+        if not map_batch_function:
+            raise ValueError('Missing required argument "map_batch_function"')
+
+        if batch_size < 1:
+            raise ValueError(
+                f"batch_size must be greater than or equal to 1, {batch_size} provided"
+            )
+
+        if self.checkpoint:
+            raise ValueError("checkpoints can't be used with run_batches")
+
+        if self.track_sources:
+            raise ValueError("track_sources can't be used with run_batches")
+
+        self._logger.info("starting import...")
+        if isinstance(self.data_source, DataSource):
+            batches = self.data_source.batches(batch_size, batch_format)
+        else:
+            batches = to_record_batches(self.data_source, batch_size, batch_format)
+        if self.metrics is not None:
+            batches = _observe_iterator(
+                batches, self.metrics, READ_PARSE, record_batch_length
+            )
 
-            if count % 1000 == 0:
+        count = 0
+        try:
+            for batch in batches:
+                size = record_batch_length(batch)
+                import_actions = self._map_batch(map_batch_function, batch, count, size)
+                self._dispatch(import_actions)
+                count += size
                 self._logger.info(f"imported {count} records")
 
-        self.importer.shutdown()
+            self.importer.shutdown()
+        finally:
+            self._close_error_recorders()
         self._logger.info(f"import complete, processed {count} source data records")
         return True
 
+    def _map_batch(
+        self, map_batch_function: Callable, batch: RecordBatch, count: int, size: int
+    ) -> List[ImportAction]:
+        start = time.perf_counter()
+        try:
+            import_actions = self._get_import_actions(map_batch_function(batch))
+        except Exception as e:
+            self._logger.error(
+                f"an error occurred processing records {count + 1} to {count + size}: {e}"
+            )
+            for record in record_batch_records(batch):
+                self._record_map_error(e, record)
+            import_actions = []
+        if self.metrics is not None:
+            self.metrics.observe(MAP, time.perf_counter() - start, size)
+        return import_actions
+
+    def _start_checkpoint(self, ordered: bool) -> None:
+        if not ordered:
+            raise ValueError("checkpoints can't be used with ordered=False")
+
+        if self.importer.acknowledged_actions is None:
+            raise ValueError(
+                f"{self.importer.__class__.__name__} doesn't support checkpoints"
+            )
+
+        position = getattr(self.data_source, "position", None)
+        if position is None:
+            raise ValueError(
+                f"{self.data_source.__class__.__name__} doesn't support checkpoints"
+            )
+
+        if position.record_index > 0:
+            self._logger.info(f"resuming import after record {position.record_index}")
+        self._checkpoint_tracker = CheckpointTracker(
+            self.checkpoint, self.checkpoint_every, self._flush_error_recorders
+        )
+
+    def _start_sources(self, ordered: bool) -> None:
+        if not ordered:
+            raise ValueError("track_sources can't be used with ordered=False")
+
+        file_path = getattr(self.data_source, "file_path", None)
+        position = getattr(self.data_source, "position", None)
+        if file_path is None or position is None:
+            raise ValueError(
+                f"{self.data_source.__class__.__name__} doesn't support track_sources"
+            )
+
+        # each record starts where the one before it ended
+        self._source_file = str(file_path)
+        self._record_start = position
+
+    def _flush_error_recorders(self) -> None:
+        # the errors of records before a checkpoint must be persisted before it's
+        # saved, or they'd be lost if the import is resumed from it
+        self.map_error_recorder.flush()
+        api_error_recorder = getattr(self.importer, "error_recorder", None)
+        if api_error_recorder is not None:
+            api_error_recorder.flush()
+
+    def _close_error_recorders(self) -> None:
+        # the importer closes its recorder on shutdown, which isn't reached when the
+        # import fails. Closing an already closed recorder is harmless.
+        try:
+            self.map_error_recorder.close()
+        finally:
+            api_error_recorder = getattr(self.importer, "error_recorder", None)
+            if api_error_recorder is not None:
+                api_error_recorder.close()
+
+    def _start_progress(self) -> None:
+        self._total_records = getattr(self.data_source, "record_count", None)
+        position = getattr(self.data_source, "position", None)
+        self._start_index = position.record_index if position else 0
+        self._start_time = time.monotonic()
+
+    def _log_progress(self, count: int) -> None:
+        if not self._total_records:
+            self._logger.info(f"imported {count} records")
+        else:
+            done = self._start_index + count
+            remaining = max(self._total_records - done, 0)
+            elapsed = time.monotonic() - self._start_time
+            self._logger.info(
+                f"imported {done} of {self._total_records} records "
+                f"({done / self._total_records:.1%}), "
+                f"about {elapsed / count * remaining:.0f}s remaining"
+            )
+
+        if self._pipeline is not None:
+            self._logger.info(f"queue depths {self.queue_depths()}")
+
+    def queue_depths(self) -> Dict[str, int]:
+        """
+        The number of items waiting between the stages of the import. While run
+        uses a pipeline, the chunks of records in its read, mapped and reordered
+        queues, see [[ImportPipeline.queue_depths]], and under send the requests the
+        importer hasn't finished sending, if it tracks them. Safe to call from
+        another thread while the import runs.
+
+        :return: the number of items waiting by stage
+        """
+        pipeline = self._pipeline
+        depths = pipeline.queue_depths() if pipeline is not None else {}
+        pending_requests = self.importer.pending_requests
+        if pending_requests is not None:
+            depths["send"] = pending_requests
+        return depths
+
+    def _read_records(
+        self,
+    ) -> Iterator[Tuple[SourceDataRecord, Optional[SourcePosition]]]:
+        records = self.data_source
+        if self.metrics is not None:
+            records = _observe_iterator(records, self.metrics, READ_PARSE)
+        with_positions = self._with_positions
+        for record in records:
+            position = self.data_source.position if with_positions else None
+            yield record, position
+
+    @property
+    def _with_positions(self) -> bool:
+        return self._checkpoint_tracker is not None or self._source_file is not None
+
+    def _run_records(
+        self,
+        map_function: Callable,
+        workers: int,
+        chunk_size: int,
+        ordered: bool,
+        map_threads: int,
+        queue_size: int,
+    ) -> int:
+        if map_threads:
+            return self._run_pipeline(
+                map_function, map_threads, chunk_size, queue_size, ordered
+            )
+        if workers == 1:
+            return self._run_serial(map_function)
+        return self._run_parallel(map_function, workers, chunk_size, ordered)
+
+    def _run_serial(self, map_function: Callable) -> int:
+        count = 0
+        metrics = self.metrics
+        for record, position in self._read_records():
+            count += 1
+            if metrics is None:
+                import_actions, error = _map_record(map_function, record)
+            else:
+                start = time.perf_counter()
+                import_actions, error = _map_record(map_function, record)
+                metrics.observe(MAP, time.perf_counter() - start)
+            self._handle_mapped_record(count, record, position, import_actions, error)
+
+        return count
+
+    def _run_pipeline(
+        self,
+        map_function: Callable,
+        map_threads: int,
+        chunk_size: int,
+        queue_size: int,
+        ordered: bool,
+    ) -> int:
+        count = 0
+        self._pipeline = ImportPipeline(
+            self._read_records(),
+            partial(_map_record, map_function),
+            map_threads,
+            chunk_size,
+            queue_size,
+            ordered,
+            self.metrics,
+        )
+        try:
+            for results in self._pipeline:
+                for record, position, import_actions, error in results:
+                    count += 1
+                    self._handle_mapped_record(
+                        count, record, position, import_actions, error
+                    )
+        finally:
+            self._pipeline.close()
+            self._pipeline = None
+        return count
+
+    def _run_parallel(
+        self, map_function: Callable, workers: int, chunk_size: int, ordered: bool
+    ) -> int:
+        count = 0
+        # bound the number of chunks held in memory while the importer catches up
+        max_pending = workers * 2
+        pending: Deque[Tuple[Future, Optional[List[PositionedRecord]]]] = deque()
+        split = getattr(self.data_source, "split", None)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            if split is not None:
+                # each worker reads its part of the source, so records aren't parsed
+                # in this process and sent to the workers
+                with_positions = self._with_positions
+                tasks = (
+                    (
+                        executor.submit(
+                            _map_source, map_function, part, with_positions
+                        ),
+                        None,
+                    )
+                    for part in split(chunk_size)
+                )
+            else:
+                tasks = (
+                    (
+                        executor.submit(
+                            _map_chunk, map_function, [record for record, _ in chunk]
+                        ),
+                        chunk,
+                    )
+                    for chunk in _chunks(self._read_records(), chunk_size)
+                )
+            for task in tasks:
+                pending.append(task)
+                while len(pending) >= max_pending:
+                    count = self._handle_next_chunks(pending, ordered, count)
+
+            while pending:
+                count = self._handle_next_chunks(pending, ordered, count)
+
+        return count
+
+    def _handle_next_chunks(
+        self,
+        pending: "Deque[Tuple[Future, Optional[List[PositionedRecord]]]]",
+        ordered: bool,
+        count: int,
+    ) -> int:
+        start = time.perf_counter()
+        if ordered:
+            ready = [pending.popleft()]
+        else:
+            done, _ = wait([f for f, _ in pending], return_when=FIRST_COMPLETED)
+            ready = [(f, chunk) for f, chunk in pending if f in done]
+            for item in ready:
+                pending.remove(item)
+
+        results = [_chunk_results(future, chunk) for future, chunk in ready]
+        if self.metrics is not None:
+            # the time spent waiting for the worker processes to map the records
+            self.metrics.observe(
+                MAP, time.perf_counter() - start, sum(len(r) for r in results)
+            )
+
+        for chunk_results in results:
+            for record, position, import_actions, error in chunk_results:
+                count += 1
+                self._handle_mapped_record(
+                    count, record, position, import_actions, error
+                )
+        return count
+
+    def _handle_mapped_record(
+        self,
+        count: int,
+        record: Optional[SourceDataRecord],
+        position: Optional[SourcePosition],
+        import_actions: List[ImportAction],
+        error: Optional[Exception],
+    ) -> None:
+        if error is not None:
+            self._logger.error(f"an error occurred processing record {count}: {error}")
+            self._record_map_error(error, record)
+
+        if self._source_file is not None:
+            self._reference_sources(import_actions, position)
+
+        self._dispatch(import_actions)
+
+        if self._checkpoint_tracker:
+            self._checkpoint_tracker.record_handled(len(import_actions), position)
+            self._checkpoint_tracker.update(self.importer.acknowledged_actions)
+
+        if count % 1000 == 0:
+            self._log_progress(count)
+
+    def _reference_sources(
+        self, import_actions: List[ImportAction], position: SourcePosition
+    ) -> None:
+        sources = (SourceReference(self._source_file, self._record_start),)
+        for action in import_actions:
+            action.resource.sources = sources
+        self._record_start = position
+
+    def _record_map_error(
+        self, error: Exception, record: Optional[SourceDataRecord]
+    ) -> None:
+        if self.metrics is None:
+            self.map_error_recorder.record(error, record)
+            return
+        start = time.perf_counter()
+        self.map_error_recorder.record(error, record)
+        self.metrics.observe(ERROR_RECORD, time.perf_counter() - start)
+
+    def _dispatch(self, import_actions: List[ImportAction]) -> None:
+        if self.metrics is None:
+            self.importer.handle_actions(import_actions)
+            return
+        start = time.perf_counter()
+        self.importer.handle_actions(import_actions)
+        self.metrics.observe(DISPATCH, time.perf_counter() - start, len(import_actions))
+
     @staticmethod
     def _get_import_actions(unknown: object) -> List[ImportAction]:
         actions = []
@@ -94,6 +617,21 @@ class IterableDataImport:
         map_function_error_out: Optional[PurePath] = None,
         api_error_out: Optional[PurePath] = None,
         dry_run: bool = False,
+        use_async_importer: bool = False,
+        max_in_flight_requests: int = 10,
+        sender_threads: int = 0,
+        rate_limits: Optional[Dict[str, float]] = None,
+        adaptive_concurrency: bool = False,
+        checkpoint_path: Optional[PurePath] = None,
+        coalesce_user_updates: bool = False,
+        compress_requests: bool = False,
+        memory_map: bool = False,
+        source_columns: Optional[List[str]] = None,
+        shard: Optional[str] = None,
+        shard_key: Optional[ShardKeyFunction] = None,
+        metrics: Optional[Metrics] = None,
+        error_flush_interval: Optional[float] = 1.0,
+        compact_api_errors: bool = False,
     ) -> "IterableDataImport":
         if not api_key:
             raise ValueError('Missing required argument "api_key"')
@@ -104,23 +642,354 @@ class IterableDataImport:
         if not source_file_format:
             raise ValueError('Missing required argument "source_file_format"')
 
+        if shard_key and not shard:
+            raise ValueError("shard_key can only be used with shard")
+
+        # arguments are checked before the importer and recorders are built
+        _check_source_options(
+            source_file_path,
+            source_file_format,
+            checkpoint_path=checkpoint_path,
+            memory_map=memory_map,
+            compact_api_errors=compact_api_errors,
+            shard=shard,
+        )
+
+        if shard:
+            # e.g. "2/8", each shard imports the users that hash to it and gets its own
+            # share of the rate limits, checkpoint and error files
+            shard_index, shard_count = parse_shard(shard)
+            rate_limits = shard_rate_limits(rate_limits, shard_count)
+            checkpoint_path = shard_path(checkpoint_path, shard_index, shard_count)
+            map_function_error_out = shard_path(
+                map_function_error_out, shard_index, shard_count
+            )
+            api_error_out = shard_path(api_error_out, shard_index, shard_count)
+
         if dry_run:
             importer = NoOpImporter()
         else:
-            api_client = SyncApiClient(api_key)
-            api_error_recorder = (
-                FileSystemApiErrorRecorder(api_error_out)
-                if api_error_out
-                else NoOpApiErrorRecorder()
+            importer = _create_api_importer(
+                api_key,
+                api_error_out,
+                use_async_importer=use_async_importer,
+                max_in_flight_requests=max_in_flight_requests,
+                sender_threads=sender_threads,
+                rate_limits=rate_limits,
+                adaptive_concurrency=adaptive_concurrency,
+                coalesce_user_updates=coalesce_user_updates,
+                compress_requests=compress_requests,
+                metrics=metrics,
+                error_flush_interval=error_flush_interval,
+                compact_api_errors=compact_api_errors,
             )
-            importer = SyncApiImporter(api_client, api_error_recorder)
 
+        # errors are buffered and written every error_flush_interval seconds
         map_error_recorder = (
-            FileSystemMapErrorRecorder(map_function_error_out)
+            FileSystemMapErrorRecorder(map_function_error_out, error_flush_interval)
             if map_function_error_out
             else NoOpMapErrorRecorder()
         )
 
-        source = FileSystem(source_file_path, source_file_format)
-        idi = IterableDataImport(source, importer, map_error_recorder)
+        # resume from the checkpoint when one was saved by a previous run
+        checkpoint = FileSystemCheckpoint(checkpoint_path) if checkpoint_path else None
+        source = _create_file_source(
+            source_file_path,
+            source_file_format,
+            checkpoint.load() if checkpoint else None,
+            memory_map,
+            source_columns,
+        )
+        if shard:
+            source = ShardedDataSource(
+                source, shard_index, shard_count, shard_key or user_shard_key
+            )
+        idi = IterableDataImport(
+            source,
+            importer,
+            map_error_recorder,
+            checkpoint,
+            metrics=metrics,
+            track_sources=compact_api_errors and not dry_run,
+        )
         return idi
+
+    @classmethod
+    def create_replay(
+        cls,
+        api_key: str,
+        api_error_file_path: PurePath,
+        api_error_out: Optional[PurePath] = None,
+        use_async_importer: bool = False,
+        max_in_flight_requests: int = 10,
+        sender_threads: int = 0,
+        rate_limits: Optional[Dict[str, float]] = None,
+        adaptive_concurrency: bool = False,
+        compress_requests: bool = False,
+        metrics: Optional[Metrics] = None,
+        error_flush_interval: Optional[float] = 1.0,
+        skip_status_codes: FrozenSet[int] = PERMANENT_STATUS_CODES,
+        source_file_format: Optional[FileFormat] = None,
+        map_function: Optional[Callable] = None,
+    ) -> "IterableDataImport":
+        """
+        Create an import that sends the items recorded in an API error file again,
+        see [[ApiErrorFile]] for which items are skipped. Items are batched afresh
+        and sent like any other import, so sender_threads or the async importer and
+        rate_limits apply. The items that fail again are recorded in api_error_out,
+        in the same format, so that file can be replayed in turn. Run it with
+        replay_action, or use replay to create and run it in one go.
+
+        source_file_format and map_function are the ones of the original import, and
+        only required to replay errors recorded with compact_api_errors.
+        """
+        if not api_key:
+            raise ValueError('Missing required argument "api_key"')
+
+        if not api_error_file_path:
+            raise ValueError('Missing required argument "api_error_file_path"')
+
+        # errors are appended to api_error_out, which would then be read again
+        if api_error_out and str(api_error_out) == str(api_error_file_path):
+            raise ValueError("api_error_out must not be the file being replayed")
+
+        # replayed items are batched afresh and their errors recorded in full
+        importer = _create_api_importer(
+            api_key,
+            api_error_out,
+            use_async_importer=use_async_importer,
+            max_in_flight_requests=max_in_flight_requests,
+            sender_threads=sender_threads,
+            rate_limits=rate_limits,
+            adaptive_concurrency=adaptive_concurrency,
+            coalesce_user_updates=False,
+            compress_requests=compress_requests,
+            metrics=metrics,
+            error_flush_interval=error_flush_interval,
+            compact_api_errors=False,
+        )
+        source = ApiErrorFile(
+            api_error_file_path, skip_status_codes, source_file_format, map_function
+        )
+        return IterableDataImport(
+            source, importer, NoOpMapErrorRecorder(), metrics=metrics
+        )
+
+    @classmethod
+    def replay(cls, *args, **kwargs) -> bool:
+        """
+        Send the items recorded in an API error file again, taking the arguments of
+        create_replay
+
+        :return: true once the replay is complete
+        """
+        return cls.create_replay(*args, **kwargs).run(replay_action)
+
+
+def _check_source_options(
+    source_file_path: PurePath,
+    source_file_format: FileFormat,
+    checkpoint_path: Optional[PurePath],
+    memory_map: bool,
+    compact_api_errors: bool,
+    shard: Optional[str],
+) -> None:
+    if checkpoint_path and is_multi_file_path(source_file_path):
+        raise ValueError("checkpoints can't be used with a directory or glob pattern")
+
+    # compact errors reference the position of each item's record in the file
+    if compact_api_errors and (shard or is_multi_file_path(source_file_path)):
+        raise ValueError(
+            "compact_api_errors can't be used with shards or a directory or glob pattern"
+        )
+
+    if memory_map and (
+        source_file_format != FileFormat.NEWLINE_DELIMITED_JSON
+        or is_multi_file_path(source_file_path)
+        or detect_compression(source_file_path) != Compression.NONE
+    ):
+        raise ValueError(
+            "memory_map can only be used with a single uncompressed newline_delimited_json file"
+        )
+
+
+def _create_file_source(
+    source_file_path: PurePath,
+    source_file_format: FileFormat,
+    start_position: Optional[SourcePosition],
+    memory_map: bool,
+    source_columns: Optional[List[str]],
+) -> DataSource:
+    if memory_map:
+        return MmapNdjsonFileSystem(source_file_path, start_position)
+
+    if is_multi_file_path(source_file_path):
+        return MultiFileSystem(
+            source_file_path, source_file_format, columns=source_columns
+        )
+
+    return FileSystem(
+        source_file_path, source_file_format, start_position, columns=source_columns
+    )
+
+
+def _create_api_importer(
+    api_key: str,
+    api_error_out: Optional[PurePath],
+    *,
+    use_async_importer: bool,
+    max_in_flight_requests: int,
+    sender_threads: int,
+    rate_limits: Optional[Dict[str, float]],
+    adaptive_concurrency: bool,
+    coalesce_user_updates: bool,
+    compress_requests: bool,
+    metrics: Optional[Metrics],
+    error_flush_interval: Optional[float],
+    compact_api_errors: bool,
+) -> Importer:
+    # the synchronous importer sends on the calling thread without sender threads,
+    # so there is no concurrency to tune
+    if adaptive_concurrency and not use_async_importer and sender_threads <= 0:
+        raise ValueError(
+            "adaptive_concurrency requires sender_threads > 0 or the async importer"
+        )
+
+    if not api_error_out:
+        api_error_recorder = NoOpApiErrorRecorder()
+    elif compact_api_errors:
+        api_error_recorder = CompactFileSystemApiErrorRecorder(
+            api_error_out, error_flush_interval
+        )
+    else:
+        api_error_recorder = FileSystemApiErrorRecorder(
+            api_error_out, error_flush_interval
+        )
+    # e.g. {"/users/bulkUpdate": 5, "/events/trackBulk": 10} requests per second
+    rate_limiter = RateLimiter(rate_limits)
+    # the controller tunes concurrency up to the number of requests the
+    # importer can have in flight
+    max_concurrency = max_in_flight_requests if use_async_importer else sender_threads
+    controller = (
+        AimdConcurrencyController(
+            initial_limit=min(4, max_concurrency), max_limit=max_concurrency
+        )
+        if adaptive_concurrency and max_concurrency > 0
+        else None
+    )
+    if use_async_importer:
+        api_client = AsyncApiClient(
+            api_key,
+            rate_limiter=rate_limiter,
+            concurrency_controller=controller,
+            compress_requests=compress_requests,
+            metrics=metrics,
+        )
+        return AsyncApiImporter(
+            api_client,
+            api_error_recorder,
+            max_in_flight=max_in_flight_requests,
+            coalesce_users=coalesce_user_updates,
+        )
+    else:
+        api_client = SyncApiClient(
+            api_key,
+            pool_maxsize=max(sender_threads, 10),
+            rate_limiter=rate_limiter,
+            concurrency_controller=controller,
+            compress_requests=compress_requests,
+            metrics=metrics,
+        )
+        return SyncApiImporter(
+            api_client,
+            api_error_recorder,
+            sender_threads=sender_threads,
+            coalesce_users=coalesce_user_updates,
+        )
+
+
+def _observe_iterator(
+    items: Iterable, metrics: Metrics, stage: str, count: Callable = lambda item: 1
+) -> Iterator:
+    # times how long each item takes to produce, e.g. to read and parse a record
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        metrics.observe(stage, time.perf_counter() - start, count(item))
+        yield item
+
+
+def _map_record(
+    map_function: Callable, record: SourceDataRecord
+) -> Tuple[List[ImportAction], Optional[Exception]]:
+    try:
+        map_fn_return = map_function(record)
+    except Exception as e:
+        return [], e
+    return IterableDataImport._get_import_actions(map_fn_return), None
+
+
+def _map_chunk(
+    map_function: Callable, chunk: List[SourceDataRecord]
+) -> List[Tuple[List[ImportAction], Optional[Exception]]]:
+    # runs in a worker process, records stay in the parent so only the results are
+    # sent back
+    results = []
+    for record in chunk:
+        import_actions, error = _map_record(map_function, record)
+        if error is not None:
+            error = _picklable(error)
+        results.append((import_actions, error))
+    return results
+
+
+def _map_source(
+    map_function: Callable, source: DataSource, with_positions: bool
+) -> List[MappedRecord]:
+    # runs in a worker process that reads the records itself, so only the records
+    # that couldn't be mapped are sent back
+    results: List[MappedRecord] = []
+    for record in source:
+        import_actions, error = _map_record(map_function, record)
+        position = source.position if with_positions else None
+        if error is not None:
+            results.append((record, position, import_actions, _picklable(error)))
+        else:
+            results.append((None, position, import_actions, None))
+    return results
+
+
+def _chunk_results(
+    future: Future, chunk: Optional[List[PositionedRecord]]
+) -> List[MappedRecord]:
+    if chunk is None:
+        return future.result()
+    return [
+        (record, position, import_actions, error)
+        for (record, position), (import_actions, error) in zip(chunk, future.result())
+    ]
+
+
+def _picklable(error: Exception) -> Exception:
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError(f"{error.__class__.__name__}: {error}")
+
+
+def _chunks(
+    records: Iterable[PositionedRecord], chunk_size: int
+) -> Iterator[List[PositionedRecord]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
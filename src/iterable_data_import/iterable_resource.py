@@ -4,8 +4,37 @@ from typing import Optional, Dict, List
 class IterableResource:
     """
     Representation of Iterable resources
+
+    Resources use __slots__ to keep their memory footprint small since many thousands
+    of them may be buffered at once. The API dictionary is built the first time it's
+    accessed, which importers do as soon as they handle a resource, and cached from
+    then on. Resources must not be modified once they've been handed to an importer,
+    and the API dictionary is shared so it must not be modified either.
+
+    sources is only set when an import tracks where its resources came from, see
+    [[IterableDataImport]], and holds the SourceReference of each source data record
+    the resource was created from.
     """
 
+    __slots__ = ("_api_dict", "sources")
+
+    @property
+    def to_api_dict(self) -> Dict[str, object]:
+        """
+        Get the resource as a dictionary structured for the Iterable API
+
+        :return: the api dictionary
+        """
+        try:
+            return self._api_dict
+        except AttributeError:
+            # the slot is only set once the dictionary is built
+            self._api_dict = self._build_api_dict()
+            return self._api_dict
+
+    def _build_api_dict(self) -> Dict[str, object]:
+        pass
+
     @staticmethod
     def _remove_none_values(api_obj: Dict[str, object]) -> Dict[str, object]:
         return {k: v for k, v in api_obj.items() if v is not None}
@@ -16,6 +45,17 @@ class CustomEvent(IterableResource):
     An Iterable custom event
     """
 
+    __slots__ = (
+        "event_name",
+        "email",
+        "user_id",
+        "data_fields",
+        "event_id",
+        "template_id",
+        "campaign_id",
+        "created_at",
+    )
+
     def __init__(
         self,
         event_name: str,
@@ -45,8 +85,7 @@ class CustomEvent(IterableResource):
         self.campaign_id = campaign_id
         self.created_at = created_at
 
-    @property
-    def to_api_dict(self):
+    def _build_api_dict(self) -> Dict[str, object]:
         event_dict = {
             "eventName": self.event_name,
             "email": self.email,
@@ -59,6 +98,29 @@ class CustomEvent(IterableResource):
         }
         return self._remove_none_values(event_dict)
 
+    @classmethod
+    def from_api_dict(cls, api_dict: Dict[str, object]) -> "CustomEvent":
+        """
+        Create a custom event from a dictionary structured for the Iterable API, e.g.
+        one read back from an API error file. The dictionary is kept as the event's
+        API dictionary.
+
+        :param api_dict: the api dictionary
+        :return: the custom event
+        """
+        event = cls(
+            api_dict.get("eventName"),
+            api_dict.get("email"),
+            api_dict.get("userId"),
+            api_dict.get("dataFields"),
+            api_dict.get("id"),
+            api_dict.get("templateId"),
+            api_dict.get("campaignId"),
+            api_dict.get("createdAt"),
+        )
+        event._api_dict = api_dict
+        return event
+
     def __repr__(self):
         return f"{self.__class__.__name__}({self.event_name}, {self.email}, {self.user_id})"
 
@@ -68,6 +130,14 @@ class UserProfile(IterableResource):
     An Iterable user profile
     """
 
+    __slots__ = (
+        "email",
+        "user_id",
+        "data_fields",
+        "prefer_user_id",
+        "merge_nested_objects",
+    )
+
     def __init__(
         self,
         email: Optional[str] = None,
@@ -88,8 +158,7 @@ class UserProfile(IterableResource):
         self.prefer_user_id = prefer_user_id
         self.merge_nested_objects = merge_nested_objects
 
-    @property
-    def to_api_dict(self):
+    def _build_api_dict(self) -> Dict[str, object]:
         user_dict = {
             "email": self.email,
             "userId": self.user_id,
@@ -99,6 +168,25 @@ class UserProfile(IterableResource):
         }
         return user_dict
 
+    @classmethod
+    def from_api_dict(cls, api_dict: Dict[str, object]) -> "UserProfile":
+        """
+        Create a user profile from a dictionary structured for the Iterable API. The
+        dictionary is kept as the user's API dictionary.
+
+        :param api_dict: the api dictionary
+        :return: the user profile
+        """
+        user = cls(
+            api_dict.get("email"),
+            api_dict.get("userId"),
+            api_dict.get("dataFields"),
+            bool(api_dict.get("preferUserId")),
+            bool(api_dict.get("mergeNestedObjects")),
+        )
+        user._api_dict = api_dict
+        return user
+
     def __repr__(self):
         identifiers = [x for x in [self.email, self.user_id] if x]
         return f'{self.__class__.__name__}({", ".join(identifiers)})'
@@ -109,6 +197,19 @@ class CommerceItem(IterableResource):
     An Iterable commerce item
     """
 
+    __slots__ = (
+        "item_id",
+        "name",
+        "price",
+        "quantity",
+        "sku",
+        "description",
+        "categories",
+        "image_url",
+        "url",
+        "data_fields",
+    )
+
     def __init__(
         self,
         item_id: str,
@@ -138,8 +239,7 @@ class CommerceItem(IterableResource):
         self.url = url
         self.data_fields = data_fields
 
-    @property
-    def to_api_dict(self):
+    def _build_api_dict(self) -> Dict[str, object]:
         commerce_item_dict = {
             "id": self.item_id,
             "name": self.name,
@@ -154,6 +254,30 @@ class CommerceItem(IterableResource):
         }
         return self._remove_none_values(commerce_item_dict)
 
+    @classmethod
+    def from_api_dict(cls, api_dict: Dict[str, object]) -> "CommerceItem":
+        """
+        Create a commerce item from a dictionary structured for the Iterable API. The
+        dictionary is kept as the item's API dictionary.
+
+        :param api_dict: the api dictionary
+        :return: the commerce item
+        """
+        item = cls(
+            api_dict.get("id"),
+            api_dict.get("name"),
+            api_dict.get("price"),
+            api_dict.get("quantity"),
+            api_dict.get("sku"),
+            api_dict.get("description"),
+            api_dict.get("categories"),
+            api_dict.get("imageUrl"),
+            api_dict.get("url"),
+            api_dict.get("dataFields"),
+        )
+        item._api_dict = api_dict
+        return item
+
     def __repr__(self):
         return f"{self.__class__.__name__}({self.item_id}, {self.name}, {self.price}, {self.quantity})"
 
@@ -163,6 +287,17 @@ class Purchase(IterableResource):
     An Iterable purchase
     """
 
+    __slots__ = (
+        "user",
+        "items",
+        "total",
+        "created_at",
+        "data_fields",
+        "purchase_id",
+        "campaign_id",
+        "template_id",
+    )
+
     def __init__(
         self,
         user: UserProfile,
@@ -186,8 +321,7 @@ class Purchase(IterableResource):
         self.campaign_id = campaign_id
         self.template_id = template_id
 
-    @property
-    def to_api_dict(self):
+    def _build_api_dict(self) -> Dict[str, object]:
         purchase_dict = {
             "id": self.purchase_id,
             "user": self.user.to_api_dict,
@@ -200,5 +334,28 @@ class Purchase(IterableResource):
         }
         return self._remove_none_values(purchase_dict)
 
+    @classmethod
+    def from_api_dict(cls, api_dict: Dict[str, object]) -> "Purchase":
+        """
+        Create a purchase from a dictionary structured for the Iterable API. The
+        dictionary is kept as the purchase's API dictionary.
+
+        :param api_dict: the api dictionary
+        :return: the purchase
+        """
+        user = api_dict.get("user")
+        purchase = cls(
+            UserProfile.from_api_dict(user) if user else None,
+            [CommerceItem.from_api_dict(item) for item in api_dict.get("items") or []],
+            api_dict.get("total"),
+            api_dict.get("createdAt"),
+            api_dict.get("dataFields"),
+            api_dict.get("id"),
+            api_dict.get("campaignId"),
+            api_dict.get("templateId"),
+        )
+        purchase._api_dict = api_dict
+        return purchase
+
     def __repr__(self):
         return f'{self.__class__.__name__}({self.user}, [{", ".join([str(item) for item in self.items])}], {self.total})'
@@ -0,0 +1,70 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional dependency
+    orjson = None
+
+
+class JsonSerializer:
+    """
+    Abstract base class responsible for encoding API request bodies to JSON
+    """
+
+    def dumps(self, obj: object) -> bytes:
+        """
+        Encode an object as UTF-8 JSON
+
+        :param obj: the object, made of dicts, lists, strings, numbers, booleans and None
+        :return: the encoded JSON
+        """
+        pass
+
+
+class StdlibJsonSerializer(JsonSerializer):
+    """
+    A JSON serializer using the json module from the standard library
+    """
+
+    def dumps(self, obj: object) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+
+class OrjsonSerializer(JsonSerializer):
+    """
+    A JSON serializer using orjson, which is several times faster than the standard
+    library
+
+    Dictionary keys that aren't strings are encoded like the standard library does.
+    Objects orjson can't encode, e.g. integers wider than 64 bits, are encoded with
+    the standard library instead. NaN and infinity are encoded as null, where the
+    standard library writes NaN and Infinity, which aren't valid JSON.
+
+    Requires the optional orjson dependency: pip install iterable-data-import[fast-json]
+    """
+
+    def __init__(self) -> None:
+        if orjson is None:
+            raise ImportError(
+                "OrjsonSerializer requires orjson, install it with: pip install iterable-data-import[fast-json]"
+            )
+
+        self._fallback = StdlibJsonSerializer()
+
+    def dumps(self, obj: object) -> bytes:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return self._fallback.dumps(obj)
+
+
+def default_serializer() -> JsonSerializer:
+    """
+    The fastest JSON serializer available
+
+    :return: an orjson serializer if orjson is installed, otherwise a standard library
+        serializer
+    """
+    if orjson is not None:
+        return OrjsonSerializer()
+    return StdlibJsonSerializer()
@@ -0,0 +1,218 @@
+import bisect
+import json
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# the stages of an import that are timed. Data sources parse each record as they
+# read it, so reading and parsing are timed together as a single stage
+READ_PARSE = "read_parse"
+MAP = "map"
+DISPATCH = "dispatch"
+SERIALIZE = "serialize"
+HTTP = "http"
+ERROR_RECORD = "error_record"
+
+# upper bounds of the latency histogram buckets in seconds, from per record stages
+# taking microseconds to HTTP requests taking seconds
+DEFAULT_BUCKETS = (
+    0.00001,
+    0.00005,
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+MetricsCallback = Callable[[str, float, int, Dict[str, str]], None]
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Metrics:
+    """
+    Abstract base class responsible for collecting the time spent in each stage of an
+    import
+
+    The stages are READ_PARSE (reading and parsing source data records), MAP (the map
+    function), DISPATCH (handing import actions to the importer), SERIALIZE (encoding
+    items and request bodies), HTTP (API requests, labelled by endpoint and status)
+    and ERROR_RECORD (the map and API error recorders). Components only time a stage
+    when they're given a Metrics, so imports without one pay nothing but a None check.
+    """
+
+    def observe(
+        self,
+        stage: str,
+        seconds: float,
+        count: int = 1,
+        labels: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        Record time spent in a stage
+
+        :param stage: the stage, e.g. HTTP
+        :param seconds: the time spent
+        :param count: the number of items handled, e.g. the items in a bulk request
+        :param labels: labels further identifying the stage, e.g. the API endpoint
+        :return: none
+        """
+        pass
+
+
+class InMemoryMetrics(Metrics):
+    """
+    Metrics kept in memory as a latency histogram and item count per stage and labels
+
+    Every observation is also passed to callback, when provided, e.g. to forward it to
+    a metrics client. snapshot, to_json and to_prometheus report the totals so far,
+    the latter in the Prometheus text exposition format. Safe to use from many
+    threads.
+    """
+
+    def __init__(
+        self,
+        callback: Optional[MetricsCallback] = None,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.callback = callback
+        self.buckets = sorted(buckets)
+        self._stats: Dict[_Key, _StageStats] = {}
+        self._lock = threading.Lock()
+
+    def observe(
+        self,
+        stage: str,
+        seconds: float,
+        count: int = 1,
+        labels: Optional[Dict[str, str]] = None,
+    ) -> None:
+        key = (stage, tuple(sorted(labels.items())) if labels else ())
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = _StageStats(len(self.buckets))
+                self._stats[key] = stats
+            stats.add(seconds, count, bucket)
+
+        if self.callback is not None:
+            self.callback(stage, seconds, count, labels or {})
+
+    def snapshot(self) -> List[Dict[str, object]]:
+        """
+        The totals for every stage and labels observed so far
+
+        :return: a list of dictionaries with the stage, labels, calls, items, seconds,
+            max_seconds and cumulative histogram buckets keyed by upper bound
+        """
+        with self._lock:
+            stats = [
+                (key, s.calls, s.items, s.seconds, s.max_seconds, list(s.buckets))
+                for key, s in self._stats.items()
+            ]
+
+        snapshot = []
+        for (stage, labels), calls, items, seconds, max_seconds, buckets in sorted(
+            stats
+        ):
+            cumulative = {}
+            total = 0
+            for bound, bucket_count in zip(self._bucket_names(), buckets):
+                total += bucket_count
+                cumulative[bound] = total
+            snapshot.append(
+                {
+                    "stage": stage,
+                    "labels": dict(labels),
+                    "calls": calls,
+                    "items": items,
+                    "seconds": seconds,
+                    "max_seconds": max_seconds,
+                    "buckets": cumulative,
+                }
+            )
+        return snapshot
+
+    def to_json(self) -> str:
+        """
+        The snapshot encoded as JSON
+
+        :return: the JSON document
+        """
+        return json.dumps({"stages": self.snapshot()})
+
+    def to_prometheus(self, prefix: str = "iterable_data_import") -> str:
+        """
+        The snapshot in the Prometheus text exposition format
+
+        :param prefix: prefix of the metric names
+        :return: the metrics text
+        """
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent in each stage of the import",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for stats in snapshot:
+            labels = {"stage": stats["stage"], **stats["labels"]}
+            for bound, total in stats["buckets"].items():
+                bucket_labels = _format_labels({**labels, "le": bound})
+                lines.append(f"{prefix}_stage_seconds_bucket{bucket_labels} {total}")
+            lines.append(
+                f"{prefix}_stage_seconds_sum{_format_labels(labels)} {stats['seconds']}"
+            )
+            lines.append(
+                f"{prefix}_stage_seconds_count{_format_labels(labels)} {stats['calls']}"
+            )
+
+        lines.extend(
+            [
+                f"# HELP {prefix}_stage_items_total Items handled by each stage of the import",
+                f"# TYPE {prefix}_stage_items_total counter",
+            ]
+        )
+        for stats in snapshot:
+            labels = {"stage": stats["stage"], **stats["labels"]}
+            lines.append(
+                f"{prefix}_stage_items_total{_format_labels(labels)} {stats['items']}"
+            )
+        return "\n".join(lines) + "\n"
+
+    def _bucket_names(self) -> List[str]:
+        return [repr(float(bound)) for bound in self.buckets] + ["+Inf"]
+
+
+class _StageStats:
+    def __init__(self, num_buckets: int) -> None:
+        self.calls = 0
+        self.items = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        # the last bucket counts observations above the largest bound
+        self.buckets = [0] * (num_buckets + 1)
+
+    def add(self, seconds: float, count: int, bucket: int) -> None:
+        self.calls += 1
+        self.items += count
+        self.seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        self.buckets[bucket] += 1
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    escaped = (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for value in labels.values()
+    )
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped))
+    return f"{{{pairs}}}"
@@ -0,0 +1,264 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from iterable_data_import.data_sources.data_source import (
+    SourceDataRecord,
+    SourcePosition,
+)
+from iterable_data_import.import_action import ImportAction
+from iterable_data_import.metrics import MAP, Metrics
+
+# a source data record and the data source position after it
+PositionedRecord = Tuple[SourceDataRecord, Optional[SourcePosition]]
+
+# the source data record (if it couldn't be mapped), the data source position after
+# it, its import actions and the map function error
+MappedRecord = Tuple[
+    Optional[SourceDataRecord],
+    Optional[SourcePosition],
+    List[ImportAction],
+    Optional[Exception],
+]
+
+# maps a source data record to its import actions and the exception raised by the map
+# function, if any
+MapRecordFunction = Callable[
+    [SourceDataRecord], Tuple[List[ImportAction], Optional[Exception]]
+]
+
+# how often blocked stages check whether the pipeline has been stopped
+_POLL_INTERVAL = 0.1
+
+# marks the end of the chunks on a queue
+_DONE = object()
+
+
+class ImportPipeline:
+    """
+    Maps source data records on a pipeline of threads connected by bounded queues
+
+    A reader thread reads records from the source into chunks of chunk_size and puts
+    them on the read queue, map_threads threads call map_record on each chunk
+    and put the results on the mapped queue, and iterating over the pipeline returns
+    the mapped chunks, in source order when ordered is set. The import hands them to
+    the importer, whose batches are sent by its own sender threads or event loop, so
+    reading, mapping and sending all overlap.
+
+    Each queue holds at most queue_size chunks and at most 2 * queue_size +
+    map_threads chunks are read but not yet imported, so when the importer falls
+    behind every stage blocks in turn rather than buffering the source in memory.
+
+    Records the map function failed on are returned with their error like any other
+    result. If a stage fails, e.g. the source can't be read, the pipeline stops and
+    the error is raised by the iteration. close stops the threads, it must be called
+    once done, including when the import fails.
+
+    The map threads share the GIL, so map functions that spend their time in Python
+    code are better served by worker processes, see [[IterableDataImport.run]].
+    """
+
+    def __init__(
+        self,
+        records: Iterable[PositionedRecord],
+        map_record: MapRecordFunction,
+        map_threads: int = 4,
+        chunk_size: int = 1000,
+        queue_size: int = 8,
+        ordered: bool = True,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        if map_threads < 1:
+            raise ValueError(
+                f"map_threads must be greater than or equal to 1, {map_threads} provided"
+            )
+
+        if chunk_size < 1:
+            raise ValueError(
+                f"chunk_size must be greater than or equal to 1, {chunk_size} provided"
+            )
+
+        if queue_size < 1:
+            raise ValueError(
+                f"queue_size must be greater than or equal to 1, {queue_size} provided"
+            )
+
+        self.records = records
+        self.map_record = map_record
+        self.map_threads = map_threads
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+        self.ordered = ordered
+        self.metrics = metrics
+        self._read_queue: "queue.Queue[object]" = queue.Queue(maxsize=queue_size)
+        self._mapped_queue: "queue.Queue[object]" = queue.Queue(maxsize=queue_size)
+        self._window = threading.Semaphore(2 * queue_size + map_threads)
+        # ordered results that arrived before the chunks preceding them
+        self._reordered: Dict[int, List[MappedRecord]] = {}
+        self._stopping = threading.Event()
+        self._failure: Optional[BaseException] = None
+        self._threads: List[threading.Thread] = []
+        self._logger = logging.getLogger("ImportPipeline")
+
+    def __iter__(self) -> Iterator[List[MappedRecord]]:
+        self._start_threads()
+        finished_threads = 0
+        next_chunk = 0
+        while finished_threads < self.map_threads:
+            item = self._get(self._mapped_queue)
+            if item is None:
+                break
+
+            if item is _DONE:
+                finished_threads += 1
+                continue
+
+            index, results = item
+            if not self.ordered:
+                yield results
+                self._window.release()
+                continue
+
+            self._reordered[index] = results
+            while next_chunk in self._reordered:
+                results = self._reordered.pop(next_chunk)
+                next_chunk += 1
+                yield results
+                self._window.release()
+
+        self._raise_failure()
+
+    def queue_depths(self) -> Dict[str, int]:
+        """
+        The number of chunks waiting in each queue, read for chunks waiting to be
+        mapped, mapped for chunks waiting to be imported and reordered for chunks
+        mapped ahead of an earlier chunk
+
+        :return: the number of chunks by queue
+        """
+        return {
+            "read": self._read_queue.qsize(),
+            "mapped": self._mapped_queue.qsize(),
+            "reordered": len(self._reordered),
+        }
+
+    def close(self) -> None:
+        """
+        Stop the pipeline and wait for its threads to finish
+
+        :return: none
+        """
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _start_threads(self) -> None:
+        # daemon so that an import that crashes without closing can still exit
+        self._threads.append(
+            threading.Thread(
+                target=self._run_stage,
+                args=(self._read,),
+                name="ImportPipeline-reader",
+                daemon=True,
+            )
+        )
+        for i in range(self.map_threads):
+            self._threads.append(
+                threading.Thread(
+                    target=self._run_stage,
+                    args=(self._map,),
+                    name=f"ImportPipeline-mapper-{i}",
+                    daemon=True,
+                )
+            )
+        for thread in self._threads:
+            thread.start()
+
+    def _run_stage(self, stage: Callable[[], None]) -> None:
+        try:
+            stage()
+        except Exception as e:
+            self._logger.error(f"{threading.current_thread().name} failed: {e}")
+            if self._failure is None:
+                self._failure = e
+            self._stopping.set()
+
+    def _read(self) -> None:
+        index = 0
+        chunk: List[PositionedRecord] = []
+        for positioned_record in self.records:
+            chunk.append(positioned_record)
+            if len(chunk) >= self.chunk_size:
+                if not self._put_chunk(index, chunk):
+                    return
+                index += 1
+                chunk = []
+        if chunk and not self._put_chunk(index, chunk):
+            return
+
+        for _ in range(self.map_threads):
+            if not self._put(self._read_queue, _DONE):
+                return
+
+    def _put_chunk(self, index: int, chunk: List[PositionedRecord]) -> bool:
+        while not self._window.acquire(timeout=_POLL_INTERVAL):
+            if self._stopping.is_set():
+                return False
+        return self._put(self._read_queue, (index, chunk))
+
+    def _map(self) -> None:
+        while True:
+            item = self._get(self._read_queue)
+            if item is None:
+                return
+
+            if item is _DONE:
+                self._put(self._mapped_queue, _DONE)
+                return
+
+            index, chunk = item
+            start = time.perf_counter()
+            results = []
+            for record, position in chunk:
+                import_actions, error = self.map_record(record)
+                # only the records that couldn't be mapped are kept
+                results.append(
+                    (
+                        record if error is not None else None,
+                        position,
+                        import_actions,
+                        error,
+                    )
+                )
+            if self.metrics is not None:
+                self.metrics.observe(MAP, time.perf_counter() - start, len(chunk))
+            if not self._put(self._mapped_queue, (index, results)):
+                return
+
+    def _put(self, q: "queue.Queue[object]", item: object) -> bool:
+        # blocks while the queue is full, unless the pipeline is stopped
+        while not self._stopping.is_set():
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, q: "queue.Queue[object]") -> Optional[object]:
+        # blocks while the queue is empty, returns None once the pipeline is stopped
+        while not self._stopping.is_set():
+            try:
+                return q.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                pass
+        return None
+
+    def _raise_failure(self) -> None:
+        if self._failure is not None:
+            failure = self._failure
+            self._failure = None
+            raise failure
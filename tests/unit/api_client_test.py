@@ -0,0 +1,182 @@
+import asyncio
+import gzip
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import aiohttp
+import pytest
+
+from iterable_data_import import (
+    AsyncApiClient,
+    InMemoryMetrics,
+    SyncApiClient,
+    UserProfile,
+    CommerceItem,
+    Purchase,
+)
+from iterable_data_import.importers.rate_limiter import RateLimiter
+from iterable_data_import.importers.iterable_request import (
+    BulkUserUpdateRequest,
+    TrackPurchaseRequest,
+)
+
+
+class MockIterableHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        encoding = self.headers.get("Content-Encoding")
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        self.server.received.append((self.path, encoding, json.loads(body)))
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Retry-After", "0")
+        self.end_headers()
+        self.wfile.write(b'{"msg": "", "code": "Success"}')
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def mock_server():
+    server = HTTPServer(("127.0.0.1", 0), MockIterableHandler)
+    server.received = []
+    server.status = 200
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _base_url(server) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}/api"
+
+
+def _bulk_request() -> BulkUserUpdateRequest:
+    users = [
+        UserProfile(f"user{i}@iterable.com", data_fields={"plan": "pro"})
+        for i in range(100)
+    ]
+    return BulkUserUpdateRequest(users)
+
+
+def _purchase_request() -> TrackPurchaseRequest:
+    user = UserProfile("test@iterable.com")
+    return TrackPurchaseRequest(
+        Purchase(user, [CommerceItem("1", "shoes", 99.0, 1)], 99.0)
+    )
+
+
+def test_sync_client_compresses_bulk_requests(mock_server):
+    client = SyncApiClient(
+        "some_api_key", base_url=_base_url(mock_server), compress_requests=True
+    )
+    request = _bulk_request()
+    assert client.bulk_update_users(request).status_code == 200
+    assert client.track_purchase(_purchase_request()).status_code == 200
+    assert mock_server.received == [
+        ("/api/users/bulkUpdate", "gzip", request.to_api_dict),
+        ("/api/commerce/trackPurchase", None, _purchase_request().to_api_dict),
+    ]
+
+
+def test_sync_client_sends_uncompressed_by_default(mock_server):
+    client = SyncApiClient("some_api_key", base_url=_base_url(mock_server))
+    request = _bulk_request()
+    client.bulk_update_users(request)
+    assert mock_server.received == [
+        ("/api/users/bulkUpdate", None, request.to_api_dict)
+    ]
+
+
+def test_async_client_compresses_bulk_requests(mock_server, caplog):
+    caplog.set_level(logging.DEBUG, logger="importers.AsyncApiClient")
+    client = AsyncApiClient(
+        "some_api_key",
+        base_url=_base_url(mock_server),
+        compress_requests=True,
+        compression_level=9,
+    )
+    request = _bulk_request()
+
+    async def send():
+        try:
+            return await client.bulk_update_users(request)
+        finally:
+            await client.close()
+
+    assert asyncio.run(send()).status_code == 200
+    assert mock_server.received == [
+        ("/api/users/bulkUpdate", "gzip", request.to_api_dict)
+    ]
+
+
+class CountingRateLimiter(RateLimiter):
+    def __init__(self) -> None:
+        super().__init__()
+        self.attempts = 0
+
+    def reserve(self, path: str) -> float:
+        self.attempts += 1
+        return super().reserve(path)
+
+
+def _send_async(client, request):
+    async def send():
+        try:
+            return await client.bulk_update_users(request)
+        finally:
+            await client.close()
+
+    return asyncio.run(send())
+
+
+def test_async_client_retries_429_and_connection_errors_alike(mock_server):
+    # both are retried max_retries times, like the sync client
+    mock_server.status = 429
+    rate_limiter = CountingRateLimiter()
+    client = AsyncApiClient(
+        "some_api_key",
+        base_url=_base_url(mock_server),
+        max_retries=2,
+        rate_limiter=rate_limiter,
+    )
+    assert _send_async(client, _bulk_request()).status_code == 429
+    assert rate_limiter.attempts == 3
+
+    port = mock_server.server_address[1]
+    mock_server.shutdown()
+    mock_server.server_close()
+    rate_limiter = CountingRateLimiter()
+    client = AsyncApiClient(
+        "some_api_key",
+        base_url=f"http://127.0.0.1:{port}/api",
+        max_retries=2,
+        rate_limiter=rate_limiter,
+    )
+    with pytest.raises(aiohttp.ClientConnectorError):
+        _send_async(client, _bulk_request())
+    assert rate_limiter.attempts == 3
+
+
+def test_invalid_compression_level():
+    with pytest.raises(ValueError):
+        SyncApiClient("some_api_key", compression_level=10)
+
+
+def test_sync_client_observes_request_metrics(mock_server):
+    metrics = InMemoryMetrics()
+    client = SyncApiClient(
+        "some_api_key", base_url=_base_url(mock_server), metrics=metrics
+    )
+    client.bulk_update_users(_bulk_request())
+    http, serialize = metrics.snapshot()
+    assert http["stage"] == "http"
+    assert http["labels"] == {"endpoint": "/users/bulkUpdate", "status": "200"}
+    assert http["items"] == 100
+    assert serialize["stage"] == "serialize"
+    assert serialize["labels"] == {"endpoint": "/users/bulkUpdate"}
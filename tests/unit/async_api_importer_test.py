@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import pytest
+from pytest_mock import MockerFixture
+
+from iterable_data_import import (
+    AsyncApiImporter,
+    UserProfile,
+    UpdateUserProfile,
+    CustomEvent,
+    TrackCustomEvent,
+    NoOpApiErrorRecorder,
+)
+from iterable_data_import.importers.async_api_client import AsyncApiResponse
+
+
+class FakeAsyncApiClient:
+    def __init__(self, status_code: int = 200, delay: float = 0.05) -> None:
+        self.status_code = status_code
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_seen_in_flight = 0
+        self.closed = False
+
+    async def _respond(self, req):
+        self.in_flight += 1
+        self.max_seen_in_flight = max(self.max_seen_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        self.requests.append(req)
+        return AsyncApiResponse(self.status_code, "{}")
+
+    async def bulk_update_users(self, req):
+        return await self._respond(req)
+
+    async def bulk_track_events(self, req):
+        return await self._respond(req)
+
+    async def track_purchase(self, req):
+        return await self._respond(req)
+
+    async def close(self):
+        self.closed = True
+
+
+def _user_actions(n: int):
+    return [UpdateUserProfile(UserProfile(f"user{i}@iterable.com")) for i in range(n)]
+
+
+def test_requests_are_sent_concurrently():
+    client = FakeAsyncApiClient()
+    importer = AsyncApiImporter(
+        client, NoOpApiErrorRecorder(), users_per_batch=1, max_in_flight=4
+    )
+    importer.handle_actions(_user_actions(8))
+    importer.shutdown()
+    assert len(client.requests) == 8
+    assert client.max_seen_in_flight == 4
+    assert client.closed
+
+
+def test_partial_batches_sent_on_shutdown():
+    client = FakeAsyncApiClient(delay=0)
+    importer = AsyncApiImporter(client, NoOpApiErrorRecorder(), users_per_batch=10)
+    importer.handle_actions(_user_actions(3))
+    event = CustomEvent("test event", email="test@iterable.com")
+    importer.handle_actions([TrackCustomEvent(event)])
+    assert client.requests == []
+    importer.shutdown()
+    assert len(client.requests) == 2
+
+
+def test_errors_recorded(mocker: MockerFixture):
+    client = FakeAsyncApiClient(status_code=400, delay=0)
+    recorder = NoOpApiErrorRecorder()
+    spy = mocker.spy(recorder, "record_serialized")
+    importer = AsyncApiImporter(client, recorder, users_per_batch=2)
+    importer.handle_actions(_user_actions(2))
+    importer.shutdown()
+    spy.assert_called_once()
+    assert spy.call_args.args[:2] == (400, "{}")
+    assert json.loads(spy.call_args.args[2]) == client.requests[0].to_api_dict
+
+
+def test_request_exception_raised_on_shutdown():
+    client = FakeAsyncApiClient(delay=0)
+
+    async def boom(req):
+        raise ConnectionError("boom!")
+
+    client.bulk_update_users = boom
+    importer = AsyncApiImporter(client, NoOpApiErrorRecorder(), users_per_batch=1)
+    importer.handle_actions(_user_actions(1))
+    with pytest.raises(ConnectionError):
+        importer.shutdown()
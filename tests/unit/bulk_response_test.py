@@ -0,0 +1,170 @@
+import json
+
+import pytest
+
+from iterable_data_import import UserProfile, CustomEvent, CommerceItem, Purchase
+from iterable_data_import.importers.bulk_response import evaluate_response
+from iterable_data_import.importers.iterable_request import (
+    BulkUserUpdateRequest,
+    BulkTrackCustomEventRequest,
+    TrackPurchaseRequest,
+)
+
+users = [
+    UserProfile("ok@iterable.com"),
+    UserProfile("invalid@iterable"),
+    UserProfile(user_id="conflict"),
+    UserProfile("forgotten@iterable.com"),
+]
+user_request = BulkUserUpdateRequest(users)
+
+
+def _bulk_response(**failed_updates) -> str:
+    fail_count = sum(len(v) for v in failed_updates.values())
+    return json.dumps(
+        {
+            "successCount": 4 - fail_count,
+            "failCount": fail_count,
+            "failedUpdates": failed_updates,
+        }
+    )
+
+
+def test_success_has_nothing_to_retry_or_record():
+    outcome = evaluate_response(user_request, 200, _bulk_response())
+    assert outcome.retry is None
+    assert outcome.failed is None
+
+
+def test_partial_failure_splits_items():
+    text = _bulk_response(
+        invalidEmails=["invalid@iterable"],
+        forgottenEmails=["forgotten@iterable.com"],
+        conflictUserIds=["conflict"],
+    )
+    outcome = evaluate_response(user_request, 200, text)
+    assert isinstance(outcome.retry, BulkUserUpdateRequest)
+    assert outcome.retry.users == [users[2]]
+    assert outcome.failed.users == [users[1], users[3]]
+
+
+def test_unidentified_failures_are_ignored():
+    text = json.dumps({"successCount": 3, "failCount": 1})
+    outcome = evaluate_response(user_request, 200, text)
+    assert outcome.retry is None
+    assert outcome.failed is None
+
+
+@pytest.mark.parametrize("status_code", [500, 502, 503, 504])
+def test_retryable_status_retries_whole_request(status_code):
+    outcome = evaluate_response(user_request, status_code, "oops")
+    assert outcome.retry is user_request
+    assert outcome.failed is None
+
+
+@pytest.mark.parametrize("status_code", [400, 401])
+def test_client_error_fails_whole_request(status_code):
+    outcome = evaluate_response(user_request, status_code, "{}")
+    assert outcome.retry is None
+    assert outcome.failed is user_request
+
+
+def test_too_large_request_split_in_half():
+    outcome = evaluate_response(user_request, 413, "too large")
+    assert [req.users for req in outcome.resend] == [users[:2], users[2:]]
+    assert outcome.retry is None
+    assert outcome.failed is None
+
+
+def test_too_large_single_item_fails():
+    request = BulkUserUpdateRequest(users[:1])
+    outcome = evaluate_response(request, 413, "too large")
+    assert outcome.resend == []
+    assert outcome.failed is request
+
+
+def test_non_idempotent_requests_not_retried_after_server_error():
+    events = [CustomEvent("test event", email="test@iterable.com")]
+    outcome = evaluate_response(BulkTrackCustomEventRequest(events), 500, "oops")
+    assert outcome.retry is None
+    assert outcome.failed is not None
+
+    events = [CustomEvent("test event", email="test@iterable.com", event_id="1")]
+    outcome = evaluate_response(BulkTrackCustomEventRequest(events), 500, "oops")
+    assert outcome.retry is not None
+
+
+def test_rate_limited_requests_left_to_the_client():
+    # the API clients retry 429s, so one that reaches the importer has run out of
+    # retries and is recorded
+    item = CommerceItem("1", "shoes", 99.0, 1)
+    purchase = Purchase(users[0], [item], 99.0)
+    request = TrackPurchaseRequest(purchase)
+    outcome = evaluate_response(request, 429, "slow down")
+    assert outcome.retry is None
+    assert outcome.failed is request
+
+
+def test_failures_matched_by_index():
+    # only the second of two events sharing an email failed
+    events = [
+        CustomEvent("signup", email="test@iterable.com"),
+        CustomEvent("signup", email="test@iterable.com"),
+        CustomEvent("signup", email="other@iterable.com"),
+    ]
+    text = json.dumps(
+        {
+            "successCount": 1,
+            "failCount": 2,
+            "failedUpdates": {
+                "invalidDataEmails": [{"index": 1, "email": "test@iterable.com"}],
+                "conflictEmails": [{"index": 2, "email": "other@iterable.com"}],
+            },
+        }
+    )
+    outcome = evaluate_response(BulkTrackCustomEventRequest(events), 200, text)
+    assert outcome.failed.events == [events[1]]
+    assert outcome.retry.events == [events[2]]
+
+
+def test_failure_indexes_renumbered_for_the_items_recorded():
+    events = [
+        CustomEvent("signup", email="a@iterable.com"),
+        CustomEvent("signup", email="b@iterable.com"),
+        CustomEvent("signup", email="c@iterable.com"),
+        CustomEvent("signup", email="d@iterable.com"),
+    ]
+    text = json.dumps(
+        {
+            "successCount": 1,
+            "failCount": 3,
+            "failedUpdates": {
+                "invalidDataEmails": [{"index": 3}, {"index": 1}],
+                "conflictEmails": [{"index": 2}],
+            },
+        }
+    )
+    outcome = evaluate_response(BulkTrackCustomEventRequest(events), 200, text)
+    assert outcome.failed.events == [events[1], events[3]]
+    assert json.loads(outcome.failed_text) == {
+        "successCount": 0,
+        "failCount": 2,
+        "failedUpdates": {
+            "invalidDataEmails": [{"index": 1}, {"index": 0}],
+            "conflictEmails": [],
+        },
+    }
+    assert outcome.retry.events == [events[2]]
+    assert json.loads(outcome.retry_text)["failedUpdates"] == {
+        "invalidDataEmails": [],
+        "conflictEmails": [{"index": 0}],
+    }
+
+
+def test_response_recorded_as_is_without_indexes():
+    text = _bulk_response(invalidEmails=["invalid@iterable"])
+    outcome = evaluate_response(user_request, 200, text)
+    assert outcome.failed_text == text
+
+    outcome = evaluate_response(user_request, 400, "bad request")
+    assert outcome.failed_text == "bad request"
@@ -0,0 +1,189 @@
+import pytest
+
+from iterable_data_import import (
+    IterableDataImport,
+    FileSystem,
+    FileFormat,
+    FileSystemCheckpoint,
+    NoOpImporter,
+    NoOpMapErrorRecorder,
+    SourcePosition,
+    UserProfile,
+    UpdateUserProfile,
+)
+from iterable_data_import.checkpoint import Checkpoint, CheckpointTracker
+from iterable_data_import.importers.importer import Importer
+from .unit_test_utils import write_json_users
+
+
+class RecordingCheckpoint(FileSystemCheckpoint):
+    def __init__(self, file_path) -> None:
+        super().__init__(file_path)
+        self.saved = []
+
+    def save(self, position: SourcePosition) -> None:
+        self.saved.append(position)
+        super().save(position)
+
+
+class MemoryCheckpoint(Checkpoint):
+    def __init__(self) -> None:
+        self.saved = []
+
+    def save(self, position: SourcePosition) -> None:
+        self.saved.append(position)
+
+
+class LaggingImporter(Importer):
+    """acknowledges actions in batches of batch_size, like a batching importer"""
+
+    def __init__(self, batch_size: int, fail_after: int = None) -> None:
+        self.batch_size = batch_size
+        self.fail_after = fail_after
+        self.handled = 0
+        self.acknowledged = 0
+
+    def handle_actions(self, actions) -> None:
+        self.handled += len(actions)
+        if self.fail_after is not None and self.handled > self.fail_after:
+            raise ConnectionError("boom!")
+        if self.handled - self.acknowledged >= self.batch_size:
+            self.acknowledged = self.handled
+
+    @property
+    def acknowledged_actions(self):
+        return self.acknowledged
+
+    def shutdown(self) -> None:
+        self.acknowledged = self.handled
+
+
+def _write_csv(path, num_records):
+    with open(path, "w") as f:
+        f.write("id,email\n")
+        for i in range(num_records):
+            f.write(f'{i},"user{i}@iterable.com"\n')
+
+
+def _map_function(record):
+    return UpdateUserProfile(UserProfile(record["email"]))
+
+
+@pytest.mark.parametrize(
+    "file_format,write",
+    [
+        (FileFormat.CSV, _write_csv),
+        (FileFormat.NEWLINE_DELIMITED_JSON, write_json_users),
+    ],
+)
+def test_file_system_resumes_from_position(tmp_path, file_format, write):
+    path = tmp_path / "data"
+    write(path, 10)
+    source = FileSystem(path, file_format)
+    for _ in range(4):
+        next(source)
+    position = source.position
+    assert position.record_index == 4
+
+    resumed = FileSystem(path, file_format, start_position=position)
+    records = list(resumed)
+    assert [str(r["id"]) for r in records] == [str(i) for i in range(4, 10)]
+    assert resumed.position == SourcePosition(10, path.stat().st_size)
+
+
+def test_csv_offsets_account_for_multiline_records(tmp_path):
+    path = tmp_path / "data.csv"
+    with open(path, "w") as f:
+        f.write('id,notes\n1,"line one\nline two"\n2,plain\n')
+    source = FileSystem(path, FileFormat.CSV)
+    assert next(source)["notes"] == "line one\nline two"
+    resumed = FileSystem(path, FileFormat.CSV, start_position=source.position)
+    assert list(resumed) == [{"id": "2", "notes": "plain"}]
+
+
+def test_filesystem_checkpoint_round_trip(tmp_path):
+    checkpoint = FileSystemCheckpoint(tmp_path / "checkpoint.json")
+    assert checkpoint.load() is None
+    checkpoint.save(SourcePosition(5, 120))
+    assert checkpoint.load() == SourcePosition(5, 120)
+
+
+def test_tracker_only_advances_past_acknowledged_records():
+    checkpoint = MemoryCheckpoint()
+    tracker = CheckpointTracker(checkpoint, save_every=1)
+    tracker.record_handled(2, SourcePosition(1, 10))
+    tracker.record_handled(0, SourcePosition(2, 20))
+    tracker.record_handled(1, SourcePosition(3, 30))
+    tracker.update(1)
+    assert checkpoint.saved == []
+    tracker.update(2)
+    assert checkpoint.saved == [SourcePosition(2, 20)]
+    tracker.update(3)
+    assert checkpoint.saved == [SourcePosition(2, 20), SourcePosition(3, 30)]
+
+
+def test_run_saves_checkpoints(tmp_path):
+    path = tmp_path / "data.csv"
+    _write_csv(path, 25)
+    checkpoint = RecordingCheckpoint(tmp_path / "checkpoint.json")
+    idi = IterableDataImport(
+        FileSystem(path, FileFormat.CSV),
+        LaggingImporter(batch_size=10),
+        NoOpMapErrorRecorder(),
+        checkpoint,
+        checkpoint_every=5,
+    )
+    idi.run(_map_function)
+    assert [p.record_index for p in checkpoint.saved] == [10, 20, 25]
+    assert checkpoint.load() == SourcePosition(25, path.stat().st_size)
+
+
+def test_resume_after_crash_skips_acknowledged_records(tmp_path):
+    path = tmp_path / "data.json"
+    write_json_users(path, 30)
+    checkpoint = FileSystemCheckpoint(tmp_path / "checkpoint.json")
+    idi = IterableDataImport(
+        FileSystem(path, FileFormat.NEWLINE_DELIMITED_JSON),
+        LaggingImporter(batch_size=10, fail_after=15),
+        NoOpMapErrorRecorder(),
+        checkpoint,
+        checkpoint_every=1,
+    )
+    with pytest.raises(ConnectionError):
+        idi.run(_map_function)
+    assert checkpoint.load().record_index == 10
+
+    handled = []
+    source = FileSystem(
+        path, FileFormat.NEWLINE_DELIMITED_JSON, start_position=checkpoint.load()
+    )
+    idi = IterableDataImport(source, NoOpImporter(), NoOpMapErrorRecorder(), checkpoint)
+    idi.run(lambda record: handled.append(record["id"]))
+    assert handled == list(range(10, 30))
+    assert checkpoint.load().record_index == 30
+
+
+def test_create_resumes_from_checkpoint(tmp_path):
+    path = tmp_path / "data.json"
+    write_json_users(path, 3)
+    checkpoint_path = tmp_path / "checkpoint.json"
+    FileSystemCheckpoint(checkpoint_path).save(SourcePosition(2, 10))
+    idi = IterableDataImport.create(
+        "some_api_key",
+        path,
+        FileFormat.NEWLINE_DELIMITED_JSON,
+        checkpoint_path=checkpoint_path,
+    )
+    assert idi.data_source.start_position == SourcePosition(2, 10)
+    assert idi.checkpoint.file_path == checkpoint_path
+
+
+def test_checkpoint_requires_ordered_import(tmp_path):
+    idi = IterableDataImport(
+        [{"email": "test@iterable.com"}],
+        NoOpImporter(),
+        NoOpMapErrorRecorder(),
+        FileSystemCheckpoint(tmp_path / "checkpoint.json"),
+    )
+    with pytest.raises(ValueError):
+        idi.run(_map_function, workers=2, ordered=False)
@@ -0,0 +1,227 @@
+import gzip
+import json
+
+import pytest
+
+from iterable_data_import.error_recorders import compact_api_error_recorder
+
+from iterable_data_import import (
+    IterableDataImport,
+    CompactApiErrorReader,
+    CompactFileSystemApiErrorRecorder,
+    CustomEvent,
+    FileFormat,
+    FileSystem,
+    FileSystemApiErrorRecorder,
+    NoOpMapErrorRecorder,
+    SourcePosition,
+    SourceReference,
+    SyncApiImporter,
+    TrackCustomEvent,
+    UserProfile,
+    UpdateUserProfile,
+)
+from .unit_test_utils import FailingApiClient
+
+RECORDS = [
+    {"id": str(i), "email": f"user{i % 4}@iterable.com", "plan": f"plan{i}"}
+    for i in range(6)
+]
+
+
+def map_function(record):
+    user = UserProfile(record["email"], data_fields={"plan": record["plan"]})
+    return [
+        UpdateUserProfile(user),
+        TrackCustomEvent(CustomEvent("signup", email=record["email"])),
+    ]
+
+
+def _write(tmp_path, file_format):
+    if file_format == FileFormat.CSV:
+        path = tmp_path / "data.csv"
+        lines = ["id,email,plan"] + [
+            f"{r['id']},{r['email']},{r['plan']}" for r in RECORDS
+        ]
+    else:
+        path = tmp_path / "data.json"
+        lines = [json.dumps(r) for r in RECORDS]
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def _import(path, file_format, recorder, start_position=None, coalesce=False):
+    importer = SyncApiImporter(
+        FailingApiClient(), recorder, users_per_batch=10, coalesce_users=coalesce
+    )
+    idi = IterableDataImport(
+        FileSystem(path, file_format, start_position),
+        importer,
+        NoOpMapErrorRecorder(),
+        track_sources=True,
+    )
+    idi.run(map_function)
+
+
+@pytest.mark.parametrize(
+    "file_format", [FileFormat.CSV, FileFormat.NEWLINE_DELIMITED_JSON]
+)
+def test_compact_errors_reference_source_records(tmp_path, file_format):
+    path = _write(tmp_path, file_format)
+    out = tmp_path / "api-errors.json"
+    _import(path, file_format, CompactFileSystemApiErrorRecorder(out))
+
+    users_error = json.loads(out.read_text().splitlines()[0])
+    assert users_error["type"] == "users"
+    assert users_error["files"] == [str(path)]
+    assert users_error["items"][0] == {
+        "email": "user0@iterable.com",
+        "sources": [[0, 0, 0]],
+    }
+    assert "dataFields" not in json.dumps(users_error)
+
+    reader = CompactApiErrorReader(out, file_format)
+    users, events = list(reader)
+    assert (users.request_type, events.request_type) == ("users", "events")
+    assert [r["id"] for r in reader.source_records(users)] == [r["id"] for r in RECORDS]
+    assert [r["id"] for r in reader.source_records(events)] == [
+        r["id"] for r in RECORDS
+    ]
+
+
+@pytest.mark.parametrize(
+    "file_format", [FileFormat.CSV, FileFormat.NEWLINE_DELIMITED_JSON]
+)
+def test_rehydrated_errors_match_full_errors(tmp_path, file_format):
+    path = _write(tmp_path, file_format)
+    full_out = tmp_path / "full-errors.json"
+    compact_out = tmp_path / "compact-errors.json"
+    _import(path, file_format, FileSystemApiErrorRecorder(full_out))
+    _import(path, file_format, CompactFileSystemApiErrorRecorder(compact_out))
+
+    reader = CompactApiErrorReader(compact_out, file_format, map_function)
+    full_errors = [json.loads(line) for line in full_out.read_text().splitlines()]
+    assert list(reader.rehydrated()) == full_errors
+
+
+def test_rehydration_reads_compressed_source_once(tmp_path, monkeypatch):
+    path = tmp_path / "data.json.gz"
+    path.write_bytes(
+        gzip.compress(_write(tmp_path, FileFormat.NEWLINE_DELIMITED_JSON).read_bytes())
+    )
+    out = tmp_path / "api-errors.json"
+    _import(
+        path, FileFormat.NEWLINE_DELIMITED_JSON, CompactFileSystemApiErrorRecorder(out)
+    )
+
+    opened = []
+
+    class CountingFileSystem(FileSystem):
+        def __init__(self, *args, **kwargs):
+            opened.append(args)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(compact_api_error_recorder, "FileSystem", CountingFileSystem)
+    reader = CompactApiErrorReader(out, FileFormat.NEWLINE_DELIMITED_JSON, map_function)
+    users, events = reader.rehydrated()
+    assert len(users["request_body"]["users"]) == len(RECORDS)
+    assert len(events["request_body"]["events"]) == len(RECORDS)
+    assert len(opened) == 1
+
+
+def test_resumed_import_references_absolute_positions(tmp_path):
+    path = _write(tmp_path, FileFormat.NEWLINE_DELIMITED_JSON)
+    source = FileSystem(path, FileFormat.NEWLINE_DELIMITED_JSON)
+    next(source)
+    next(source)
+    out = tmp_path / "api-errors.json"
+    _import(
+        path,
+        FileFormat.NEWLINE_DELIMITED_JSON,
+        CompactFileSystemApiErrorRecorder(out),
+        start_position=source.position,
+    )
+    reader = CompactApiErrorReader(out, FileFormat.NEWLINE_DELIMITED_JSON)
+    users = next(iter(reader))
+    assert users.sources[0] == [SourceReference(str(path), source.position)]
+    assert [r["id"] for r in reader.source_records(users)] == ["2", "3", "4", "5"]
+
+
+def test_coalesced_users_reference_every_record(tmp_path):
+    path = _write(tmp_path, FileFormat.NEWLINE_DELIMITED_JSON)
+    out = tmp_path / "api-errors.json"
+    _import(
+        path,
+        FileFormat.NEWLINE_DELIMITED_JSON,
+        CompactFileSystemApiErrorRecorder(out),
+        coalesce=True,
+    )
+    reader = CompactApiErrorReader(out, FileFormat.NEWLINE_DELIMITED_JSON, map_function)
+    users = next(iter(reader))
+    assert len(users.items) == 4
+    assert [r["id"] for r in reader.source_records(users)[:2]] == ["0", "4"]
+    rehydrated = reader.rehydrate(users)["request_body"]["users"]
+    assert [u["dataFields"]["plan"] for u in rehydrated[:2]] == ["plan0", "plan4"]
+
+
+def test_request_bodies_recorded_without_sources(tmp_path):
+    out = tmp_path / "api-errors.json"
+    recorder = CompactFileSystemApiErrorRecorder(out)
+    recorder.record(
+        400,
+        "{}",
+        {"id": "p1", "user": {"email": "a@iterable.com"}, "items": [], "total": 1},
+    )
+    error = next(iter(CompactApiErrorReader(out)))
+    assert error.request_type == "purchases"
+    assert error.items == [{"id": "p1", "email": "a@iterable.com"}]
+    assert error.sources == [[]]
+
+
+def test_track_sources_requires_file_source():
+    idi = IterableDataImport(
+        iter(RECORDS),
+        SyncApiImporter(FailingApiClient(), FileSystemApiErrorRecorder("x")),
+        NoOpMapErrorRecorder(),
+        track_sources=True,
+    )
+    with pytest.raises(ValueError):
+        idi.run(map_function)
+
+
+def test_create_with_compact_api_errors(tmp_path, mocker):
+    path = _write(tmp_path, FileFormat.CSV)
+    idi = IterableDataImport.create(
+        "some_api_key",
+        path,
+        FileFormat.CSV,
+        api_error_out=tmp_path / "api-errors.json",
+        compact_api_errors=True,
+    )
+    assert isinstance(idi.importer.error_recorder, CompactFileSystemApiErrorRecorder)
+    assert idi.track_sources
+
+    create_importer = mocker.patch(
+        "iterable_data_import.iterable_data_import._create_api_importer"
+    )
+    with pytest.raises(ValueError):
+        IterableDataImport.create(
+            "some_api_key",
+            tmp_path / "*.csv",
+            FileFormat.CSV,
+            compact_api_errors=True,
+        )
+    with pytest.raises(ValueError):
+        IterableDataImport.create(
+            "some_api_key", path, FileFormat.CSV, shard="1/2", compact_api_errors=True
+        )
+    create_importer.assert_not_called()
+
+
+def test_source_reference_equality():
+    assert SourceReference("a.csv", SourcePosition(1, 10)) == SourceReference(
+        "a.csv", SourcePosition(1, 10)
+    )
+    assert SourceReference("a.csv", SourcePosition(1, 10)) != SourceReference(
+        "b.csv", SourcePosition(1, 10)
+    )
@@ -0,0 +1,87 @@
+import bz2
+import gzip
+import json
+import lzma
+
+import pytest
+import zstandard
+
+from iterable_data_import import (
+    Compression,
+    FileSystem,
+    FileFormat,
+    MultiFileSystem,
+    RecordBatchFormat,
+)
+
+RECORDS = [{"id": str(i), "email": f"user{i}@iterable.com"} for i in range(50)]
+
+COMPRESSORS = {
+    ".gz": gzip.compress,
+    ".bz2": bz2.compress,
+    ".xz": lzma.compress,
+    # two frames, as written by parallel compressors
+    ".zst": lambda data: zstandard.compress(data[:100])
+    + zstandard.compress(data[100:]),
+}
+
+
+def _csv_data() -> bytes:
+    lines = ["id,email"] + [f"{r['id']},{r['email']}" for r in RECORDS]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _json_data() -> bytes:
+    return "".join(json.dumps(r) + "\n" for r in RECORDS).encode("utf-8")
+
+
+@pytest.mark.parametrize("extension", COMPRESSORS.keys())
+@pytest.mark.parametrize(
+    "file_format,data",
+    [(FileFormat.CSV, _csv_data()), (FileFormat.NEWLINE_DELIMITED_JSON, _json_data())],
+)
+def test_reads_compressed_files(tmp_path, extension, file_format, data):
+    path = tmp_path / f"data{extension}"
+    path.write_bytes(COMPRESSORS[extension](data))
+    assert list(FileSystem(path, file_format)) == RECORDS
+
+
+def test_explicit_compression(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_bytes(gzip.compress(_csv_data()))
+    assert list(FileSystem(path, FileFormat.CSV, compression=Compression.GZIP)) == (
+        RECORDS
+    )
+
+
+@pytest.mark.parametrize("extension", [".gz", ".zst"])
+@pytest.mark.parametrize(
+    "file_format,data",
+    [(FileFormat.CSV, _csv_data()), (FileFormat.NEWLINE_DELIMITED_JSON, _json_data())],
+)
+def test_resumes_compressed_file(tmp_path, extension, file_format, data):
+    path = tmp_path / f"data{extension}"
+    path.write_bytes(COMPRESSORS[extension](data))
+    source = FileSystem(path, file_format)
+    for _ in range(10):
+        next(source)
+    resumed = FileSystem(path, file_format, start_position=source.position)
+    assert list(resumed) == RECORDS[10:]
+
+
+def test_compressed_csv_batches(tmp_path):
+    path = tmp_path / "data.csv.zst"
+    path.write_bytes(COMPRESSORS[".zst"](_csv_data()))
+    batches = list(
+        FileSystem(path, FileFormat.CSV).batches(1000, RecordBatchFormat.COLUMNS)
+    )
+    assert batches == [
+        {"id": [r["id"] for r in RECORDS], "email": [r["email"] for r in RECORDS]}
+    ]
+
+
+def test_multi_file_system_reads_compressed_parts(tmp_path):
+    for i in range(3):
+        (tmp_path / f"part-{i}.json.gz").write_bytes(gzip.compress(_json_data()))
+    source = MultiFileSystem(tmp_path / "*.json.gz", FileFormat.NEWLINE_DELIMITED_JSON)
+    assert len(list(source)) == 3 * len(RECORDS)
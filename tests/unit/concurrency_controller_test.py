@@ -0,0 +1,109 @@
+import threading
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+
+from iterable_data_import import (
+    AimdConcurrencyController,
+    SyncApiClient,
+    UserProfile,
+)
+from iterable_data_import.importers.iterable_request import BulkUserUpdateRequest
+from .unit_test_utils import FakeClock, FakeResponse
+
+
+def _controller(**kwargs) -> AimdConcurrencyController:
+    kwargs.setdefault("clock", FakeClock())
+    return AimdConcurrencyController(window_size=10, **kwargs)
+
+
+def test_limit_increases_while_latency_is_flat():
+    controller = _controller(initial_limit=2)
+    for _ in range(200):
+        controller.observe(0.1, 200)
+    assert controller.limit > 2
+
+
+def test_limit_holds_while_latency_rises():
+    controller = _controller(initial_limit=2)
+    for _ in range(10):
+        controller.observe(0.1, 200)
+    limit = controller.state["limit"]
+    for _ in range(200):
+        controller.observe(1.0, 200)
+    assert controller.limit == limit
+
+
+def test_limit_never_exceeds_max():
+    controller = _controller(initial_limit=2, max_limit=3)
+    for _ in range(1000):
+        controller.observe(0.1, 200)
+    assert controller.limit == 3
+
+
+@pytest.mark.parametrize("status_code", [429, 500, 503, None])
+def test_limit_decreases_on_failure(status_code):
+    controller = _controller(initial_limit=16)
+    controller.observe(None if status_code is None else 0.1, status_code)
+    assert controller.limit == 8
+
+
+def test_concurrent_failures_only_decrease_once():
+    clock = FakeClock()
+    controller = _controller(initial_limit=16, clock=clock)
+    for _ in range(5):
+        controller.observe(0.1, 429)
+    assert controller.limit == 8
+    clock.now += 2
+    controller.observe(0.1, 429)
+    assert controller.limit == 4
+    assert controller.state["failures"] == 6
+
+
+def test_limit_never_below_min():
+    clock = FakeClock()
+    controller = _controller(initial_limit=2, min_limit=2, clock=clock)
+    controller.observe(0.1, 500)
+    assert controller.limit == 2
+
+
+def test_acquire_blocks_at_limit():
+    controller = _controller(initial_limit=1)
+    controller.acquire()
+    acquired = threading.Event()
+
+    def acquire():
+        controller.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=acquire)
+    thread.start()
+    assert not acquired.wait(0.05)
+    controller.release()
+    assert acquired.wait(1)
+    thread.join()
+    assert controller.state["in_flight"] == 1
+
+
+def test_client_reports_responses(mocker: MockerFixture):
+    controller = _controller()
+    observe = mocker.spy(controller, "observe")
+    client = SyncApiClient("some_api_key", concurrency_controller=controller)
+    mocker.patch.object(client.session, "post", return_value=FakeResponse(200))
+    req = BulkUserUpdateRequest([UserProfile("test@iterable.com")])
+    client.bulk_update_users(req)
+    latency, status_code = observe.call_args.args
+    assert latency >= 0
+    assert status_code == 200
+
+
+def test_client_reports_timeouts(mocker: MockerFixture):
+    controller = _controller()
+    observe = mocker.spy(controller, "observe")
+    client = SyncApiClient("some_api_key", concurrency_controller=controller)
+    mocker.patch.object(client.session, "post", side_effect=requests.Timeout())
+    req = BulkUserUpdateRequest([UserProfile("test@iterable.com")])
+    with pytest.raises(requests.Timeout):
+        client.bulk_update_users(req)
+    observe.assert_called_once_with(None, None)
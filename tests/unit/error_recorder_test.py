@@ -0,0 +1,168 @@
+import json
+import time
+
+import pytest
+
+from iterable_data_import import (
+    IterableDataImport,
+    FileSystemApiErrorRecorder,
+    FileSystemMapErrorRecorder,
+    SyncApiImporter,
+    UserProfile,
+    UpdateUserProfile,
+)
+from iterable_data_import.checkpoint import Checkpoint, CheckpointTracker
+from iterable_data_import.data_sources.data_source import SourcePosition
+from iterable_data_import.error_recorders.buffered_file_writer import (
+    BufferedFileWriter,
+)
+from iterable_data_import.importers.importer import Importer
+from .unit_test_utils import FailingApiClient
+
+BODY = {"users": [{"email": "test@iterable.com"}]}
+
+
+class CrashingImporter(Importer):
+    def handle_actions(self, actions):
+        if actions:
+            raise RuntimeError("connection lost")
+
+
+def _map_function(record):
+    if record["id"] < 3:
+        raise ValueError(f"bad record {record['id']}")
+    return UpdateUserProfile(UserProfile(f"user{record['id']}@iterable.com"))
+
+
+def _lines(path):
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_errors_written_as_recorded_by_default(tmp_path):
+    out = tmp_path / "map-errors.json"
+    recorder = FileSystemMapErrorRecorder(out)
+    recorder.record(ValueError("bad email"), {"id": 1})
+    assert _lines(out) == [{"exception": "bad email", "record": {"id": 1}}]
+
+
+def test_buffered_errors_written_on_flush(tmp_path):
+    out = tmp_path / "api-errors.json"
+    recorder = FileSystemApiErrorRecorder(out, flush_interval=60)
+    recorder.record(400, '{"msg": "bad"}', BODY)
+    recorder.record_serialized(400, '{"msg": "bad"}', json.dumps(BODY).encode())
+    assert _lines(out) == []
+    recorder.flush()
+    assert len(_lines(out)) == 2
+    recorder.record(400, '{"msg": "bad"}', BODY)
+    recorder.close()
+    assert len(_lines(out)) == 3
+
+
+def test_buffer_flushed_once_full(tmp_path):
+    out = tmp_path / "map-errors.json"
+    recorder = FileSystemMapErrorRecorder(out, flush_interval=60, flush_size=100)
+    recorder.record(ValueError("bad"), {"id": 1})
+    assert _lines(out) == []
+    recorder.record(ValueError("bad"), {"id": 2, "padding": "x" * 100})
+    assert len(_lines(out)) == 2
+    recorder.close()
+
+
+def test_buffer_flushed_in_background(tmp_path):
+    out = tmp_path / "map-errors.json"
+    recorder = FileSystemMapErrorRecorder(out, flush_interval=0.01)
+    recorder.record(ValueError("bad"), {"id": 1})
+    deadline = time.monotonic() + 5
+    while not _lines(out) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(_lines(out)) == 1
+    recorder.close()
+
+
+@pytest.mark.parametrize("flush_interval, flush_size", [(0, 100), (-1, 100), (1, 0)])
+def test_invalid_buffer_settings(tmp_path, flush_interval, flush_size):
+    with pytest.raises(ValueError):
+        BufferedFileWriter(tmp_path / "errors.json", flush_interval, flush_size)
+
+
+def test_run_closes_map_error_recorder_when_import_fails(tmp_path):
+    out = tmp_path / "map-errors.json"
+    idi = IterableDataImport(
+        [{"id": i} for i in range(5)],
+        CrashingImporter(),
+        FileSystemMapErrorRecorder(out, flush_interval=60),
+    )
+    with pytest.raises(RuntimeError):
+        idi.run(_map_function)
+    assert [error["record"]["id"] for error in _lines(out)] == [0, 1, 2]
+
+
+class DisconnectingApiClient:
+    """fails the first request and loses the connection on the next"""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def bulk_update_users(self, req):
+        self.calls += 1
+        if self.calls > 1:
+            raise ConnectionError("connection lost")
+        return FailingApiClient().bulk_update_users(req)
+
+
+def _map_batch_function(batch):
+    return [
+        UpdateUserProfile(UserProfile(f"user{i}@iterable.com")) for i in batch["id"]
+    ]
+
+
+@pytest.mark.parametrize("batches", [False, True])
+def test_run_closes_api_error_recorder_when_import_fails(tmp_path, batches):
+    out = tmp_path / "api-errors.json"
+    importer = SyncApiImporter(
+        DisconnectingApiClient(),
+        FileSystemApiErrorRecorder(out, flush_interval=60),
+        users_per_batch=2,
+    )
+    idi = IterableDataImport(
+        [{"id": i} for i in range(3, 8)],
+        importer,
+        FileSystemMapErrorRecorder(tmp_path / "map-errors.json"),
+    )
+    with pytest.raises(ConnectionError):
+        if batches:
+            idi.run_batches(_map_batch_function, batch_size=2)
+        else:
+            idi.run(_map_function)
+    assert [error["response_status"] for error in _lines(out)] == [400]
+
+
+def test_importer_shutdown_closes_error_recorder(tmp_path):
+    out = tmp_path / "api-errors.json"
+    importer = SyncApiImporter(
+        FailingApiClient(),
+        FileSystemApiErrorRecorder(out, flush_interval=60),
+        users_per_batch=2,
+    )
+    importer.handle_actions(
+        [UpdateUserProfile(UserProfile(f"user{i}@iterable.com")) for i in range(3)]
+    )
+    importer.shutdown()
+    assert [error["response_status"] for error in _lines(out)] == [400, 400]
+
+
+def test_error_recorders_flushed_before_checkpoint_saved():
+    calls = []
+
+    class RecordingCheckpoint(Checkpoint):
+        def save(self, position):
+            calls.append("save")
+
+    tracker = CheckpointTracker(
+        RecordingCheckpoint(), save_every=1, before_save=lambda: calls.append("flush")
+    )
+    tracker.record_handled(1, SourcePosition(1, 10))
+    tracker.update(1)
+    assert calls == ["flush", "save"]
@@ -22,6 +22,9 @@ from iterable_data_import import (
     FileSystemApiErrorRecorder,
     SyncApiClient,
     NoOpImporter,
+    AsyncApiImporter,
+    AsyncApiClient,
+    AimdConcurrencyController,
 )
 
 
@@ -135,3 +138,87 @@ def test_shutdown_called(mocker: MockerFixture):
 
 def _map_function(record: SourceDataRecord) -> ImportAction:
     return UpdateUserProfile(UserProfile("test@iterable.com"))
+
+
+def test_create_instance_with_async_importer():
+    idi = IterableDataImport.create(
+        API_KEY,
+        SOURCE_PATH,
+        SOURCE_FORMAT,
+        use_async_importer=True,
+        max_in_flight_requests=25,
+    )
+    assert isinstance(idi.importer, AsyncApiImporter)
+    assert isinstance(idi.importer.api_client, AsyncApiClient)
+    assert idi.importer.max_in_flight == 25
+
+
+def test_create_instance_with_sender_threads():
+    idi = IterableDataImport.create(
+        API_KEY, SOURCE_PATH, SOURCE_FORMAT, sender_threads=16
+    )
+    assert isinstance(idi.importer, SyncApiImporter)
+    assert idi.importer.sender_threads == 16
+    assert idi.importer.api_client.pool_maxsize == 16
+
+
+def _email_map_function(record: SourceDataRecord) -> ImportAction:
+    if record["id"] % 7 == 0:
+        raise ValueError(f"bad record {record['id']}")
+    return UpdateUserProfile(UserProfile(f"user{record['id']}@iterable.com"))
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_run_with_worker_processes(mocker: MockerFixture, ordered: bool):
+    idi = IterableDataImport.create(API_KEY, SOURCE_PATH, SOURCE_FORMAT, dry_run=True)
+    records = [{"id": i} for i in range(1, 101)]
+    idi.data_source = records
+    handle_spy = mocker.spy(idi.importer, "handle_actions")
+    error_spy = mocker.spy(idi.map_error_recorder, "record")
+
+    idi.run(_email_map_function, workers=2, chunk_size=10, ordered=ordered)
+
+    emails = [
+        action.user.email
+        for call in handle_spy.call_args_list
+        for action in call.args[0]
+    ]
+    expected = [f"user{i}@iterable.com" for i in range(1, 101) if i % 7 != 0]
+    if ordered:
+        assert emails == expected
+    else:
+        assert sorted(emails) == sorted(expected)
+
+    failed_records = sorted(call.args[1]["id"] for call in error_spy.call_args_list)
+    assert failed_records == [i for i in range(1, 101) if i % 7 == 0]
+    assert all(
+        isinstance(call.args[0], ValueError) for call in error_spy.call_args_list
+    )
+
+
+def test_create_instance_with_adaptive_concurrency():
+    idi = IterableDataImport.create(
+        API_KEY,
+        SOURCE_PATH,
+        SOURCE_FORMAT,
+        sender_threads=8,
+        adaptive_concurrency=True,
+    )
+    controller = idi.importer.api_client.concurrency_controller
+    assert isinstance(controller, AimdConcurrencyController)
+    assert controller.max_limit == 8
+
+
+def test_adaptive_concurrency_requires_concurrent_importer(mocker):
+    recorder = mocker.patch(
+        "iterable_data_import.iterable_data_import.FileSystemApiErrorRecorder"
+    )
+    with pytest.raises(ValueError, match="adaptive_concurrency requires"):
+        IterableDataImport.create(
+            API_KEY,
+            SOURCE_PATH,
+            SOURCE_FORMAT,
+            api_error_out="api-errors.json",
+            adaptive_concurrency=True,
+        )
+    recorder.assert_not_called()
@@ -0,0 +1,67 @@
+import pickle
+
+import pytest
+
+from iterable_data_import import CustomEvent, CommerceItem, Purchase, UserProfile
+
+
+def _purchase():
+    user = UserProfile("test@iterable.com")
+    return Purchase(user, [CommerceItem("1", "shoes", 99.0, 1)], 99.0)
+
+
+@pytest.mark.parametrize(
+    "resource",
+    [
+        UserProfile("test@iterable.com"),
+        CustomEvent("test event", user_id="1"),
+        CommerceItem("1", "shoes", 99.0, 1),
+        _purchase(),
+    ],
+)
+def test_resources_have_no_instance_dict(resource):
+    assert not hasattr(resource, "__dict__")
+
+
+def test_api_dict_built_once():
+    event = CustomEvent("test event", user_id="1", data_fields={"x": 1})
+    api_dict = event.to_api_dict
+    assert api_dict == {
+        "eventName": "test event",
+        "userId": "1",
+        "dataFields": {"x": 1},
+    }
+    assert event.to_api_dict is api_dict
+
+
+def test_resources_round_trip_through_pickle():
+    purchase = _purchase()
+    api_dict = purchase.to_api_dict
+    assert pickle.loads(pickle.dumps(purchase)).to_api_dict == api_dict
+    assert pickle.loads(pickle.dumps(_purchase())).to_api_dict == api_dict
+
+
+@pytest.mark.parametrize(
+    "resource",
+    [
+        UserProfile("test@iterable.com", "1", {"x": 1}, prefer_user_id=True),
+        CustomEvent("test event", user_id="1", event_id="e1", created_at=1),
+        _purchase(),
+    ],
+)
+def test_resources_created_from_api_dict(resource):
+    api_dict = resource.to_api_dict
+    created = type(resource).from_api_dict(api_dict)
+    assert created.to_api_dict is api_dict
+    assert type(resource)(*_fields(created)).to_api_dict == api_dict
+
+
+def _fields(resource):
+    if isinstance(resource, Purchase):
+        return [resource.user, resource.items, resource.total]
+    return [getattr(resource, name) for name in type(resource).__slots__]
+
+
+def test_invalid_api_dict_raises():
+    with pytest.raises(ValueError):
+        UserProfile.from_api_dict({"dataFields": {}})
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from iterable_data_import import FileSystemApiErrorRecorder, UserProfile
+from iterable_data_import.importers.iterable_request import BulkUserUpdateRequest
+from iterable_data_import.json_serializer import (
+    OrjsonSerializer,
+    StdlibJsonSerializer,
+)
+
+BODY = {"users": [{"email": "test@iterable.com", "dataFields": {"name": "Zoë"}}]}
+
+
+class CountingSerializer(StdlibJsonSerializer):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def dumps(self, obj: object) -> bytes:
+        self.calls += 1
+        return super().dumps(obj)
+
+
+@pytest.mark.parametrize("serializer", [StdlibJsonSerializer(), OrjsonSerializer()])
+def test_serializers_encode_json(serializer):
+    assert json.loads(serializer.dumps(BODY)) == BODY
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        {"dataFields": {1: "one", None: "none", 2.5: "x"}},
+        {"dataFields": {True: "yes"}},
+        {"dataFields": {"id": 2**70}},
+    ],
+)
+def test_orjson_encodes_like_stdlib(obj):
+    assert json.loads(OrjsonSerializer().dumps(obj)) == json.loads(
+        StdlibJsonSerializer().dumps(obj)
+    )
+
+
+def test_request_serialized_once():
+    serializer = CountingSerializer()
+    request = BulkUserUpdateRequest([UserProfile("test@iterable.com")])
+    body = request.serialize(serializer)
+    assert request.serialize(serializer) is body
+    assert serializer.calls == 1
+    assert json.loads(body) == request.to_api_dict
+
+
+def test_file_system_recorder_splices_serialized_body(tmp_path):
+    out = tmp_path / "api-errors.json"
+    recorder = FileSystemApiErrorRecorder(out)
+    recorder.record_serialized(400, '{"msg": "bad"}', OrjsonSerializer().dumps(BODY))
+    recorder.record(400, '{"msg": "bad"}', BODY)
+    lines = out.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0]) == json.loads(lines[1])
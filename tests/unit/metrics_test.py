@@ -0,0 +1,150 @@
+import json
+
+from iterable_data_import import (
+    IterableDataImport,
+    InMemoryMetrics,
+    NoOpApiErrorRecorder,
+    NoOpImporter,
+    NoOpMapErrorRecorder,
+    SyncApiImporter,
+    UserProfile,
+    UpdateUserProfile,
+)
+from iterable_data_import.metrics import (
+    DISPATCH,
+    ERROR_RECORD,
+    HTTP,
+    MAP,
+    READ_PARSE,
+    SERIALIZE,
+)
+from .unit_test_utils import FakeResponse
+
+
+class FakeApiClient:
+    def __init__(self, metrics, status_code: int = 200) -> None:
+        self.metrics = metrics
+        self.status_code = status_code
+
+    def bulk_update_users(self, req):
+        return FakeResponse(self.status_code)
+
+
+def _stats(metrics, stage):
+    return [s for s in metrics.snapshot() if s["stage"] == stage]
+
+
+def _map_function(record):
+    if record["id"] == 3:
+        raise ValueError("bad record")
+    return UpdateUserProfile(UserProfile(f"user{record['id']}@iterable.com"))
+
+
+def test_observations_bucketed_and_totalled():
+    metrics = InMemoryMetrics(buckets=[0.1, 1.0])
+    metrics.observe(HTTP, 0.05, 10, {"endpoint": "/users/bulkUpdate"})
+    metrics.observe(HTTP, 0.5, 20, {"endpoint": "/users/bulkUpdate"})
+    metrics.observe(HTTP, 5.0, 30, {"endpoint": "/users/bulkUpdate"})
+    metrics.observe(HTTP, 0.1, 1, {"endpoint": "/commerce/trackPurchase"})
+    assert metrics.snapshot() == [
+        {
+            "stage": HTTP,
+            "labels": {"endpoint": "/commerce/trackPurchase"},
+            "calls": 1,
+            "items": 1,
+            "seconds": 0.1,
+            "max_seconds": 0.1,
+            "buckets": {"0.1": 1, "1.0": 1, "+Inf": 1},
+        },
+        {
+            "stage": HTTP,
+            "labels": {"endpoint": "/users/bulkUpdate"},
+            "calls": 3,
+            "items": 60,
+            "seconds": 5.55,
+            "max_seconds": 5.0,
+            "buckets": {"0.1": 1, "1.0": 2, "+Inf": 3},
+        },
+    ]
+    assert json.loads(metrics.to_json()) == {"stages": metrics.snapshot()}
+
+
+def test_prometheus_text():
+    metrics = InMemoryMetrics(buckets=[0.1])
+    metrics.observe(HTTP, 0.05, 10, {"endpoint": "/users/bulkUpdate"})
+    metrics.observe(MAP, 0.2)
+    assert metrics.to_prometheus() == (
+        "# HELP iterable_data_import_stage_seconds Time spent in each stage of the import\n"
+        "# TYPE iterable_data_import_stage_seconds histogram\n"
+        'iterable_data_import_stage_seconds_bucket{stage="http",endpoint="/users/bulkUpdate",le="0.1"} 1\n'
+        'iterable_data_import_stage_seconds_bucket{stage="http",endpoint="/users/bulkUpdate",le="+Inf"} 1\n'
+        'iterable_data_import_stage_seconds_sum{stage="http",endpoint="/users/bulkUpdate"} 0.05\n'
+        'iterable_data_import_stage_seconds_count{stage="http",endpoint="/users/bulkUpdate"} 1\n'
+        'iterable_data_import_stage_seconds_bucket{stage="map",le="0.1"} 0\n'
+        'iterable_data_import_stage_seconds_bucket{stage="map",le="+Inf"} 1\n'
+        'iterable_data_import_stage_seconds_sum{stage="map"} 0.2\n'
+        'iterable_data_import_stage_seconds_count{stage="map"} 1\n'
+        "# HELP iterable_data_import_stage_items_total Items handled by each stage of the import\n"
+        "# TYPE iterable_data_import_stage_items_total counter\n"
+        'iterable_data_import_stage_items_total{stage="http",endpoint="/users/bulkUpdate"} 10\n'
+        'iterable_data_import_stage_items_total{stage="map"} 1\n'
+    )
+
+
+def test_callback_receives_observations():
+    observed = []
+    metrics = InMemoryMetrics(callback=lambda *args: observed.append(args))
+    metrics.observe(READ_PARSE, 0.01)
+    metrics.observe(HTTP, 0.2, 5, {"endpoint": "/events/trackBulk"})
+    assert observed == [
+        (READ_PARSE, 0.01, 1, {}),
+        (HTTP, 0.2, 5, {"endpoint": "/events/trackBulk"}),
+    ]
+
+
+def test_run_observes_import_stages():
+    metrics = InMemoryMetrics()
+    idi = IterableDataImport(
+        [{"id": i} for i in range(5)],
+        NoOpImporter(),
+        NoOpMapErrorRecorder(),
+        metrics=metrics,
+    )
+    idi.run(_map_function)
+    assert _stats(metrics, READ_PARSE)[0]["calls"] == 5
+    assert _stats(metrics, MAP)[0]["calls"] == 5
+    assert _stats(metrics, DISPATCH)[0]["items"] == 4
+    assert _stats(metrics, ERROR_RECORD)[0]["calls"] == 1
+
+
+def test_run_batches_observes_import_stages():
+    metrics = InMemoryMetrics()
+    idi = IterableDataImport(
+        [{"id": i} for i in range(5)],
+        NoOpImporter(),
+        NoOpMapErrorRecorder(),
+        metrics=metrics,
+    )
+    idi.run_batches(
+        lambda batch: [UpdateUserProfile(UserProfile(str(i))) for i in batch["id"]],
+        batch_size=2,
+    )
+    assert _stats(metrics, READ_PARSE)[0]["items"] == 5
+    assert _stats(metrics, MAP)[0]["calls"] == 3
+    assert _stats(metrics, DISPATCH)[0]["items"] == 5
+
+
+def test_importer_observes_serialization_and_error_recording():
+    metrics = InMemoryMetrics()
+    importer = SyncApiImporter(
+        FakeApiClient(metrics, status_code=400),
+        NoOpApiErrorRecorder(),
+        users_per_batch=2,
+    )
+    importer.handle_actions(
+        [UpdateUserProfile(UserProfile(f"user{i}@iterable.com")) for i in range(3)]
+    )
+    importer.shutdown()
+    assert _stats(metrics, SERIALIZE)[0]["calls"] == 3
+    assert _stats(metrics, SERIALIZE)[0]["labels"] == {"batch": "users"}
+    assert _stats(metrics, ERROR_RECORD)[0]["items"] == 3
@@ -0,0 +1,172 @@
+import json
+import os
+import pickle
+
+import pytest
+
+from iterable_data_import import (
+    IterableDataImport,
+    FileFormat,
+    FileSystem,
+    FileSystemCheckpoint,
+    MmapNdjsonFileSystem,
+    NoOpImporter,
+    NoOpMapErrorRecorder,
+    SourcePosition,
+    UserProfile,
+    UpdateUserProfile,
+)
+from iterable_data_import.data_sources.mmap_ndjson import LineIndex
+from .unit_test_utils import write_json_users
+
+
+def _map_function(record):
+    if record["id"] % 7 == 0:
+        raise ValueError(f"bad record {record['id']}")
+    return UpdateUserProfile(UserProfile(record["email"]))
+
+
+@pytest.mark.parametrize("trailing_newline", [True, False])
+def test_reads_same_records_and_positions_as_file_system(tmp_path, trailing_newline):
+    path = tmp_path / "data.json"
+    write_json_users(path, 25, trailing_newline)
+    source = MmapNdjsonFileSystem(path)
+    expected = FileSystem(path, FileFormat.NEWLINE_DELIMITED_JSON)
+    for record in source:
+        assert record == next(expected)
+        assert source.position == expected.position
+    assert source.record_count == 25
+
+
+def test_index_offsets_every_stride_lines(tmp_path):
+    path = tmp_path / "data.json"
+    write_json_users(path, 25)
+    with open(path, "rb") as f:
+        data = f.read()
+    lines = data.splitlines(keepends=True)
+    index = LineIndex.build(data, len(data), 0, stride=10)
+    assert index.line_count == 25
+    assert list(index.offsets) == [
+        0,
+        len(b"".join(lines[:10])),
+        len(b"".join(lines[:20])),
+    ]
+
+
+def test_index_saved_and_reused(tmp_path, mocker):
+    path = tmp_path / "data.json"
+    write_json_users(path, 5)
+    assert MmapNdjsonFileSystem(path).record_count == 5
+    assert os.path.exists(f"{path}.lineidx")
+
+    build_spy = mocker.spy(LineIndex, "build")
+    assert MmapNdjsonFileSystem(path).record_count == 5
+    assert build_spy.call_count == 0
+
+
+@pytest.mark.parametrize("key", ["byteorder", "stride", "line_count"])
+def test_index_missing_header_key_rebuilt(tmp_path, key):
+    path = tmp_path / "data.json"
+    write_json_users(path, 5)
+    assert MmapNdjsonFileSystem(path).record_count == 5
+    index_path = f"{path}.lineidx"
+    with open(index_path, "rb") as f:
+        header = json.loads(f.readline())
+        offsets = f.read()
+    del header[key]
+    with open(index_path, "wb") as f:
+        f.write(json.dumps(header).encode("utf-8") + b"\n" + offsets)
+    assert MmapNdjsonFileSystem(path).record_count == 5
+
+
+def test_out_of_date_index_rebuilt(tmp_path):
+    path = tmp_path / "data.json"
+    write_json_users(path, 5)
+    assert MmapNdjsonFileSystem(path).record_count == 5
+    write_json_users(path, 8)
+    assert MmapNdjsonFileSystem(path).record_count == 8
+
+
+def test_position_of_record(tmp_path):
+    path = tmp_path / "data.json"
+    write_json_users(path, 2500)
+    source = MmapNdjsonFileSystem(path, cache_index=False)
+    expected = FileSystem(path, FileFormat.NEWLINE_DELIMITED_JSON)
+    for _ in range(1234):
+        next(expected)
+    assert source.position_of(1234) == expected.position
+    assert source.position_of(5000) == SourcePosition(2500, path.stat().st_size)
+
+    resumed = MmapNdjsonFileSystem(path, source.position_of(1234))
+    assert next(resumed)["id"] == 1234
+
+
+def test_split_covers_every_record_once(tmp_path):
+    path = tmp_path / "data.json"
+    write_json_users(path, 2500)
+    source = MmapNdjsonFileSystem(path, SourcePosition(0, 0))
+    parts = list(source.split(900))
+    assert [part.start_position.record_index for part in parts] == [0, 900, 1800]
+    ids = [record["id"] for part in parts for record in part]
+    assert ids == list(range(2500))
+    assert parts[-1].position == SourcePosition(2500, path.stat().st_size)
+
+
+def test_split_parts_can_be_pickled(tmp_path):
+    path = tmp_path / "data.json"
+    write_json_users(path, 10)
+    part = pickle.loads(pickle.dumps(next(MmapNdjsonFileSystem(path).split(4))))
+    assert [record["id"] for record in part] == [0, 1, 2, 3]
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text("")
+    source = MmapNdjsonFileSystem(path)
+    assert source.record_count == 0
+    assert list(source) == []
+    assert list(source.split(10)) == []
+
+
+def test_run_with_workers_reading_the_file(tmp_path, mocker):
+    path = tmp_path / "data.json"
+    write_json_users(path, 100)
+    checkpoint = FileSystemCheckpoint(tmp_path / "checkpoint.json")
+    idi = IterableDataImport(
+        MmapNdjsonFileSystem(path),
+        NoOpImporter(),
+        NoOpMapErrorRecorder(),
+        checkpoint,
+    )
+    handle_spy = mocker.spy(idi.importer, "handle_actions")
+    error_spy = mocker.spy(idi.map_error_recorder, "record")
+
+    idi.run(_map_function, workers=2, chunk_size=30)
+
+    emails = [
+        action.user.email
+        for call in handle_spy.call_args_list
+        for action in call.args[0]
+    ]
+    assert emails == [f"user{i}@iterable.com" for i in range(100) if i % 7 != 0]
+    failed_records = [call.args[1]["id"] for call in error_spy.call_args_list]
+    assert failed_records == [i for i in range(100) if i % 7 == 0]
+    assert checkpoint.load() == SourcePosition(100, path.stat().st_size)
+
+
+def test_create_with_memory_map(tmp_path, mocker):
+    path = tmp_path / "data.json"
+    write_json_users(path, 3)
+    idi = IterableDataImport.create(
+        "some_api_key", path, FileFormat.NEWLINE_DELIMITED_JSON, memory_map=True
+    )
+    assert isinstance(idi.data_source, MmapNdjsonFileSystem)
+
+    create_importer = mocker.patch(
+        "iterable_data_import.iterable_data_import._create_api_importer"
+    )
+    with pytest.raises(ValueError):
+        IterableDataImport.create(
+            "some_api_key", tmp_path / "data.csv", FileFormat.CSV, memory_map=True
+        )
+    create_importer.assert_not_called()
@@ -0,0 +1,83 @@
+import json
+import threading
+
+import pytest
+
+from iterable_data_import import FileFormat, IterableDataImport, MultiFileSystem
+
+
+def _write_parts(tmp_path, sizes):
+    paths = []
+    for i, size in enumerate(sizes):
+        path = tmp_path / f"part-{i:04d}.json"
+        with open(path, "w") as f:
+            for j in range(size):
+                f.write(json.dumps({"part": i, "id": j}) + "\n")
+        paths.append(path)
+    return paths
+
+
+def test_reads_every_file_in_directory(tmp_path):
+    paths = _write_parts(tmp_path, [3, 250, 0, 7])
+    source = MultiFileSystem(tmp_path, FileFormat.NEWLINE_DELIMITED_JSON)
+    records = list(source)
+    assert sorted((r["part"], r["id"]) for r in records) == [
+        (i, j) for i, size in enumerate([3, 250, 0, 7]) for j in range(size)
+    ]
+    assert source.completed_files == set(paths)
+    assert source.file_positions[paths[1]].record_index == 250
+
+
+def test_reads_files_matching_glob(tmp_path):
+    _write_parts(tmp_path, [2, 2])
+    (tmp_path / "other.json").write_text('{"part": 9, "id": 0}\n')
+    source = MultiFileSystem(
+        tmp_path / "part-*.json", FileFormat.NEWLINE_DELIMITED_JSON
+    )
+    assert len(source.file_paths) == 2
+    assert len(list(source)) == 4
+
+
+def test_large_file_does_not_hold_up_other_files(tmp_path):
+    _write_parts(tmp_path, [5000, 100])
+    source = MultiFileSystem(
+        tmp_path, FileFormat.NEWLINE_DELIMITED_JSON, reader_threads=2, prefetch=100
+    )
+    parts = [r["part"] for r in source]
+    assert parts.index(1) < len(parts) - 1 - parts[::-1].index(0)
+
+
+def test_reader_error_raised(tmp_path):
+    _write_parts(tmp_path, [10])
+    (tmp_path / "part-0001.json").write_text("not json\n")
+    with pytest.raises(json.JSONDecodeError):
+        list(MultiFileSystem(tmp_path, FileFormat.NEWLINE_DELIMITED_JSON))
+
+
+def test_readers_stop_when_import_ends_early(tmp_path):
+    _write_parts(tmp_path, [5000, 5000])
+    source = MultiFileSystem(tmp_path, FileFormat.NEWLINE_DELIMITED_JSON, prefetch=100)
+    next(source)
+    source.source_data_generator.close()
+    assert not any(
+        t.name.startswith("MultiFileSystem-reader") for t in threading.enumerate()
+    )
+
+
+def test_create_with_glob(tmp_path, mocker):
+    _write_parts(tmp_path, [1])
+    idi = IterableDataImport.create(
+        "some_api_key", tmp_path / "*.json", FileFormat.NEWLINE_DELIMITED_JSON
+    )
+    assert isinstance(idi.data_source, MultiFileSystem)
+    create_importer = mocker.patch(
+        "iterable_data_import.iterable_data_import._create_api_importer"
+    )
+    with pytest.raises(ValueError):
+        IterableDataImport.create(
+            "some_api_key",
+            tmp_path,
+            FileFormat.NEWLINE_DELIMITED_JSON,
+            checkpoint_path=tmp_path / "checkpoint.json",
+        )
+    create_importer.assert_not_called()
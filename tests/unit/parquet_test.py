@@ -0,0 +1,110 @@
+import datetime
+
+import pyarrow
+import pyarrow.parquet
+import pytest
+
+from iterable_data_import import (
+    IterableDataImport,
+    FileSystem,
+    FileFormat,
+    MultiFileSystem,
+    RecordBatchFormat,
+    SourcePosition,
+)
+
+SIGNUP = datetime.datetime(2021, 6, 1, 12, 30)
+
+
+def _parquet_file(tmp_path, num_rows=10, row_group_size=4, name="data.parquet"):
+    path = tmp_path / name
+    table = pyarrow.table(
+        {
+            "id": list(range(num_rows)),
+            "email": [f"user{i}@iterable.com" for i in range(num_rows)],
+            "score": [i / 2 for i in range(num_rows)],
+            "signed_up": [SIGNUP] * num_rows,
+            "tags": [["a", "b"]] * num_rows,
+        }
+    )
+    pyarrow.parquet.write_table(table, path, row_group_size=row_group_size)
+    return path
+
+
+def test_records_keep_column_types(tmp_path):
+    path = _parquet_file(tmp_path, num_rows=2)
+    records = list(FileSystem(path, FileFormat.PARQUET))
+    assert records[1] == {
+        "id": 1,
+        "email": "user1@iterable.com",
+        "score": 0.5,
+        "signed_up": SIGNUP,
+        "tags": ["a", "b"],
+    }
+
+
+def test_only_selected_columns_read(tmp_path):
+    path = _parquet_file(tmp_path, num_rows=3)
+    source = FileSystem(path, FileFormat.PARQUET, columns=["email", "id"])
+    assert next(source) == {"email": "user0@iterable.com", "id": 0}
+
+
+def test_columns_require_parquet(tmp_path):
+    with pytest.raises(ValueError):
+        FileSystem(tmp_path / "data.csv", FileFormat.CSV, columns=["email"])
+
+
+@pytest.mark.parametrize("record_index", [0, 3, 4, 9, 10])
+def test_resumes_from_position(tmp_path, record_index):
+    path = _parquet_file(tmp_path)
+    source = FileSystem(
+        path,
+        FileFormat.PARQUET,
+        start_position=SourcePosition(record_index, record_index),
+        columns=["id"],
+    )
+    assert [record["id"] for record in source] == list(range(record_index, 10))
+    assert source.position == SourcePosition(10, 10)
+
+
+def test_row_groups_streamed(tmp_path, mocker):
+    path = _parquet_file(tmp_path, num_rows=12, row_group_size=4)
+    iter_batches_spy = mocker.spy(pyarrow.parquet.ParquetFile, "iter_batches")
+    source = FileSystem(
+        path, FileFormat.PARQUET, start_position=SourcePosition(5, 5), columns=["id"]
+    )
+    next(source)
+    assert iter_batches_spy.call_args.kwargs["row_groups"] == [1, 2]
+
+
+@pytest.mark.parametrize(
+    "batch_format", [RecordBatchFormat.COLUMNS, RecordBatchFormat.ARROW]
+)
+def test_batches(tmp_path, batch_format):
+    path = _parquet_file(tmp_path)
+    source = FileSystem(path, FileFormat.PARQUET, columns=["id", "score"])
+    batches = list(source.batches(3, batch_format))
+    if batch_format == RecordBatchFormat.ARROW:
+        assert batches[0].schema.field("id").type == pyarrow.int64()
+        batches = [batch.to_pydict() for batch in batches]
+    assert [len(batch["id"]) for batch in batches] == [3, 3, 3, 1]
+    assert batches[0] == {"id": [0, 1, 2], "score": [0.0, 0.5, 1.0]}
+
+
+def test_create_with_parquet_part_files(tmp_path):
+    _parquet_file(tmp_path, num_rows=2, name="part-0.parquet")
+    _parquet_file(tmp_path, num_rows=3, name="part-1.parquet")
+    idi = IterableDataImport.create(
+        "some_api_key",
+        tmp_path / "part-*.parquet",
+        FileFormat.PARQUET,
+        source_columns=["email"],
+    )
+    assert isinstance(idi.data_source, MultiFileSystem)
+    assert sorted(record["email"] for record in idi.data_source) == [
+        "user0@iterable.com",
+        "user0@iterable.com",
+        "user1@iterable.com",
+        "user1@iterable.com",
+        "user2@iterable.com",
+    ]
@@ -0,0 +1,148 @@
+import threading
+
+import pytest
+
+from iterable_data_import import (
+    ImportPipeline,
+    IterableDataImport,
+    NoOpApiErrorRecorder,
+    NoOpMapErrorRecorder,
+    SyncApiImporter,
+    UserProfile,
+    UpdateUserProfile,
+)
+from iterable_data_import.importers.importer import Importer
+
+
+class RecordingImporter(Importer):
+    def __init__(self, on_actions=None):
+        self.emails = []
+        self.on_actions = on_actions
+
+    def handle_actions(self, actions):
+        if self.on_actions is not None:
+            self.on_actions()
+        self.emails.extend(action.user.email for action in actions)
+
+
+class RecordingMapErrorRecorder(NoOpMapErrorRecorder):
+    def __init__(self):
+        self.records = []
+
+    def record(self, error, record):
+        self.records.append(record)
+
+
+def _map_function(record):
+    if record["id"] % 10 == 3:
+        raise ValueError("bad record")
+    return UpdateUserProfile(UserProfile(f"user{record['id']}@iterable.com"))
+
+
+def _records(count):
+    return [{"id": i} for i in range(count)]
+
+
+def _expected_emails(count):
+    return [f"user{i}@iterable.com" for i in range(count) if i % 10 != 3]
+
+
+def _no_pipeline_threads():
+    return not any(t.name.startswith("ImportPipeline") for t in threading.enumerate())
+
+
+@pytest.mark.parametrize("map_threads", [1, 4])
+def test_pipeline_imports_records_in_order(map_threads):
+    importer = RecordingImporter()
+    map_error_recorder = RecordingMapErrorRecorder()
+    idi = IterableDataImport(iter(_records(250)), importer, map_error_recorder)
+    assert idi.run(_map_function, chunk_size=7, map_threads=map_threads)
+    assert importer.emails == _expected_emails(250)
+    assert [r["id"] for r in map_error_recorder.records] == list(range(3, 250, 10))
+    assert _no_pipeline_threads()
+
+
+def test_unordered_pipeline_imports_every_record():
+    importer = RecordingImporter()
+    idi = IterableDataImport(iter(_records(250)), importer, NoOpMapErrorRecorder())
+    idi.run(_map_function, chunk_size=7, map_threads=4, ordered=False)
+    assert sorted(importer.emails) == sorted(_expected_emails(250))
+
+
+def test_pipeline_applies_backpressure():
+    read = []
+    release = threading.Event()
+
+    def records():
+        for record in _records(1000):
+            read.append(record)
+            yield record
+
+    importer = RecordingImporter(on_actions=lambda: release.wait(5))
+    idi = IterableDataImport(records(), importer, NoOpMapErrorRecorder())
+    run = threading.Thread(
+        target=idi.run, args=(_map_function,), kwargs=dict(chunk_size=10, map_threads=2)
+    )
+    run.start()
+    try:
+        threading.Event().wait(0.5)
+        # 2 * queue_size + map_threads chunks, plus the chunk being read
+        assert len(read) <= (2 * 8 + 2 + 1) * 10
+        assert idi.queue_depths()["mapped"] > 0
+    finally:
+        release.set()
+        run.join()
+    assert importer.emails == _expected_emails(1000)
+
+
+def test_source_errors_stop_the_pipeline():
+    def records():
+        yield from _records(50)
+        raise OSError("disk error")
+
+    idi = IterableDataImport(records(), RecordingImporter(), NoOpMapErrorRecorder())
+    with pytest.raises(OSError):
+        idi.run(_map_function, chunk_size=7, map_threads=2)
+    assert _no_pipeline_threads()
+
+
+def test_importer_errors_stop_the_pipeline():
+    def fail():
+        raise RuntimeError("connection lost")
+
+    idi = IterableDataImport(
+        iter(_records(1000)), RecordingImporter(fail), NoOpMapErrorRecorder()
+    )
+    with pytest.raises(RuntimeError):
+        idi.run(_map_function, chunk_size=7, map_threads=2)
+    assert _no_pipeline_threads()
+
+
+def test_queue_depths():
+    pipeline = ImportPipeline([], lambda record: ([], None))
+    assert pipeline.queue_depths() == {"read": 0, "mapped": 0, "reordered": 0}
+
+    importer = SyncApiImporter(object(), NoOpApiErrorRecorder(), sender_threads=2)
+    idi = IterableDataImport(iter([]), importer, NoOpMapErrorRecorder())
+    assert idi.queue_depths() == {"send": 0}
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        dict(map_threads=0),
+        dict(map_threads=1, chunk_size=0),
+        dict(map_threads=1, queue_size=0),
+    ],
+)
+def test_invalid_pipeline_settings(kwargs):
+    with pytest.raises(ValueError):
+        ImportPipeline([], lambda record: ([], None), **kwargs)
+
+
+def test_map_threads_cant_be_used_with_workers():
+    idi = IterableDataImport(
+        iter(_records(1)), RecordingImporter(), NoOpMapErrorRecorder()
+    )
+    with pytest.raises(ValueError):
+        idi.run(_map_function, workers=2, map_threads=2)
@@ -0,0 +1,100 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from iterable_data_import import (
+    SyncApiClient,
+    UserProfile,
+)
+from iterable_data_import.importers.iterable_request import BulkUserUpdateRequest
+from iterable_data_import.importers.rate_limiter import (
+    TokenBucket,
+    RateLimiter,
+    parse_retry_after,
+)
+from .unit_test_utils import FakeClock, FakeResponse
+
+
+def test_token_bucket_spaces_requests():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, clock=clock)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+    clock.now += 1.0
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+def test_token_bucket_allows_bursts():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, burst=3, clock=clock)
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_token_bucket_pause():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, clock=clock)
+    bucket.pause(5)
+    assert bucket.reserve() == pytest.approx(5.1)
+    assert bucket.reserve() == pytest.approx(5.2)
+
+
+def test_unlimited_bucket_only_waits_for_pause():
+    clock = FakeClock()
+    bucket = TokenBucket(clock=clock)
+    assert bucket.reserve() == 0
+    bucket.pause(3)
+    assert bucket.reserve() == pytest.approx(3)
+
+
+def test_rate_limiter_uses_per_path_rates():
+    clock = FakeClock()
+    limiter = RateLimiter({"/users/bulkUpdate": 5}, clock=clock)
+    limiter.reserve("/users/bulkUpdate")
+    assert limiter.reserve("/users/bulkUpdate") == pytest.approx(0.2)
+    assert limiter.reserve("/events/trackBulk") == 0
+    assert limiter.reserve("/events/trackBulk") == 0
+
+
+@pytest.mark.parametrize(
+    "header,expected",
+    [(None, None), ("", None), ("3", 3.0), ("-1", 0.0), ("not a date", None)],
+)
+def test_parse_retry_after(header, expected):
+    assert parse_retry_after(header) == expected
+
+
+def test_parse_retry_after_http_date():
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_client_retries_429_with_retry_after(mocker: MockerFixture):
+    limiter = RateLimiter()
+    client = SyncApiClient("some_api_key", rate_limiter=limiter)
+    post = mocker.patch.object(
+        client.session,
+        "post",
+        side_effect=[
+            FakeResponse(429, headers={"Retry-After": "0"}),
+            FakeResponse(200),
+        ],
+    )
+    pause = mocker.spy(limiter, "pause")
+    req = BulkUserUpdateRequest([UserProfile("test@iterable.com")])
+    res = client.bulk_update_users(req)
+    assert res.status_code == 200
+    assert post.call_count == 2
+    pause.assert_called_once_with("/users/bulkUpdate", 0.0)
+
+
+def test_client_gives_up_after_max_retries(mocker: MockerFixture):
+    client = SyncApiClient("some_api_key", max_retries=2)
+    post = mocker.patch.object(
+        client.session,
+        "post",
+        return_value=FakeResponse(429, headers={"Retry-After": "0"}),
+    )
+    req = BulkUserUpdateRequest([UserProfile("test@iterable.com")])
+    res = client.bulk_update_users(req)
+    assert res.status_code == 429
+    assert post.call_count == 3
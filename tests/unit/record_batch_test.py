@@ -0,0 +1,115 @@
+import json
+
+import pyarrow
+import pytest
+from pytest_mock import MockerFixture
+
+from iterable_data_import import (
+    IterableDataImport,
+    FileSystem,
+    FileFormat,
+    NoOpMapErrorRecorder,
+    RecordBatchFormat,
+    UserProfile,
+    UpdateUserProfile,
+)
+from iterable_data_import.data_sources import file_system
+from iterable_data_import.importers.importer import Importer
+
+CSV_DATA = 'id,email,notes\n1,a@iterable.com,"line one\nline two"\n2,b@iterable.com,\n3,c@iterable.com,plain\n'
+
+
+class RecordingImporter(Importer):
+    def __init__(self) -> None:
+        self.actions = []
+        self.calls = 0
+
+    def handle_actions(self, actions) -> None:
+        self.calls += 1
+        self.actions.extend(actions)
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _csv_file(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text(CSV_DATA)
+    return path
+
+
+def _map_batch(batch):
+    return [UpdateUserProfile(UserProfile(email)) for email in batch["email"]]
+
+
+@pytest.mark.parametrize("use_pyarrow", [True, False])
+def test_csv_batches_match_records(tmp_path, mocker: MockerFixture, use_pyarrow):
+    if not use_pyarrow:
+        mocker.patch.object(file_system, "pyarrow", None)
+    path = _csv_file(tmp_path)
+    records = list(FileSystem(path, FileFormat.CSV))
+    batches = list(
+        FileSystem(path, FileFormat.CSV).batches(2, RecordBatchFormat.COLUMNS)
+    )
+    assert batches == [
+        {name: [r[name] for r in records[:2]] for name in records[0]},
+        {name: [r[name] for r in records[2:]] for name in records[0]},
+    ]
+
+
+def test_csv_arrow_batches(tmp_path):
+    batches = list(
+        FileSystem(_csv_file(tmp_path), FileFormat.CSV).batches(
+            10, RecordBatchFormat.ARROW
+        )
+    )
+    assert len(batches) == 1
+    assert isinstance(batches[0], pyarrow.RecordBatch)
+    assert batches[0].column("id").to_pylist() == ["1", "2", "3"]
+
+
+@pytest.mark.parametrize(
+    "batch_format", [RecordBatchFormat.COLUMNS, RecordBatchFormat.ARROW]
+)
+def test_json_batches(tmp_path, batch_format):
+    path = tmp_path / "data.json"
+    records = [{"id": i, "email": f"user{i}@iterable.com"} for i in range(5)]
+    path.write_text("\n".join(json.dumps(r) for r in records) + "\n")
+    batches = list(
+        FileSystem(path, FileFormat.NEWLINE_DELIMITED_JSON).batches(2, batch_format)
+    )
+    if batch_format == RecordBatchFormat.ARROW:
+        batches = [batch.to_pydict() for batch in batches]
+    assert [batch["id"] for batch in batches] == [[0, 1], [2, 3], [4]]
+
+
+def test_run_batches(tmp_path):
+    importer = RecordingImporter()
+    idi = IterableDataImport(
+        FileSystem(_csv_file(tmp_path), FileFormat.CSV),
+        importer,
+        NoOpMapErrorRecorder(),
+    )
+    assert idi.run_batches(_map_batch, batch_size=2)
+    assert [a.user.email for a in importer.actions] == [
+        "a@iterable.com",
+        "b@iterable.com",
+        "c@iterable.com",
+    ]
+    assert importer.calls == 2
+
+
+def test_run_batches_records_every_record_of_failed_batch(mocker: MockerFixture):
+    recorder = NoOpMapErrorRecorder()
+    spy = mocker.spy(recorder, "record")
+    records = [{"email": "a@iterable.com"}, {"email": "b@iterable.com", "x": 1}]
+
+    def bad_fn(batch):
+        raise ValueError("boom!")
+
+    idi = IterableDataImport(records, RecordingImporter(), recorder)
+    idi.run_batches(bad_fn)
+    assert [call.args[1] for call in spy.call_args_list] == [
+        {"email": "a@iterable.com", "x": None},
+        {"email": "b@iterable.com", "x": 1},
+    ]
@@ -0,0 +1,228 @@
+import json
+
+import pytest
+
+from iterable_data_import import (
+    ApiErrorFile,
+    FileSystemApiErrorRecorder,
+    IterableDataImport,
+    NoOpMapErrorRecorder,
+    SyncApiImporter,
+    UpdateUserProfile,
+    UserProfile,
+    replay_action,
+)
+from .unit_test_utils import FakeResponse
+
+
+class RecordingApiClient:
+    def __init__(self, failing_emails=()):
+        self.failing_emails = failing_emails
+        self.requests = []
+
+    def bulk_update_users(self, req):
+        self.requests.append(req.to_api_dict)
+        if any(user.email in self.failing_emails for user in req.users):
+            return FakeResponse(400)
+        return FakeResponse(200)
+
+    def bulk_track_events(self, req):
+        self.requests.append(req.to_api_dict)
+        return FakeResponse(200)
+
+    def track_purchase(self, req):
+        self.requests.append(req.to_api_dict)
+        return FakeResponse(200)
+
+
+def _user(i):
+    return UserProfile(f"user{i}@iterable.com", data_fields={"i": i}).to_api_dict
+
+
+def _write_errors(path, errors):
+    path.write_text("".join(json.dumps(error) + "\n" for error in errors))
+
+
+ERRORS = [
+    {
+        "response_status": 503,
+        "response_body": "unavailable",
+        "request_body": {"users": [_user(0), _user(1)]},
+    },
+    {
+        "response_status": 400,
+        "response_body": "invalid",
+        "request_body": {"users": [_user(2)]},
+    },
+    {
+        "response_status": 200,
+        "response_body": '{"failCount": 2, "failedUpdates": {"invalidEmails": ["user3@iterable.com"], "conflictEmails": ["user4@iterable.com"]}}',
+        "request_body": {"users": [_user(3), _user(4)]},
+    },
+    {
+        "response_status": 503,
+        "response_body": "unavailable",
+        "request_body": {
+            "events": [{"eventName": "signup", "email": "a@iterable.com"}]
+        },
+    },
+    {
+        "response_status": 429,
+        "response_body": "slow down",
+        "request_body": {
+            "id": "p1",
+            "user": {"email": "a@iterable.com"},
+            "items": [{"id": "1", "name": "shoes", "price": 9.0, "quantity": 1}],
+            "total": 9.0,
+        },
+    },
+]
+
+
+def test_replayable_items_read(tmp_path):
+    path = tmp_path / "api-errors.json"
+    _write_errors(path, ERRORS)
+    source = ApiErrorFile(path)
+    records = list(source)
+    assert [r["type"] for r in records] == [
+        "users",
+        "users",
+        "users",
+        "events",
+        "purchases",
+    ]
+    assert [r["resource"].to_api_dict for r in records[:3]] == [
+        _user(0),
+        _user(1),
+        _user(4),
+    ]
+    assert (source.items_read, source.items_skipped) == (7, 2)
+
+
+def test_invalid_items_skipped(tmp_path):
+    path = tmp_path / "api-errors.json"
+    _write_errors(
+        path,
+        [
+            {
+                "response_status": 500,
+                "response_body": "",
+                "request_body": {"users": [{"dataFields": {}}, _user(0)]},
+            }
+        ],
+    )
+    source = ApiErrorFile(path, skip_status_codes=frozenset())
+    assert [r["resource"].email for r in source] == ["user0@iterable.com"]
+    assert source.items_skipped == 1
+
+
+def test_replay_rebatches_items_and_records_new_failures(tmp_path):
+    path = tmp_path / "api-errors.json"
+    _write_errors(path, ERRORS)
+    out = tmp_path / "api-errors.replay.json"
+    client = RecordingApiClient(failing_emails={"user1@iterable.com"})
+    importer = SyncApiImporter(
+        client, FileSystemApiErrorRecorder(out), users_per_batch=10
+    )
+    idi = IterableDataImport(ApiErrorFile(path), importer, NoOpMapErrorRecorder())
+    assert idi.run(replay_action)
+
+    assert client.requests == [
+        ERRORS[4]["request_body"],
+        {"users": [_user(0), _user(1), _user(4)]},
+        ERRORS[3]["request_body"],
+    ]
+    errors = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [e["request_body"] for e in errors] == [
+        {"users": [_user(0), _user(1), _user(4)]}
+    ]
+    # the new error file can be replayed in turn
+    assert len(list(ApiErrorFile(out, skip_status_codes=frozenset()))) == 3
+
+
+def test_compact_errors_require_source_format(tmp_path):
+    path = tmp_path / "api-errors.json"
+    _write_errors(
+        path,
+        [
+            {
+                "response_status": 500,
+                "response_body": "",
+                "type": "users",
+                "files": [],
+                "items": [],
+            }
+        ],
+    )
+    with pytest.raises(ValueError):
+        list(ApiErrorFile(path))
+
+
+def test_create_replay(tmp_path):
+    path = tmp_path / "api-errors.json"
+    idi = IterableDataImport.create_replay(
+        "some_api_key",
+        path,
+        api_error_out=tmp_path / "api-errors.replay.json",
+        sender_threads=4,
+    )
+    assert isinstance(idi.data_source, ApiErrorFile)
+    assert isinstance(idi.importer, SyncApiImporter)
+    assert isinstance(idi.importer.error_recorder, FileSystemApiErrorRecorder)
+
+    with pytest.raises(ValueError):
+        IterableDataImport.create_replay("some_api_key", path, api_error_out=path)
+
+
+class PartiallyFailingApiClient(RecordingApiClient):
+    def bulk_update_users(self, req):
+        self.requests.append(req.to_api_dict)
+        body = {
+            "successCount": 2,
+            "failCount": 2,
+            "failedUpdates": {
+                "invalidEmails": [{"index": 3}],
+                "conflictEmails": [{"index": 1}],
+            },
+        }
+        return FakeResponse(200, json.dumps(body))
+
+
+def test_recorded_partial_failure_replayed(tmp_path):
+    path = tmp_path / "api-errors.json"
+    importer = SyncApiImporter(
+        PartiallyFailingApiClient(),
+        FileSystemApiErrorRecorder(path),
+        max_retries=0,
+    )
+    importer.handle_actions(
+        [UpdateUserProfile(UserProfile.from_api_dict(_user(i))) for i in range(4)]
+    )
+    importer.shutdown()
+
+    errors = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [e["request_body"] for e in errors] == [
+        {"users": [_user(3)]},
+        {"users": [_user(1)]},
+    ]
+    # only the item that failed for a retryable reason is replayed
+    source = ApiErrorFile(path)
+    assert [r["resource"].to_api_dict for r in source] == [_user(1)]
+    assert (source.items_read, source.items_skipped) == (2, 1)
+
+
+def test_invalid_items_keep_failure_indexes(tmp_path):
+    path = tmp_path / "api-errors.json"
+    _write_errors(
+        path,
+        [
+            {
+                "response_status": 200,
+                "response_body": '{"failCount": 1, "failedUpdates": {"invalidEmails": [{"index": 2}]}}',
+                "request_body": {"users": [{"dataFields": {}}, _user(0), _user(1)]},
+            }
+        ],
+    )
+    source = ApiErrorFile(path)
+    assert [r["resource"].to_api_dict for r in source] == [_user(0)]
+    assert source.items_skipped == 2
@@ -0,0 +1,163 @@
+import pathlib
+
+import pytest
+
+from iterable_data_import import (
+    IterableDataImport,
+    FileFormat,
+    FileSystem,
+    FileSystemCheckpoint,
+    ShardedDataSource,
+    SourcePosition,
+)
+from iterable_data_import.data_sources.sharded_data_source import (
+    parse_shard,
+    shard_path,
+    user_shard_key,
+)
+from .unit_test_utils import write_json
+
+RECORDS = (
+    [{"id": i, "email": f"user{i % 20}@iterable.com"} for i in range(100)]
+    + [{"id": 100 + i, "userId": f"u{i}"} for i in range(10)]
+    + [{"id": 110 + i} for i in range(10)]
+)
+
+
+def test_every_record_in_exactly_one_shard():
+    shards = [list(ShardedDataSource(iter(RECORDS), i, 4)) for i in range(4)]
+    ids = sorted(record["id"] for shard in shards for record in shard)
+    assert ids == [record["id"] for record in RECORDS]
+    assert all(shard for shard in shards)
+
+
+def test_user_records_stay_on_one_shard_in_order():
+    shards = [list(ShardedDataSource(iter(RECORDS), i, 3)) for i in range(3)]
+    for email in {record.get("email") for record in RECORDS} - {None}:
+        holding = [
+            shard for shard in shards if any(r.get("email") == email for r in shard)
+        ]
+        assert len(holding) == 1
+        ids = [r["id"] for r in holding[0] if r.get("email") == email]
+        assert ids == sorted(ids)
+
+
+def test_records_without_a_key_spread_by_index():
+    records = [{"id": i} for i in range(6)]
+    assert [r["id"] for r in ShardedDataSource(iter(records), 1, 3)] == [1, 4]
+
+
+def test_emails_compared_case_insensitively():
+    assert user_shard_key({"email": " User@Iterable.com"}) == user_shard_key(
+        {"email": "user@iterable.com"}
+    )
+    assert user_shard_key({"userId": "1"}) == user_shard_key({"user_id": "1"})
+    assert user_shard_key({"name": "x"}) is None
+
+
+@pytest.mark.parametrize("shard", ["1", "a/4", "4/4", "-1/4", "0/0"])
+def test_invalid_shard(shard):
+    with pytest.raises(ValueError):
+        parse_shard(shard)
+
+
+def test_parse_shard():
+    assert parse_shard("2/8") == (2, 8)
+
+
+def test_shard_path():
+    path = pathlib.Path("out/errors.json")
+    assert shard_path(path, 2, 8) == pathlib.Path("out/errors.shard-2-of-8.json")
+    assert shard_path(None, 2, 8) is None
+
+
+def test_shard_resumes_from_wrapped_source_position(tmp_path):
+    path = tmp_path / "data.json"
+    write_json(path, RECORDS)
+    first_run = ShardedDataSource(
+        FileSystem(path, FileFormat.NEWLINE_DELIMITED_JSON), 0, 2
+    )
+    expected = [record["id"] for record in first_run]
+
+    source = FileSystem(path, FileFormat.NEWLINE_DELIMITED_JSON)
+    shard = ShardedDataSource(source, 0, 2)
+    handled = [next(shard)["id"] for _ in range(5)]
+    resumed = ShardedDataSource(
+        FileSystem(path, FileFormat.NEWLINE_DELIMITED_JSON, shard.position), 0, 2
+    )
+    assert handled + [record["id"] for record in resumed] == expected
+
+
+def test_records_without_a_key_are_counted_and_warned_about(caplog):
+    records = [{"id": i, "name": f"user{i}"} for i in range(10)]
+    shard = ShardedDataSource(iter(records), 0, 2)
+    assert [r["id"] for r in shard] == [0, 2, 4, 6, 8]
+    assert shard.keyless_records == 10
+    assert "record 1 has no shard key" in caplog.text
+
+
+def test_key_function_shards_by_other_columns():
+    records = [{"id": i, "customer": f"c{i % 3}"} for i in range(30)]
+    shards = [
+        list(ShardedDataSource(iter(records), i, 2, lambda r: r["customer"]))
+        for i in range(2)
+    ]
+    for customer in ("c0", "c1", "c2"):
+        assert sum(any(r["customer"] == customer for r in s) for s in shards) == 1
+
+
+def test_create_sharded_import(tmp_path):
+    path = tmp_path / "data.json"
+    write_json(path, RECORDS)
+    checkpoint_path = tmp_path / "checkpoint.json"
+    FileSystemCheckpoint(tmp_path / "checkpoint.shard-1-of-4.json").save(
+        SourcePosition(2, 10)
+    )
+    idi = IterableDataImport.create(
+        "some_api_key",
+        path,
+        FileFormat.NEWLINE_DELIMITED_JSON,
+        map_function_error_out=tmp_path / "map_errors.json",
+        api_error_out=tmp_path / "api_errors.json",
+        rate_limits={"/users/bulkUpdate": 10},
+        checkpoint_path=checkpoint_path,
+        shard="1/4",
+    )
+    assert isinstance(idi.data_source, ShardedDataSource)
+    assert (idi.data_source.shard_index, idi.data_source.shard_count) == (1, 4)
+    assert idi.data_source.position == SourcePosition(2, 10)
+    assert idi.checkpoint.file_path == tmp_path / "checkpoint.shard-1-of-4.json"
+    assert (
+        idi.map_error_recorder.out_file_path
+        == tmp_path / "map_errors.shard-1-of-4.json"
+    )
+    assert (
+        idi.importer.error_recorder.out_file_path
+        == tmp_path / "api_errors.shard-1-of-4.json"
+    )
+    assert idi.importer.api_client.rate_limiter.rates == {"/users/bulkUpdate": 2.5}
+
+
+def test_create_with_shard_key(tmp_path):
+    path = tmp_path / "data.json"
+    write_json(path, RECORDS)
+
+    def shard_key(record):
+        return record.get("customer")
+
+    idi = IterableDataImport.create(
+        "some_api_key",
+        path,
+        FileFormat.NEWLINE_DELIMITED_JSON,
+        shard="0/2",
+        shard_key=shard_key,
+    )
+    assert idi.data_source.key_function is shard_key
+
+    with pytest.raises(ValueError):
+        IterableDataImport.create(
+            "some_api_key",
+            path,
+            FileFormat.NEWLINE_DELIMITED_JSON,
+            shard_key=shard_key,
+        )
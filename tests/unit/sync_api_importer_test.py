@@ -0,0 +1,320 @@
+import json
+import threading
+import time
+
+import pytest
+from pytest_mock import MockerFixture
+
+from iterable_data_import import (
+    AsyncApiImporter,
+    SyncApiImporter,
+    UserProfile,
+    UpdateUserProfile,
+    CommerceItem,
+    Purchase,
+    TrackPurchase,
+    NoOpApiErrorRecorder,
+    FileSystemApiErrorRecorder,
+    StdlibJsonSerializer,
+)
+from iterable_data_import.importers.async_api_client import AsyncApiResponse
+from .unit_test_utils import FakeResponse
+
+
+class FakeSyncApiClient:
+    def __init__(self, status_code: int = 200, delay: float = 0) -> None:
+        self.status_code = status_code
+        self.delay = delay
+        self.requests = []
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def _respond(self, req):
+        time.sleep(self.delay)
+        with self._lock:
+            self.requests.append(req)
+            self.threads.add(threading.current_thread().name)
+        return FakeResponse(self.status_code)
+
+    def bulk_update_users(self, req):
+        return self._respond(req)
+
+    def bulk_track_events(self, req):
+        return self._respond(req)
+
+    def track_purchase(self, req):
+        return self._respond(req)
+
+
+class AsyncClientAdapter:
+    """sends the requests of an AsyncApiImporter through a fake sync client"""
+
+    def __init__(self, client: FakeSyncApiClient) -> None:
+        self.client = client
+
+    def __getattr__(self, name):
+        # e.g. the serializer
+        return getattr(self.client, name)
+
+    async def _respond(self, send, req):
+        res = send(req)
+        return AsyncApiResponse(res.status_code, res.text)
+
+    async def bulk_update_users(self, req):
+        return await self._respond(self.client.bulk_update_users, req)
+
+    async def bulk_track_events(self, req):
+        return await self._respond(self.client.bulk_track_events, req)
+
+    async def track_purchase(self, req):
+        return await self._respond(self.client.track_purchase, req)
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture(params=[SyncApiImporter, AsyncApiImporter])
+def create_importer(request):
+    """creates either importer, sending requests through a fake sync client"""
+
+    def create(client, error_recorder, **kwargs):
+        if request.param is AsyncApiImporter:
+            # one request at a time, so the order requests are sent in is known
+            return AsyncApiImporter(
+                AsyncClientAdapter(client), error_recorder, max_in_flight=1, **kwargs
+            )
+        return SyncApiImporter(client, error_recorder, **kwargs)
+
+    return create
+
+
+def _user_actions(n: int):
+    return [UpdateUserProfile(UserProfile(f"user{i}@iterable.com")) for i in range(n)]
+
+
+def _purchase_actions(n: int):
+    user = UserProfile("test@iterable.com")
+    item = CommerceItem("1", "shoes", 99.0, 1)
+    return [TrackPurchase(Purchase(user, [item], 99.0)) for _ in range(n)]
+
+
+def test_sends_inline_without_sender_threads():
+    client = FakeSyncApiClient()
+    importer = SyncApiImporter(client, NoOpApiErrorRecorder(), users_per_batch=2)
+    importer.handle_actions(_user_actions(4))
+    assert len(client.requests) == 2
+    assert client.threads == {threading.current_thread().name}
+    importer.shutdown()
+
+
+def test_sender_threads_send_all_requests():
+    client = FakeSyncApiClient(delay=0.01)
+    importer = SyncApiImporter(
+        client, NoOpApiErrorRecorder(), users_per_batch=3, sender_threads=4
+    )
+    importer.handle_actions(_user_actions(10) + _purchase_actions(6))
+    importer.shutdown()
+    assert len(client.requests) == 10
+    assert len(client.threads) > 1
+    assert threading.current_thread().name not in client.threads
+    assert all(not w.is_alive() for w in importer._workers)
+
+
+def test_handle_actions_blocks_when_queue_full():
+    client = FakeSyncApiClient(delay=0.1)
+    importer = SyncApiImporter(
+        client,
+        NoOpApiErrorRecorder(),
+        sender_threads=1,
+        max_queued_requests=1,
+    )
+    start = time.monotonic()
+    # 1 request being sent + 1 queued, the third must wait for the first to finish
+    importer.handle_actions(_purchase_actions(3))
+    assert time.monotonic() - start >= 0.1
+    importer.shutdown()
+    assert len(client.requests) == 3
+
+
+def test_errors_recorded_from_sender_threads(mocker: MockerFixture):
+    client = FakeSyncApiClient(status_code=500)
+    recorder = NoOpApiErrorRecorder()
+    spy = mocker.spy(recorder, "record_serialized")
+    importer = SyncApiImporter(client, recorder, sender_threads=2)
+    importer.handle_actions(_purchase_actions(4))
+    importer.shutdown()
+    assert spy.call_count == 4
+
+
+def test_sender_thread_exception_raised_on_shutdown():
+    client = FakeSyncApiClient()
+
+    def boom(req):
+        raise ConnectionError("boom!")
+
+    client.track_purchase = boom
+    importer = SyncApiImporter(client, NoOpApiErrorRecorder(), sender_threads=2)
+    importer.handle_actions(_purchase_actions(1))
+    with pytest.raises(ConnectionError):
+        importer.shutdown()
+
+
+def test_only_failed_items_retried_and_recorded(create_importer, mocker: MockerFixture):
+    client = FakeSyncApiClient()
+    responses = [
+        FakeResponse(
+            200,
+            '{"failCount": 2, "failedUpdates": {"invalidEmails": ["user0@iterable.com"], "conflictEmails": ["user1@iterable.com"]}}',
+        ),
+        FakeResponse(503),
+        FakeResponse(200, '{"failCount": 0}'),
+    ]
+    sent = []
+
+    def bulk_update_users(req):
+        sent.append([user.email for user in req.users])
+        return responses.pop(0)
+
+    client.bulk_update_users = bulk_update_users
+    recorder = NoOpApiErrorRecorder()
+    spy = mocker.spy(recorder, "record_serialized")
+    importer = create_importer(client, recorder, users_per_batch=3, retry_backoff=0)
+    importer.handle_actions(_user_actions(3))
+    importer.shutdown()
+
+    assert sent == [
+        ["user0@iterable.com", "user1@iterable.com", "user2@iterable.com"],
+        ["user1@iterable.com"],
+        ["user1@iterable.com"],
+    ]
+    spy.assert_called_once()
+    assert json.loads(spy.call_args.args[2]) == {
+        "users": [_user_actions(1)[0].user.to_api_dict]
+    }
+
+
+def test_items_recorded_after_max_retries(create_importer, mocker: MockerFixture):
+    client = FakeSyncApiClient(status_code=500)
+    recorder = NoOpApiErrorRecorder()
+    spy = mocker.spy(recorder, "record_serialized")
+    importer = create_importer(
+        client, recorder, users_per_batch=2, max_retries=2, retry_backoff=0
+    )
+    importer.handle_actions(_user_actions(2))
+    importer.shutdown()
+    assert len(client.requests) == 3
+    spy.assert_called_once()
+    assert spy.call_args.args[0] == 500
+
+
+def test_batches_close_on_byte_budget(create_importer):
+    client = FakeSyncApiClient()
+    client.serializer = StdlibJsonSerializer()
+    user_size = len(
+        '{"email": "user0@iterable.com", "userId": null, "dataFields": {}, "preferUserId": false, "mergeNestedObjects": false}'
+    )
+    # exactly two users, the comma between them and the {"users":[...]} framing
+    max_batch_bytes = len('{"users":[') + 2 * user_size + 1 + len("]}")
+    importer = create_importer(
+        client, NoOpApiErrorRecorder(), max_batch_bytes=max_batch_bytes
+    )
+    importer.handle_actions(_user_actions(5))
+    importer.shutdown()
+    assert [len(req.users) for req in client.requests] == [2, 2, 1]
+    body = client.requests[0].serialize(client.serializer)
+    assert len(body) == max_batch_bytes
+    assert json.loads(body) == client.requests[0].to_api_dict
+
+
+def test_too_large_batch_split_and_resent(create_importer):
+    client = FakeSyncApiClient()
+    sent = []
+
+    def bulk_update_users(req):
+        sent.append(len(req.users))
+        return FakeResponse(413 if len(req.users) > 1 else 200)
+
+    client.bulk_update_users = bulk_update_users
+    importer = create_importer(client, NoOpApiErrorRecorder(), users_per_batch=4)
+    importer.handle_actions(_user_actions(4))
+    importer.shutdown()
+    assert sent == [4, 2, 1, 1, 2, 1, 1]
+
+
+def test_repeated_user_updates_coalesced(create_importer, tmp_path):
+    client = FakeSyncApiClient(400)
+    out = tmp_path / "api-errors.json"
+    importer = create_importer(
+        client, FileSystemApiErrorRecorder(out), users_per_batch=2, coalesce_users=True
+    )
+    importer.handle_actions(
+        [
+            UpdateUserProfile(UserProfile("a@iterable.com", data_fields={"x": 1})),
+            UpdateUserProfile(UserProfile("a@iterable.com", data_fields={"y": 2})),
+            UpdateUserProfile(UserProfile("a@iterable.com", data_fields={"x": 3})),
+            UpdateUserProfile(UserProfile("b@iterable.com")),
+        ]
+    )
+    importer.shutdown()
+    assert len(client.requests) == 1
+    users = client.requests[0].to_api_dict["users"]
+    assert [u["email"] for u in users] == ["a@iterable.com", "b@iterable.com"]
+    assert users[0]["dataFields"] == {"x": 3, "y": 2}
+    assert importer.acknowledged_actions == 4
+    # the recorded body is the coalesced request that was sent
+    error = json.loads(out.read_text())
+    assert error["request_body"] == {"users": users}
+
+
+def test_nested_objects_deep_merged_when_coalesced(create_importer):
+    client = FakeSyncApiClient()
+    importer = create_importer(client, NoOpApiErrorRecorder(), coalesce_users=True)
+    importer.handle_actions(
+        [
+            UpdateUserProfile(
+                UserProfile(
+                    user_id="1",
+                    data_fields={"address": {"city": "SF", "zip": "94105"}},
+                    merge_nested_objects=True,
+                )
+            ),
+            UpdateUserProfile(
+                UserProfile(
+                    user_id="1",
+                    data_fields={"address": {"zip": "94107"}},
+                    merge_nested_objects=True,
+                )
+            ),
+        ]
+    )
+    importer.shutdown()
+    users = client.requests[0].to_api_dict["users"]
+    assert len(users) == 1
+    assert users[0]["dataFields"] == {"address": {"city": "SF", "zip": "94107"}}
+
+
+def test_updates_with_different_flags_not_coalesced(create_importer):
+    client = FakeSyncApiClient()
+    importer = create_importer(client, NoOpApiErrorRecorder(), coalesce_users=True)
+    importer.handle_actions(
+        [
+            UpdateUserProfile(UserProfile("a@iterable.com", data_fields={"x": 1})),
+            UpdateUserProfile(
+                UserProfile(
+                    "a@iterable.com",
+                    data_fields={"x": {"y": 2}},
+                    merge_nested_objects=True,
+                )
+            ),
+            UpdateUserProfile(
+                UserProfile(
+                    "a@iterable.com",
+                    data_fields={"x": {"z": 3}},
+                    merge_nested_objects=True,
+                )
+            ),
+        ]
+    )
+    importer.shutdown()
+    users = client.requests[0].to_api_dict["users"]
+    assert [u["dataFields"] for u in users] == [{"x": 1}, {"x": {"y": 2, "z": 3}}]
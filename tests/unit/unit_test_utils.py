@@ -0,0 +1,43 @@
+import json
+from pathlib import PurePath
+from typing import Dict, Iterable, Optional
+
+
+class FakeResponse:
+    def __init__(
+        self, status_code: int, text: str = "{}", headers: Optional[Dict] = None
+    ) -> None:
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+class FailingApiClient:
+    def bulk_update_users(self, req):
+        return FakeResponse(400)
+
+    def bulk_track_events(self, req):
+        return FakeResponse(400)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def write_json(
+    path: PurePath, records: Iterable[Dict], trailing_newline: bool = True
+) -> None:
+    lines = [json.dumps(record) for record in records]
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + ("\n" if trailing_newline and lines else ""))
+
+
+def write_json_users(
+    path: PurePath, num_records: int, trailing_newline: bool = True
+) -> None:
+    records = [{"id": i, "email": f"user{i}@iterable.com"} for i in range(num_records)]
+    write_json(path, records, trailing_newline)